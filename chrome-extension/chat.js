@@ -411,7 +411,56 @@ async function uploadAttachment() {
     throw new Error(error.detail || 'Failed to upload attachment');
   }
 
-  return await response.json();
+  const result = await response.json();
+  // Ingestion runs as a background job, wait so the next RAG query sees the document
+  if (result.job_id) {
+    return await waitForIngestionJob(result.job_id, accessToken);
+  }
+  return result;
+}
+
+// Poll an ingestion job until it finishes, gives up after maxWaitMs or maxErrors failed checks in a row
+async function waitForIngestionJob(jobId, accessToken, intervalMs = 1000, maxWaitMs = 10 * 60 * 1000, maxErrors = 3) {
+  const deadline = Date.now() + maxWaitMs;
+  let errors = 0;
+  while (true) {
+    let job = null;
+    try {
+      const response = await fetch(`${CONFIG.BACKEND_URL}/api/rag/jobs/${jobId}`, {
+        headers: {
+          'Authorization': `Bearer ${accessToken}`
+        }
+      });
+
+      if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        const message = error.detail || 'Failed to check ingestion status';
+        // a missing job or a rejected token will not fix itself
+        if (response.status < 500) {
+          throw Object.assign(new Error(message), { permanent: true });
+        }
+        throw new Error(message);
+      }
+      job = await response.json();
+      errors = 0;
+    } catch (error) {
+      errors += 1;
+      if (error.permanent || errors >= maxErrors) {
+        throw error;
+      }
+    }
+
+    if (job && job.status === 'completed') {
+      return { ...job, message: `Document indexed (${job.chunks_indexed} chunks).` };
+    }
+    if (job && (job.status === 'failed' || job.status === 'cancelled')) {
+      throw new Error(job.error || `Ingestion ${job.status}`);
+    }
+    if (Date.now() + intervalMs > deadline) {
+      throw new Error('Document is still being indexed, try again in a moment');
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
 }
 
 // Run agent
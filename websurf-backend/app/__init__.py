@@ -1,4 +1,4 @@
 from app.services.db import engine, Base  # or adjust import paths as per your structure
-from app.models import auth_data, user_data   # important: import all models before create_all()
+from app.models import auth_data, user_data, ingestion_job, collection_catalog, agent_session   # important: import all models before create_all()
 
 Base.metadata.create_all(bind=engine)
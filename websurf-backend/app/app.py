@@ -4,6 +4,15 @@ from fastapi import Depends,FastAPI,APIRouter
 from app.routes.auth_routes import auth_router
 from app.routes.agent_routes import agent_router
 from app.routes.rag_routes import rag_router
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index
+from app.services.compute_executor import compute_executor, ingestion_executor
+from app.services.pdf_downloader import pdf_downloader
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.session_store import session_store
+from app.services.agent_service import summary_scheduler
+from app.services.mcp_pool import mcp_pool
+from app.services.rag_service import sync_catalog
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -32,6 +41,27 @@ allow_credentials=True,
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    await sync_catalog()
+    # background workers for queued ingestion jobs
+    await ingestion_jobs.start()
+    await session_store.start()
+    await mcp_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # release pooled resources
+    await summary_scheduler.shutdown()
+    await mcp_pool.shutdown()
+    await ingestion_jobs.shutdown()
+    await session_store.shutdown()
+    await pdf_downloader.aclose()
+    compute_executor.shutdown()
+    ingestion_executor.shutdown()
+    vector_store.close()
+    lexical_index.close()
+
 @app.get('/')
 def greet():
     return "Hello, World!"
@@ -13,3 +13,84 @@ DB_NAME = os.getenv("DB_NAME", "postgres")
 
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+## rag settings ##
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDER_MEMORY_CAP_MB = int(os.getenv("EMBEDDER_MEMORY_CAP_MB", "1024"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+COMPUTE_QUEUE_SIZE = int(os.getenv("COMPUTE_QUEUE_SIZE", "16"))
+COMPUTE_ADMISSION_TIMEOUT = float(os.getenv("COMPUTE_ADMISSION_TIMEOUT", "30"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".websurf", "pdf_cache"))
+PDF_DOWNLOAD_MAX_MB = int(os.getenv("PDF_DOWNLOAD_MAX_MB", "100"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "2048"))  # least recently used PDFs go first
+PDF_DOWNLOAD_TIMEOUT = float(os.getenv("PDF_DOWNLOAD_TIMEOUT", "120"))
+PDF_SPOOL_MAX_MB = int(os.getenv("PDF_SPOOL_MAX_MB", "8"))
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# threads parsing and embedding documents, apart from the query path's COMPUTE_WORKERS
+INGESTION_COMPUTE_WORKERS = int(os.getenv("INGESTION_COMPUTE_WORKERS", str(INGESTION_WORKERS)))
+INGESTION_UPLOAD_DIR = os.getenv("INGESTION_UPLOAD_DIR", os.path.join(os.path.expanduser("~"), ".websurf", "uploads"))
+INGESTION_JOB_STALE_SECONDS = int(os.getenv("INGESTION_JOB_STALE_SECONDS", "600"))
+INGESTION_JOB_HEARTBEAT_SECONDS = int(os.getenv("INGESTION_JOB_HEARTBEAT_SECONDS", "30"))  # < stale seconds
+CHUNK_LENGTH_UNIT = os.getenv("CHUNK_LENGTH_UNIT", "tokens")  # 'tokens' (embedder tokenizer) or 'chars'
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")  # 'chroma' or 'mmap'
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join(os.path.expanduser("~"), ".websurf", "vectors"))
+# chroma backend; '' keeps collections in memory, lost on restart and not shared between workers
+CHROMA_DIR = os.getenv("CHROMA_DIR", os.path.join(VECTOR_STORE_DIR, "chroma"))
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")  # mmap backend: float32, float16 or int8
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")  # fuse BM25 with dense search
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "3"))  # candidates per retriever, as a multiple of k
+RRF_K = int(os.getenv("RRF_K", "60"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "5"))
+
+## session settings ##
+# keys the memory collection names; unset falls back to SECRET_KEY
+SESSION_COLLECTION_SECRET = os.getenv("SESSION_COLLECTION_SECRET") or os.getenv("SECRET_KEY")
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sql")  # 'memory' (single process) or 'sql'
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))  # max sessions kept by the memory backend
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", str(7 * 24 * 3600)))
+SESSION_REAPER_INTERVAL = float(os.getenv("SESSION_REAPER_INTERVAL", "600"))
+SESSION_MEMORY_WINDOW = int(os.getenv("SESSION_MEMORY_WINDOW", "20"))  # recent turns kept verbatim per session
+SESSION_MEMORY_COMPACT_EVERY = int(os.getenv("SESSION_MEMORY_COMPACT_EVERY", "10"))  # turns folded per summary
+SESSION_MEMORY_SUMMARY_SENTENCES = int(os.getenv("SESSION_MEMORY_SUMMARY_SENTENCES", "8"))
+SESSION_MEMORY_MAX_SUMMARIES = int(os.getenv("SESSION_MEMORY_MAX_SUMMARIES", "50"))  # oldest summaries dropped past this
+
+## agent settings ##
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")  # opt-in
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # answers kept per worker
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))  # min cosine similarity for a hit
+# prompt token budgets per section, -1 for no limit
+PROMPT_BUDGET_SYSTEM = int(os.getenv("PROMPT_BUDGET_SYSTEM", "600"))
+PROMPT_BUDGET_COLLECTIONS = int(os.getenv("PROMPT_BUDGET_COLLECTIONS", "400"))
+PROMPT_BUDGET_MEMORY = int(os.getenv("PROMPT_BUDGET_MEMORY", "800"))
+SESSION_LIMIT_THRESHOLD = int(os.getenv("SESSION_LIMIT_THRESHOLD", "400"))  # session summary
+PROMPT_BUDGET_QUERY = int(os.getenv("PROMPT_BUDGET_QUERY", "2000"))
+PROMPT_MEMORY_RESULTS = int(os.getenv("PROMPT_MEMORY_RESULTS", "10"))  # memory hits considered per prompt
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))  # summarize_agent runs in flight per worker
+SUMMARY_COALESCE_SECONDS = float(os.getenv("SUMMARY_COALESCE_SECONDS", "2"))  # wait for more turns before a run
+SUMMARY_MAX_PENDING_TURNS = int(os.getenv("SUMMARY_MAX_PENDING_TURNS", "20"))  # per session, oldest dropped past this
+SUMMARY_FLUSH_TIMEOUT = float(os.getenv("SUMMARY_FLUSH_TIMEOUT", "30"))  # shutdown wait for pending summaries
+
+## browser pool settings ##
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))  # browser-mcp.js workers per backend worker
+MCP_LEASE_TIMEOUT = float(os.getenv("MCP_LEASE_TIMEOUT", "30"))  # wait for a free browser before running without one
+MCP_IDLE_SECONDS = float(os.getenv("MCP_IDLE_SECONDS", "600"))  # idle browsers are closed after this
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_HEALTH_TIMEOUT = float(os.getenv("MCP_HEALTH_TIMEOUT", "10"))
+MCP_MEMORY_CAP_MB = int(os.getenv("MCP_MEMORY_CAP_MB", "4096"))  # all pooled browsers together, needs psutil
+MCP_PROFILE_ROOT = os.getenv("MCP_PROFILE_ROOT", "C:\\websurf-browser" if os.name == "nt"
+                             else os.path.join(os.path.expanduser("~"), ".websurf", "browser"))  # adds -<pid>-<slot>
+TOOL_OUTPUT_TOKENS = int(os.getenv("TOOL_OUTPUT_TOKENS", "2000"))  # per browser tool result chunk, -1 for no limit
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "60"))  # page extractions reused within this
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "256"))
+
+## web search settings ##
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "5"))  # per query variant
+WEB_SEARCH_MAX_VARIANTS = int(os.getenv("WEB_SEARCH_MAX_VARIANTS", "3"))  # query variants searched per call
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "512"))
+WEB_SEARCH_TTL_SECONDS = float(os.getenv("WEB_SEARCH_TTL_SECONDS", "900"))
+WEB_SEARCH_RATE = float(os.getenv("WEB_SEARCH_RATE", "1"))  # backend requests per second, shared by all runs
+WEB_SEARCH_BURST = int(os.getenv("WEB_SEARCH_BURST", "3"))
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))  # per variant, rate limit wait included
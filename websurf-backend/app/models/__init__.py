@@ -1,2 +1,5 @@
 from app.models.auth_data import Auth,Base
 from app.models.user_data import User
+from app.models.ingestion_job import IngestionJob
+from app.models.collection_catalog import CollectionRecord
+from app.models.agent_session import AgentSession
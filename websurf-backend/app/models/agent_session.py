@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.services.db import Base
+
+# Agent Session table
+class AgentSession(Base):
+    __tablename__ = "agent_sessions"
+
+    user_id = Column(String(255), primary_key=True, index=True)
+    summary = Column(Text, default="")
+    memory_collection = Column(String(255), nullable=False)
+    turns = Column(Integer, default=0)
+    last_active = Column(DateTime(timezone=True), index=True)
+
+__export__ = ["AgentSession"]
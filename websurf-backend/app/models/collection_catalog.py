@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime
+from app.services.db import Base
+
+# Collection Catalog table
+class CollectionRecord(Base):
+    __tablename__ = "collection_catalog"
+
+    name = Column(String(255), primary_key=True, index=True)
+    description = Column(Text, default="")
+    embedding_model = Column(String(255))
+    dimension = Column(Integer)
+    chunk_count = Column(Integer, default=0)
+    byte_size = Column(BigInteger, default=0)
+    created_at = Column(DateTime(timezone=True))
+    last_updated = Column(DateTime(timezone=True))
+
+__export__ = ["CollectionRecord"]
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, text
+from app.services.db import Base
+
+# Ingestion Job table
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String(36), primary_key=True, index=True)
+    collection_name = Column(String(255), nullable=False, index=True)
+    description = Column(Text, default="")
+    source_type = Column(String(20), nullable=False)  # 'text', 'pdf_url' or 'file'
+    source = Column(Text, nullable=False)  # text content, url, or path of the spooled upload
+    source_name = Column(String(255))
+    status = Column(String(20), nullable=False, index=True)
+    pages_parsed = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    chunks_indexed = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))  # heartbeat while running
+
+    # at most one running job per collection, across every worker process
+    __table_args__ = (
+        Index("uq_ingestion_jobs_running_collection", "collection_name", unique=True,
+              postgresql_where=text("status = 'running'"), sqlite_where=text("status = 'running'")),
+    )
+
+__export__ = ["IngestionJob"]
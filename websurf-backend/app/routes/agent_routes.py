@@ -1,13 +1,24 @@
 ## Imports
-from fastapi import APIRouter, HTTPException
+import json
+import asyncio
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.schemas.response_schema import AgentRequest, AgentResponse
 # from markdown import markdown   
 from app.services.agent_service import (
     run_agent_task,
     AgentMode,
     SupportDependencies,
-    avilable_collections,
+    summary_scheduler,
 )
+from app.services.collection_catalog import collection_catalog
+from app.services.session_store import session_store
+from app.services.mcp_pool import mcp_pool
+from app.services.browser_toolset import tool_output_cache
+from app.services.web_search import web_search
+from app.services.auth_service import get_current_user
+from app.schemas.auth_schema import UserData
 
 ## Router instance
 agent_router = APIRouter(prefix="/agent", tags=["AI Agent"])
@@ -18,15 +29,18 @@ async def root():
     return {"message": "Agent router is active."}
 
 @agent_router.post("/run", response_model=AgentResponse)
-async def run_agent(request: AgentRequest):
+async def run_agent(request: AgentRequest, current_user: Annotated[UserData, Depends(get_current_user)]):
     """
     Run AI agent in the selected mode.
     Modes:
     - RAG   : Retrieve and answer factual queries
     - TALK  : Chat conversationally 
+    Conversation memory and summary are kept per authenticated user.
     """
     try:
         mode = request.mode.lower()
+        session = await session_store.get(current_user.username)
+        usage = {}
 
         # PLAN mode - learning journey planner
 
@@ -36,13 +50,16 @@ async def run_agent(request: AgentRequest):
                 raise HTTPException(status_code=400, detail="Query is required for RAG mode.")
             state_result = await run_agent_task(
                 mode='rag',
-                query=request.query
+                query=request.query,
+                session=session,
+                report=usage
             )
             result: str = state_result
             return AgentResponse(
                 mode=AgentMode.RAG,
                 result=result,
-                available_collections=avilable_collections
+                available_collections=await collection_catalog.descriptions(),
+                usage=usage or None
             )
         # TALK mode - conversational chat
         elif mode == AgentMode.TALK:
@@ -50,13 +67,16 @@ async def run_agent(request: AgentRequest):
                 raise HTTPException(status_code=400, detail="Query is required for TALK mode.")
             state_result = await run_agent_task(
                 mode='talk',
-                query=request.query
+                query=request.query,
+                session=session,
+                report=usage
             )
             result: str = state_result
             return AgentResponse(
                 mode=AgentMode.TALK,
                 result=result,
-                available_collections=avilable_collections
+                available_collections=await collection_catalog.descriptions(),
+                usage=usage or None
             )
 
         # Invalid mode
@@ -67,18 +87,72 @@ async def run_agent(request: AgentRequest):
         raise HTTPException(status_code=500, detail=f"Agent execution failed: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@agent_router.post("/run/stream")
+async def run_agent_stream(request: AgentRequest, current_user: Annotated[UserData, Depends(get_current_user)]):
+    """
+    Streaming variant of /agent/run as Server-Sent Events:
+    a `context` event with prompt token counts, `text` deltas, `tool_call` /
+    `tool_result` events, then one `final` event carrying the AgentResponse (or `error`).
+    """
+    modes = {AgentMode.RAG: 'rag', AgentMode.TALK: 'talk'}
+    mode = request.mode.lower()
+    if mode not in modes:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {request.mode}")
+    if not request.query:
+        raise HTTPException(status_code=400, detail=f"Query is required for {mode.upper()} mode.")
+    session = await session_store.get(current_user.username)
+    queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            usage = {}
+            result = await run_agent_task(mode=modes[mode], query=request.query, session=session,
+                                          on_event=queue.put, report=usage)
+            response = AgentResponse(mode=mode, result=result,
+                                     available_collections=await collection_catalog.descriptions(),
+                                     usage=usage or None)
+            await queue.put({"event": "final", "data": response.model_dump()})
+        except Exception as e:
+            await queue.put({"event": "error", "data": {"detail": str(e)}})
+        finally:
+            await queue.put(None)
+
+    async def events():
+        task = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                yield _sse(item["event"], item["data"])
+        finally:
+            # client went away: stop the run instead of finishing it unseen
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @agent_router.get("/collections")
 async def get_available_collections():
-    """Return all available RAG embedding collections."""
+    """Return all available RAG embedding collections with their statistics."""
     try:
-        if not avilable_collections:
+        collections = await collection_catalog.records()
+        if not collections:
             return {"message": "No collections available."}
-        return {"available_collections": avilable_collections}
+        return {"available_collections": collections}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching collections: {str(e)}")
 
 
+@agent_router.get("/stats")
+async def get_agent_stats():
+    """Report background summarization, browser pool, browser tool output and web search stats for this worker."""
+    return {"summaries": summary_scheduler.stats(), "browser_pool": mcp_pool.stats(),
+            "tool_output": tool_output_cache.stats(), "web_search": web_search.stats()}
+
+
 @agent_router.get("/time")
 async def get_current_time():
     """Return the current system date and time."""
-    return {"datetime": SupportDependencies.getCurrentDateTime()}
+    return {"datetime": await SupportDependencies.getCurrentDateTime()}
@@ -1,13 +1,24 @@
 ##imports
-from fastapi import APIRouter, HTTPException, Form, UploadFile, File
+from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import logging
+import asyncio
 from app.services.rag_pipeline import RagPipeline
-from app.services.rag_service import data_injestion,query_engine,delete_data,clear_collections
+from app.services.rag_service import (data_injestion,query_engine,batch_query_engine,delete_data,clear_collections,
+                                      quantization_report)
 import os
-from app.schemas.response_schema import AddDocumentResponse, SearchRequest, SearchResponse, Document
-from app.services.agent_service import avilable_collections
+from app.schemas.response_schema import (AddDocumentResponse, SearchRequest, SearchResponse, Document,
+                                         BatchSearchRequest, BatchSearchResponse)
+from app.services.embedder_registry import embedder_registry
+from app.services.embedding_cache import query_embedding_cache
+from app.services.compute_executor import compute_executor, ingestion_executor, ComputeBusyError
+from app.services.pdf_downloader import pdf_downloader, DownloadError
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.vector_store import vector_store
+from app.services.response_cache import response_cache
+from app.services.context_builder import context_builder
+from app.services.collection_catalog import SESSION_COLLECTION_PREFIX
 
  ##reset the present embeddings info
 
@@ -18,18 +29,32 @@ rag_router = APIRouter(tags=["RAG Routes"])
 
 ## API Endpoints 
 
-@rag_router.post("/api/rag/add", status_code=201)
+def _check_collection(collection_name: str):
+    # conversation memory is reachable only through the agent, by its owner
+    if collection_name.startswith(SESSION_COLLECTION_PREFIX):
+        raise HTTPException(status_code=403, detail=f"Collections starting with '{SESSION_COLLECTION_PREFIX}' "
+                                                    "are private to their session.")
+
+def _public_job(job: dict) -> dict:
+    # job status without the raw source payload
+    return {key: value for key, value in job.items() if key != "source"}
+
+@rag_router.post("/api/rag/add", status_code=202)
 async def add_document(
+    response: Response,
     collection_name: str = Form("learning_notes"),
-    description:str=Form('describe content'),
+    description: Optional[str] = Form(None, description="Collection description; keeps the current one when omitted."),
     text: Optional[str] = Form(None, description="Raw text to embed."),
     pdf_url: Optional[str] = Form(None, description="PDF URL to embed."),
-    file: Optional[UploadFile] = File(None, description="Upload a file to embed.")
+    file: Optional[UploadFile] = File(None, description="Upload a file to embed."),
+    wait: bool = Form(False, description="Block until the document is indexed instead of queueing a job.")
 ):
     """
     Add a document to a RAG collection.
     Only one of `text`, `pdf_url`, or `file` should be provided.
+    By default ingestion runs as a background job; poll `/api/rag/jobs/{job_id}` for progress.
     """
+    _check_collection(collection_name)
     sources = [text, pdf_url, file and file.filename]
     if sum(bool(s) for s in sources) != 1:
         raise HTTPException(
@@ -37,6 +62,24 @@ async def add_document(
             detail="Please provide exactly one of 'text', 'pdf_url', or 'file'."
         )
 
+    if not wait:
+        try:
+            if text:
+                job = await ingestion_jobs.submit(collection_name, description, "text", text)
+            elif pdf_url:
+                job = await ingestion_jobs.submit(collection_name, description, "pdf_url", pdf_url)
+            else:
+                await file.seek(0)
+                path = await asyncio.to_thread(ingestion_jobs.save_upload, file.file, file.filename)
+                job = await ingestion_jobs.submit(collection_name, description, "file", path,
+                                                  source_name=file.filename)
+            logger.info(f"Queued ingestion job {job['id']} for collection: {collection_name}")
+            return {"message": "Document queued for ingestion.", "job_id": job["id"], "status": job["status"]}
+        except Exception as e:
+            logger.error(f"Failed to queue document: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    response.status_code = 201
     try:
         if text:
             logger.info(f"Adding text document to collection: {collection_name}")
@@ -47,24 +90,49 @@ async def add_document(
         elif file:
             logger.info(f"Adding file '{file.filename}' to collection: {collection_name}")
             await file.seek(0)
-            await data_injestion(pdf_path=file.file, collection_name=collection_name,description=description)
+            await data_injestion(pdf_path=file.file, collection_name=collection_name,description=description,
+                                 source=file.filename)
 
         return {"message": "Document added and embedded successfully."}
 
-    except Exception as e:
-        logger.error(f"Failed to add document: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    except ComputeBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except DownloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     except Exception as e:
         logger.error(f"Failed to add document: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@rag_router.get("/api/rag/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    Status and progress of an ingestion job.
+    """
+    job = await ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found.")
+    return _public_job(job)
+
+
+@rag_router.post("/api/rag/jobs/{job_id}/cancel")
+async def cancel_ingestion_job(job_id: str):
+    """
+    Cancel a queued or running ingestion job.
+    """
+    job = await ingestion_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found.")
+    return _public_job(job)
+
+
 @rag_router.post("/api/rag/search", response_model=SearchResponse)
 async def search_documents(request: SearchRequest):
     """
     Search for documents in a collection using a query.
     """
+    _check_collection(request.collection_name)
     try:
         logger.info(f"Searching '{request.collection_name}' for: '{request.query}'")
         search_results = await query_engine(
@@ -84,15 +152,65 @@ async def search_documents(request: SearchRequest):
 
         return SearchResponse(query=request.query, results=results)
 
+    except ComputeBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Search error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@rag_router.post("/api/rag/search/batch", response_model=BatchSearchResponse)
+async def batch_search_documents(request: BatchSearchRequest):
+    """
+    Run many searches, possibly across collections, with one encoder call
+    and one query per collection.
+    """
+    for item in request.queries:
+        _check_collection(item.collection_name)
+    try:
+        logger.info(f"Batch search: {len(request.queries)} queries")
+        batch_results = await batch_query_engine(
+            [{"query": item.query, "collection_name": item.collection_name, "k": item.k}
+             for item in request.queries]
+        )
+        return BatchSearchResponse(results=[
+            SearchResponse(
+                query=item.query,
+                results=[Document(page_content=hit["document"],
+                                  metadata={**hit["metadata"], "distance": hit["distance"],
+                                            "score": hit["score"]})
+                         for hit in hits]
+            )
+            for item, hits in zip(request.queries, batch_results)
+        ])
+
+    except ComputeBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch search error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@rag_router.get("/api/rag/collections/{collection_name}/quantization")
+async def collection_quantization(collection_name: str, mode: str = "int8", k: int = 10):
+    """
+    Estimate memory saved and recall lost by storing a collection as float16 or int8.
+    """
+    _check_collection(collection_name)
+    if mode not in ("float32", "float16", "int8"):
+        raise HTTPException(status_code=400, detail="mode must be one of float32, float16, int8.")
+    try:
+        return await quantization_report(collection_name, mode=mode, k=k)
+    except ComputeBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Quantization report failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @rag_router.post("/api/rag/remove_collection/{collection_name}")
 async def remove_collection(collection_name: str):
     """
     Remove a collection.
     """
+    _check_collection(collection_name)
     try:
         if not collection_name:
             raise HTTPException(status_code=400, detail="Collection name must be provided.")
@@ -104,4 +222,20 @@ async def remove_collection(collection_name: str):
         return {"message": f"Collection '{collection_name}' removed successfully."}
     except Exception as e:
         logger.error(f"Failed to remove collection: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@rag_router.get("/api/rag/stats")
+async def rag_stats():
+    """
+    Report cache and model registry statistics.
+    """
+    return {
+        "embedders": embedder_registry.stats(),
+        "query_embeddings": query_embedding_cache.stats(),
+        "compute": compute_executor.stats(),
+        "ingestion_compute": ingestion_executor.stats(),
+        "pdf_downloads": pdf_downloader.stats(),
+        "vector_store": vector_store.backend,
+        "response_cache": response_cache.stats(),
+        "prompt_context": context_builder.stats(),
+    }
@@ -34,6 +34,7 @@ class AgentResponse(BaseModel):
     result: str
     summary: Optional[str] = None
     available_collections: Optional[dict] = None
+    usage: Optional[dict] = None  # prompt token estimates per section and model token usage
     
 #  Pydantic Models For Rag-routes 
 
@@ -53,3 +54,9 @@ class Document(BaseModel):
 class SearchResponse(BaseModel):
     query: str
     results: List[Document]
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(..., min_length=1, description="Searches to run in one batch")
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
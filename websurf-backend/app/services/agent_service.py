@@ -1,18 +1,27 @@
 ## Imports ##
-from typing import TypedDict, Annotated, Sequence, Literal, List, Optional
-from dataclasses import dataclass
+from typing import TypedDict, Annotated, Sequence, Literal, List, Optional, Callable, Awaitable
+from dataclasses import dataclass, field
 from pydantic import BaseModel
 from pydantic_ai import Agent, RunContext, ModelMessage
 from datetime import datetime
 from app.schemas.agent_schema import AgentState, AgentMode, SummaryState
-from app.services.rag_service import avilable_collections, query_engine, data_injestion
-from ddgs import DDGS
+from app.services.rag_service import query_engine, search_collections
+from app.services.collection_catalog import collection_catalog, SESSION_COLLECTION_PREFIX
+from app.services.session_store import session_store, SessionState
+from app.services.session_memory import session_memory
+from app.services.response_cache import response_cache
+from app.services.context_builder import context_builder, PromptContext
+from app.services.summary_scheduler import SummaryScheduler
+from app.services.mcp_pool import mcp_pool
+from app.services.browser_toolset import BrowserOutputToolset
+from app.services.web_search import web_search
+from app.config import PROMPT_MEMORY_RESULTS
 import chromadb
 import os
 import asyncio
+import time
 from dotenv import load_dotenv
 import json
-from pathlib import Path
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -38,74 +47,43 @@ summarize_agent = Agent(
     system_prompt="You are a helpful assistant that summarizes conversations into concise summaries."
 )
 
-SESSION_SUMMARY_HISTORY = ''  # Initialize empty session summary history
-SESSION_LIMIT_THRESHOLD = -1  # max tokens for session history
-
-
-def get_browser_script_path():
-    """Find the browser-mcp.js script path"""
-    # Try environment variable first
-    env_path = os.getenv('MCP_BROWSER_SCRIPT_PATH')
-    if env_path and os.path.exists(env_path):
-        return env_path
-    
-    # Get the current file's directory and go up to project root
-    current_file = Path(__file__).resolve()
-    
-    # Try relative paths - updated for new structure
-    script_paths = [
-        # From websurf-backend/app/services/ -> project root
-        current_file.parent.parent.parent.parent / 'websurf-mcp' / 'browser-mcp.js',
-        # From websurf-backend/app/ -> project root  
-        current_file.parent.parent.parent / 'websurf-mcp' / 'browser-mcp.js',
-        # Legacy paths (string based)
-        '../../websurf-mcp/browser-mcp.js',
-        '../../../websurf-mcp/browser-mcp.js',
-        'websurf-mcp/browser-mcp.js',
-        'browser-mcp.js',
-        '../websurf-mcp/browser-mcp.js',
-    ]
-    
-    for path in script_paths:
-        if isinstance(path, Path):
-            abs_path = path
-        else:
-            abs_path = Path(path).resolve()
-        
-        if abs_path.exists():
-            print(f"Found browser script at: {abs_path}")
-            return str(abs_path)
-    
-    print(f"WARNING: Could not find browser-mcp.js. Searched from: {current_file}")
-    return None
 
 
 ## Dependencies ##
 @dataclass
 class SupportDependencies:
+    session: SessionState = None  # the calling user's session
+    consulted: set = field(default_factory=set)  # collections read during the run, for the response cache
+    used_memory: bool = False  # a tool returned entries of the session's own memory
+
     ## RAG Dependencies ##
+    @staticmethod
     async def getPresentEmbeddingsInfo() -> str:
-        result = []
-        for key, value in avilable_collections.items():
-            result.append(f"{key}: {value}\n")
-        return "".join(result) if result else "No collections available in the database."
-
-    async def getConversationSummary(query: str, n_results: int = 10) -> str:
+        # cached catalog read, shared by every worker
+        result = await collection_catalog.describe()
+        return result if result else "No collections available in the database."
+
+    async def getConversationMemory(self, query: str, n_results: int = 10) -> list[str]:
+        """ Best-matching entries of this session's memory; empty when there are none yet """
+        if self.session is None:
+            return []
         try:
-            retrieved_text = await retrieveFromEmbeddings(
-                collection_name="current_session",
+            return await query_engine(
+                collection_name=self.session.memory_collection,
                 query=query,
                 n_results=n_results
             )
-            if "Error" in retrieved_text or "No relevant" in retrieved_text:
-                return "No relevant conversation history found."
-            content_start = retrieved_text.find(":\n\n")
-            if content_start != -1:
-                return retrieved_text[content_start + 3:]
-            return retrieved_text
         except Exception as e:
-            return f"Error getting conversation summary: {str(e)}"
+            print(f"No conversation memory for {self.session.user_id}: {e}")
+            return []
+
+    async def getConversationSummary(self, query: str, n_results: int = 10) -> str:
+        results = await self.getConversationMemory(query=query, n_results=n_results)
+        if not results:
+            return "No relevant conversation history found."
+        return "\n\n---\n\n".join(results)
 
+    @staticmethod
     async def getCurrentDateTime() -> str:
         now = datetime.now()
         return f"Current date and time: {now.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -120,47 +98,52 @@ async def format_results_for_llm(results: list) -> str:
         title = item.get('title', '').strip()
         body = item.get('body', item.get('snippet', '')).strip()
         date = item.get('date', 'N/A').strip()
+        url = (item.get('href') or item.get('url') or '').strip()
         if title and body:
-            formatted = f"[{date}] {title}\n{body}\n"
+            formatted = f"[{date}] {title}\n{url}\n{body}\n" if url else f"[{date}] {title}\n{body}\n"
             lines.append(formatted)
     return "\n".join(lines) if lines else "No valid results found."
 
 
+def resolve_collection(deps: SupportDependencies, collection_name: str) -> str:
+    """ Map 'current_session' to the caller's memory collection; other users' sessions are off limits """
+    own = deps.session.memory_collection if deps and deps.session else None
+    if collection_name == "current_session" and own:
+        return own
+    if collection_name.startswith(SESSION_COLLECTION_PREFIX) and collection_name != own:
+        raise PermissionError(f"Collection '{collection_name}' belongs to another session.")
+    return collection_name
+
+
 ## Tools Definitions ##
 @agent.tool
 @summarize_agent.tool
-async def queryAllEmbeddings(ctx: RunContext[SupportDependencies], query: str, n_results: int = 5) -> str:
+async def queryAllEmbeddings(ctx: RunContext[SupportDependencies], query: str, n_results: int = 5,
+                             collection_names: Optional[List[str]] = None) -> str:
     """
     Find information available in the memory, useful to answer specific questions about the learning content
     and to find memory of past conversations. If nothing is found, fallback to web search.
-    Always try 'current_session' first, then all other embeddings.
+    Searches 'current_session' and all other embeddings at once (or only `collection_names`)
+    and returns the best matches overall.
     """
     try:
-        # Always try 'current_session' first
-        if 'current_session' in avilable_collections:
-            result = await retrieveFromEmbeddings(
-                ctx, 
-                collection_name='current_session', 
-                query=query, 
-                n_results=n_results
-            )
-            if result and "No relevant" not in result and "Error" not in result:
-                return f"Answer from 'current_session':\n{result}"
-
-        # Then try all other embeddings
-        for collection_name in avilable_collections.keys():
-            if collection_name == 'current_session':
-                continue
-            result = await retrieveFromEmbeddings(
-                ctx, 
-                collection_name=collection_name, 
-                query=query, 
-                n_results=n_results
-            )
-            if result and "No relevant" not in result and "Error" not in result:
-                return f"Answer from '{collection_name}' collection:\n{result}"
-        
-        return "No relevant information found in embeddings."
+        if collection_names:
+            collection_names = [resolve_collection(ctx.deps, name) for name in collection_names]
+        else:
+            collection_names = await collection_catalog.names()
+            own = ctx.deps.session.memory_collection if ctx.deps and ctx.deps.session else None
+            if own and own in await collection_catalog.names(include_sessions=True):
+                collection_names.append(own)
+        ctx.deps.consulted.update(collection_names)
+        hits = await search_collections(query=query, collection_names=collection_names, n_results=n_results)
+        if not hits:
+            return "No relevant information found in embeddings."
+        if any(hit["collection"].startswith(SESSION_COLLECTION_PREFIX) for hit in hits):
+            ctx.deps.used_memory = True
+        formatted = "\n\n---\n\n".join(
+            f"[{hit['collection']}, page {hit['metadata'].get('page', '?')}] {hit['document']}" for hit in hits
+        )
+        return f"Top {len(hits)} matches across collections:\n\n{formatted}"
     except Exception as e:
         return f"Error querying embeddings: {str(e)}"
 
@@ -176,12 +159,16 @@ async def retrieveFromEmbeddings(
 ) -> str:
     """Find relevant information from available memory content/embeddings"""
     try:
+        collection_name = resolve_collection(ctx.deps, collection_name)
+        ctx.deps.consulted.add(collection_name)
         results = await query_engine(
             collection_name=collection_name,
             query=query,
             n_results=n_results,
             db_path=db_path
         )
+        if results and collection_name.startswith(SESSION_COLLECTION_PREFIX):
+            ctx.deps.used_memory = True
         formatted_results = "\n\n---\n\n".join(results)
         return f"Retrieved {len(results)} relevant chunks:\n\n{formatted_results}"
     except Exception as e:
@@ -192,17 +179,28 @@ async def retrieveFromEmbeddings(
 async def logConversation(ctx: RunContext[SupportDependencies], user_message: str, ai_response: str) -> str:
     """Log the conversation turn to 'current_session' embedding"""
     try:
-        formatted_turn = f"User: {user_message}\nAI: {ai_response}\nTimestamp: {datetime.now().isoformat()}"
-        await data_injestion(
-            text_content=formatted_turn,
-            collection_name="current_session",
-            description="Current learning session conversation history"
-        )
+        # one encoder call per turn; old turns are compacted into summaries
+        await session_memory.append(resolve_collection(ctx.deps, "current_session"), user_message, ai_response)
         return "Successfully logged conversation turn to 'current_session'."
     except Exception as e:
         return f"Error logging conversation turn: {str(e)}"
 
 
+@agent.tool
+async def webSearch(ctx: RunContext[SupportDependencies], query: str, variants: Optional[List[str]] = None,
+                    max_results: int = 5) -> str:
+    """
+    Search the web for current information and return titles, URLs and snippets.
+    Pass a few rephrasings of the query as `variants` to widen the search; they run at once.
+    Prefer this over the browser tools to find pages; open a result with the browser only to read it in full.
+    """
+    try:
+        results = await web_search.search([query, *(variants or [])], max_results=max_results)
+        return await format_results_for_llm(results)
+    except Exception as e:
+        return f"Error searching the web: {str(e)}"
+
+
 @agent.tool
 async def calculateExpression(ctx: RunContext[SupportDependencies], expression: str) -> str:
     """Safely evaluate a mathematical expression or use it to answer calculation queries"""
@@ -214,66 +212,69 @@ async def calculateExpression(ctx: RunContext[SupportDependencies], expression:
         return f"Error calculating expression: {str(e)}"
 
 
-async def get_memory_snippet(query_context: str = "", n_results: int = 10) -> str:
-    """
-    Retrieves relevant context from chat history stored in 'current_session' embedding.
-    Always use it if you need past conversation context or think user is asking something 
-    related to past conversation.
-    Returns empty string if nothing is found.
-    """
-    memory = await SupportDependencies.getConversationSummary(query=query_context, n_results=n_results)
-    if "No relevant" in memory or "Error" in memory:
-        return ""
-    return f"Relevant past conversation:\n{memory}\n"
-
-
 ## Prompts ##
-async def get_base_context() -> str:
-    """Build the base agent context dynamically with awaited embeddings info."""
-    embeddings_info = await SupportDependencies.getPresentEmbeddingsInfo()
-    return f"""
+BASE_CONTEXT = """
 You are an intelligent educational assistant with access to:
 1. Conversation long-term memory using Retrieval-Augmented Generation (RAG) system
-2. Browser automation tools via MCP server (openPage, clickElement, typeText, etc.)
-
-Available embeddings:
-{embeddings_info}
+2. Web search (`webSearch`) for quick lookups of current information
+3. Browser automation tools via MCP server (openPage, clickElement, typeText, etc.)
+"""
 
+BASE_TASKS = """
 The 'current_session' collection contains the conversation history of the current learning session.
 
 Tasks:
 1. Analyze and try to find the summary of previous conversation
 2. Draft its summary in your answer
 3. Identify key points and form a well-detailed answer
-4. Use browser tools when you need to interact with web pages
-
-Query is --> \n\n
+4. Use `webSearch` to find information online, and browser tools when you need to read or interact with web pages
 """
 
-
-async def rag_query_prompt(query_context: str = ""):
-    memory = await get_memory_snippet(query_context)
-    return f"""{await get_base_context()}
-{memory}
-Retrieve and answer any factual or conceptual question:
+MODE_INSTRUCTIONS = {
+    'rag': """Retrieve and answer any factual or conceptual question:
 - Use the `queryAllEmbeddings` tool to find relevant info from embeddings
-- If you need to browse a specific website, use the MCP browser tools
+- If the embeddings do not cover it, use `webSearch`; browse a specific website with the MCP browser tools
 - Cite the relevant embedding collection in your answer
-{query_context}
-"""
-
-
-async def talk_prompt(query_context: str = ""):
-    memory = await get_memory_snippet(query_context)
-    return f"""{await get_base_context()}
-{memory}
-Engage in natural conversation while leveraging available knowledge:
+""",
+    'talk': """Engage in natural conversation while leveraging available knowledge:
 - Use conversational, friendly tone
 - Reference available embeddings when relevant using `queryAllEmbeddings`
-- Use browser MCP tools to access real-time web content when needed
+- Use `webSearch` for real-time information and browser MCP tools to read or interact with pages
 - Keep responses concise and engaging
-{query_context}
-"""
+""",
+}
+# modes whose prompt carries the session's memory and summary; rag answers come
+# from the shared collections alone, so the response cache can share them
+SESSION_CONTEXT_MODES = {'talk'}
+
+
+async def build_prompt(mode: Literal['rag', 'talk'], deps: SupportDependencies, query: str) -> PromptContext:
+    """ Prompt for one turn, each section held to its token budget """
+    if mode not in MODE_INSTRUCTIONS:
+        raise ValueError(f"Invalid mode: {mode}")
+    if mode in SESSION_CONTEXT_MODES:
+        # catalog and memory lookups overlap
+        collection_lines, memory = await asyncio.gather(
+            collection_catalog.describe_lines(),
+            deps.getConversationMemory(query=query, n_results=PROMPT_MEMORY_RESULTS)
+        )
+        summary = deps.session.summary if deps.session else ""
+    else:
+        collection_lines, memory, summary = await collection_catalog.describe_lines(), [], ""
+    collections = context_builder.collections(collection_lines, query)
+    memory = context_builder.memory(memory)
+    summary = context_builder.summary(summary)
+    base, tasks, instructions = context_builder.system(
+        [("base", BASE_CONTEXT), ("tasks", BASE_TASKS), (mode, MODE_INSTRUCTIONS[mode])])
+    return context_builder.assemble([
+        ("system", base),
+        ("collections", "Available embeddings:\n" + (collections or "No collections available in the database.\n")),
+        ("system", tasks),
+        ("memory", memory and f"Relevant past conversation:\n{memory}\n"),
+        ("system", instructions),
+        ("summary", summary and f"Conversation summary so far:\n{summary}\n"),
+        ("query", "Query is --> " + context_builder.query(query)),
+    ])
 
 
 async def summarize_conversation_prompt(conversation_history: str = "", query_context: str = "", new_message: str = ''):
@@ -337,19 +338,19 @@ User: How do I reset my password? | AI: You can reset your password by clicking
 
 
 async def run_summarize_agent_task(
+    session: SessionState,
     query: str = "",
     new_message: str = "",
     agent: Agent = summarize_agent
 ):
-    global SESSION_SUMMARY_HISTORY
     try:
         summary_result = await agent.run(
             await summarize_conversation_prompt(
-                conversation_history=SESSION_SUMMARY_HISTORY,
+                conversation_history=session.summary,
                 query_context=query,
                 new_message=new_message
             ),
-            deps=SupportDependencies,
+            deps=SupportDependencies(session=session),
             output_type=SummaryState,
         )
         print("Summary Agent Output:", summary_result)
@@ -357,14 +358,16 @@ async def run_summarize_agent_task(
         
         # Fix: Handle different output types
         if hasattr(summary_result.output, 'summary'):
-            SESSION_SUMMARY_HISTORY = summary_result.output.summary
+            summary = summary_result.output.summary
         elif hasattr(summary_result.output, 'output'):
-            SESSION_SUMMARY_HISTORY = summary_result.output.output
+            summary = summary_result.output.output
         else:
             # Fallback: convert to string
-            SESSION_SUMMARY_HISTORY = str(summary_result.output)
+            summary = str(summary_result.output)
         
-        print("Session summary updated:", SESSION_SUMMARY_HISTORY)
+        # persisted per user, so any worker serves the next turn
+        await session_store.update(session.user_id, summary=summary)
+        print(f"Session summary updated for {session.user_id}:", summary)
         
     except Exception as e:
         print(f"Error in summarize agent: {e}")
@@ -373,140 +376,156 @@ async def run_summarize_agent_task(
         return 'Error summarizing conversation.'
 
 
-## Fixed MCP Client Management ##
-_mcp_client_instance = None
-_mcp_client_lock = asyncio.Lock()
-_mcp_cleanup_task = None
-
-async def get_or_create_mcp_client():
-    """Singleton MCP client to keep browser alive across requests"""
-    global _mcp_client_instance
-    
-    async with _mcp_client_lock:
-        if _mcp_client_instance is None:
-            browser_script = get_browser_script_path()
-            if not browser_script:
-                print("WARNING: browser-mcp.js not found, browser tools disabled")
-                return None
-            
-            from pydantic_ai.mcp import MCPServerStdio
-            
-            _mcp_client_instance = MCPServerStdio(
-                command='node',
-                args=[browser_script],
-                timeout=60,
-                env=os.environ.copy()
-            )
-            
-            try:
-                # Initialize the connection (this starts the browser)
-                await _mcp_client_instance.__aenter__()
-                print(f"MCP browser client initialized with script: {browser_script}")
-            except Exception as e:
-                print(f"Failed to initialize MCP client: {e}")
-                _mcp_client_instance = None
-                return None
-        
-        return _mcp_client_instance
+async def summarize_session_turns(user_id: str, turns: list):
+    """ One summarize_agent run over every turn a session queued since its last summary """
+    session = await session_store.get(user_id)  # latest summary, possibly written by another worker
+    if len(turns) == 1:
+        query, new_message = turns[0]
+    else:
+        query = "\n".join(f"[{n}] {q}" for n, (q, _) in enumerate(turns, start=1))
+        new_message = "\n".join(f"[{n}] {a}" for n, (_, a) in enumerate(turns, start=1))
+    await run_summarize_agent_task(session, query=query, new_message=new_message)
 
 
-async def cleanup_mcp_client():
-    """Cleanup function to call on app shutdown - FIXED"""
-    global _mcp_client_instance, _mcp_cleanup_task
-    
-    async with _mcp_client_lock:
-        if _mcp_client_instance is not None:
-            print("Cleaning up MCP client...")
-            try:
-                # Cancel any pending cleanup task
-                if _mcp_cleanup_task and not _mcp_cleanup_task.done():
-                    _mcp_cleanup_task.cancel()
-                    try:
-                        await _mcp_cleanup_task
-                    except asyncio.CancelledError:
-                        pass
-                
-                # Properly exit the context manager
-                try:
-                    await asyncio.wait_for(
-                        _mcp_client_instance.__aexit__(None, None, None),
-                        timeout=5.0
-                    )
-                except asyncio.TimeoutError:
-                    print("MCP client cleanup timed out")
-                except Exception as e:
-                    print(f"Error during MCP client cleanup: {e}")
-                
-                print("MCP client connection closed")
-            except Exception as e:
-                print(f"Error closing MCP client: {e}")
-            finally:
-                _mcp_client_instance = None
-                _mcp_cleanup_task = None
+summary_scheduler = SummaryScheduler(summarize_session_turns)
 
 
 ## Unified Agent Run Function ##
+CACHEABLE_TOOLS = {"queryAllEmbeddings", "retrieveFromEmbeddings", "calculateExpression"}
+
+def is_cacheable(result) -> bool:
+    """ Answers built without browser pages or web results; those go stale """
+    for message in result.all_messages():
+        for part in message.parts:
+            if part.part_kind == "tool-call" and part.tool_name not in CACHEABLE_TOOLS:
+                return False
+    return True
+
+def is_personal(deps: SupportDependencies, prompt: PromptContext) -> bool:
+    """ Answers built on the session's summary or memory: in the prompt, or returned by a tool """
+    return bool(prompt.tokens.get("summary") or prompt.tokens.get("memory") or deps.used_memory)
+
+async def stream_agent_run(agent: Agent, prompt: str, deps: SupportDependencies, toolsets: list,
+                           on_event: Callable[[dict], Awaitable]):
+    """ agent.run as a stream, forwarding text deltas and tool calls to on_event; returns the run result """
+    # plain text output, so the answer itself arrives as text deltas
+    async with agent.iter(prompt, deps=deps, output_type=str, toolsets=toolsets) as run:
+        async for node in run:
+            if not (Agent.is_model_request_node(node) or Agent.is_call_tools_node(node)):
+                continue
+            async with node.stream(run.ctx) as events:
+                async for event in events:
+                    kind = event.event_kind
+                    if kind == "part_start" and event.part.part_kind == "text" and event.part.content:
+                        await on_event({"event": "text", "data": {"delta": event.part.content}})
+                    elif kind == "part_delta" and event.delta.part_delta_kind == "text":
+                        await on_event({"event": "text", "data": {"delta": event.delta.content_delta}})
+                    elif kind == "function_tool_call":
+                        await on_event({"event": "tool_call", "data": {
+                            "id": event.part.tool_call_id, "tool": event.part.tool_name, "args": event.part.args}})
+                    elif kind == "function_tool_result":
+                        part = getattr(event, "part", None) or event.result  # `result` in pydantic-ai 1.x
+                        await on_event({"event": "tool_result", "data": {
+                            "id": part.tool_call_id, "tool": part.tool_name,
+                            "ok": part.part_kind == "tool-return"}})
+    return run.result
+
 async def run_agent_task(
     mode: Literal['rag', 'talk'],
     query: str = "",
     topic: str = "",
-    agent: Agent = agent
+    agent: Agent = agent,
+    session: SessionState = None,
+    on_event: Callable[[dict], Awaitable] = None,
+    report: dict = None
 ):
-    global SESSION_SUMMARY_HISTORY
-    
+    """
+    Run the agent for one turn and return its answer. With `on_event` the run is
+    streamed: text deltas, tool calls and tool results are passed to it as they happen,
+    and errors are raised instead of returned as the answer.
+    `report`, when given, is filled with prompt token estimates and the model's usage.
+    """
     try:
-        # Get or create persistent MCP client (singleton)
-        mcp_client = await get_or_create_mcp_client()
-        
-        # Prepare toolsets
-        toolsets = []
-        if mcp_client:
-            toolsets.append(mcp_client)
-            print("Using persistent MCP browser client")
-        else:
-            print("WARNING: MCP client not available, browser tools disabled")
-        
-        # Run agent based on mode
-        if mode == 'rag':
-            result = await agent.run(
-                await rag_query_prompt(query_context=SESSION_SUMMARY_HISTORY + query),
-                deps=SupportDependencies,
-                output_type=AgentState,
-                toolsets=toolsets
-            )
-        elif mode == 'talk':
-            result = await agent.run(
-                await talk_prompt(query_context=SESSION_SUMMARY_HISTORY + query),
-                deps=SupportDependencies,
-                output_type=AgentState,
-                toolsets=toolsets
-            )
-        else:
-            raise ValueError(f"Invalid mode: {mode}")
-
-        # Update session summary history in background
-        async def background_summarize():
-            try:
-                await run_summarize_agent_task(query=query, new_message=str(result.output))
-            except Exception as e:
-                print(f"Background summarization failed: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        asyncio.create_task(background_summarize())
-        
+        # callers outside a request (scripts, tests) share one anonymous session
+        if session is None:
+            session = await session_store.get("anonymous")
+        deps = SupportDependencies(session=session)
+
+        # semantically repeated questions skip the model call
+        embedding = None
+        if response_cache.enabled:
+            embedding = await response_cache.embed(query)
+            cached = await response_cache.lookup(mode, embedding, session.user_id)
+            if cached is not None:
+                if on_event is not None:
+                    await on_event({"event": "text", "data": {"delta": cached}})
+                await session_store.record_turn(session.user_id)
+                summary_scheduler.submit(session.user_id, query, cached)
+                return cached
+        started = time.perf_counter()
+
+        # Lease a browser worker for this run; concurrent sessions never share pages
+        async with mcp_pool.lease(session.user_id) as mcp_client:
+            # Prepare toolsets
+            toolsets = []
+            if mcp_client:
+                # page extractions are cached and size-capped before reaching the model
+                toolsets.append(BrowserOutputToolset(mcp_client))
+                print("Using pooled MCP browser worker")
+            else:
+                print("WARNING: MCP client not available, browser tools disabled")
+
+            # Build prompt based on mode, within the section token budgets
+            prompt = await build_prompt(mode, deps, query)
+            print(f"Prompt tokens (estimated): {prompt.tokens}")
+            if report is not None:
+                report["prompt_tokens"] = prompt.tokens
+            if on_event is not None:
+                await on_event({"event": "context", "data": {"prompt_tokens": prompt.tokens}})
+
+            if on_event is None:
+                result = await agent.run(prompt.text, deps=deps, output_type=AgentState, toolsets=toolsets)
+            else:
+                result = await stream_agent_run(agent, prompt.text, deps, toolsets, on_event)
+        if report is not None:
+            usage = result.usage()
+            report["model_usage"] = {"input_tokens": usage.input_tokens, "output_tokens": usage.output_tokens,
+                                     "requests": usage.requests}
+        await session_store.record_turn(session.user_id)
+
+        # Update session summary in background, coalesced per session
+        summary_scheduler.submit(session.user_id, query, str(result.output))
+
         print("Agent output:", result.output)
         
         # Handle different output types from AgentState
         if hasattr(result.output, 'output'):
-            return result.output.output
+            answer = result.output.output
         elif isinstance(result.output, str):
-            return result.output
+            answer = result.output
         else:
-            return str(result.output)
+            answer = str(result.output)
+
+        if embedding is not None:
+            if is_cacheable(result):
+                # personal answers are cached for their owner only; shared ones do not
+                # depend on the session's memory, so its updates leave them valid
+                if is_personal(deps, prompt):
+                    owner, collections = session.user_id, deps.consulted
+                else:
+                    owner = None
+                    collections = {name for name in deps.consulted if not name.startswith(SESSION_COLLECTION_PREFIX)}
+                await response_cache.store(mode, query, embedding, answer, collections,
+                                           time.perf_counter() - started, user_id=owner)
+            else:
+                response_cache.skip()
+        return answer
             
     except Exception as e:
         print(f"Error in run_agent_task: {e}")
         import traceback
         traceback.print_exc()
+        if on_event is not None:
+            # the stream reports it as its one `error` event, with no `final` after it
+            raise
         return f"Error processing request: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,292 @@
+## imports ##
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from html.parser import HTMLParser
+from pydantic_ai.toolsets import WrapperToolset
+from app.services.compute_executor import compute_executor
+from app.services.context_builder import CHARS_PER_TOKEN, estimate_tokens
+from app.config import TOOL_OUTPUT_TOKENS, TOOL_CACHE_TTL_SECONDS, TOOL_CACHE_SIZE
+
+# browser-mcp.js tools returning page content: cached, compacted and split into chunks
+EXTRACT_TOOLS = {"extractText", "getInnerHTML", "getOuterHTML"}
+# tools with small results that leave the page as it is; every other tool may change it
+PASSIVE_TOOLS = {"getURL", "getTitle", "getAttribute", "listPages", "screenshot"}
+HTML_TOOLS = {"getInnerHTML", "getOuterHTML"}
+# called by the browser pool between sessions, never offered to the model
+POOL_TOOLS = {"resetSession"}
+
+# markup the model never needs to answer or pick a selector
+DROPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "canvas", "head"}
+KEPT_ATTRS = {"id", "class", "name", "href", "type", "role", "aria-label", "placeholder", "value", "title",
+              "alt", "for", "action", "src"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+MAX_ATTR_CHARS = 120
+_SPACE_RE = re.compile(r"\s+")
+
+CHUNK_DESCRIPTION = " Long results are split into chunks; pass chunk=N to read part N."
+UNCHANGED_NOTE = "Same content as the earlier {tool} result for this page in this conversation turn; use that."
+
+
+class _MarkupStripper(HTMLParser):
+    """ Rebuilds HTML without scripts, styles, comments and presentational attributes """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0  # depth inside dropped tags
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip += 1
+            return
+        if self.skip:
+            return
+        kept = "".join(f' {name}="{value[:MAX_ATTR_CHARS]}"' if value else f" {name}"
+                       for name, value in attrs if name in KEPT_ATTRS and not (value or "").startswith("data:"))
+        self.parts.append(f"<{tag}{kept}>")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROPPED_TAGS and tag not in VOID_TAGS:
+            self.skip -= 1
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif not self.skip and tag not in VOID_TAGS:
+            self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self.skip:
+            text = _SPACE_RE.sub(" ", data)
+            if text.strip():
+                self.parts.append(text)
+
+
+def strip_markup(html: str) -> str:
+    stripper = _MarkupStripper()
+    stripper.feed(html)
+    stripper.close()
+    return "".join(stripper.parts).strip()
+
+
+def compact_text(text: str) -> str:
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def split_chunks(text: str, budget: int) -> list[str]:
+    """ Pieces of about `budget` tokens, cut on whitespace where one is near; budget < 0 means one piece """
+    if budget < 0 or estimate_tokens(text) <= budget:
+        return [text]
+    size = max(1, budget * CHARS_PER_TOKEN)
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start, end)
+            if space > end - 200:
+                end = space + 1
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+def _payload(result):
+    """ (key, text) of the content inside an MCP result; key is None for a bare string """
+    if isinstance(result, str):
+        return None, result
+    if isinstance(result, dict):
+        for key in ("html", "text"):
+            if isinstance(result.get(key), str):
+                return key, result[key]
+    return None, None
+
+
+@dataclass
+class CachedOutput:
+    digest: str  # hash of the processed content
+    chunks: list
+    key: str | None
+    raw_chars: int  # size the browser returned
+    expires_at: float
+
+
+## TOOL OUTPUT CACHE ##
+class ToolOutputCache:
+    """
+    Processed browser tool results shared by every run on this worker. Entries
+    are keyed by session, page, URL, tool and arguments, and a page's entries
+    are dropped as soon as the session calls a tool that may change it.
+    Per-tool counters record raw and returned payload sizes.
+    """
+
+    def __init__(self, maxsize: int = TOOL_CACHE_SIZE, ttl: float = TOOL_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = {}  # (session, page) -> bumped by every page-changing call
+        self._lock = threading.Lock()
+        self._tools = {}  # tool -> counters
+
+    def generation(self, session_key, page_id) -> int:
+        with self._lock:
+            return self._generations.get((session_key, page_id), 0)
+
+    def invalidate(self, session_key, page_id):
+        with self._lock:
+            page = (session_key, page_id)
+            self._generations[page] = self._generations.get(page, 0) + 1
+
+    def get(self, key) -> CachedOutput | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: CachedOutput):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def record(self, tool: str, raw_chars: int = 0, returned_chars: int = 0, hit: bool = False,
+               unchanged: bool = False, chunked: bool = False):
+        with self._lock:
+            counters = self._tools.setdefault(tool, {"calls": 0, "cache_hits": 0, "unchanged": 0, "chunked": 0,
+                                                     "raw_chars": 0, "returned_chars": 0})
+            counters["calls"] += 1
+            counters["cache_hits"] += hit
+            counters["unchanged"] += unchanged
+            counters["chunked"] += chunked
+            counters["raw_chars"] += raw_chars
+            counters["returned_chars"] += returned_chars
+
+    def stats(self) -> dict:
+        with self._lock:
+            tools = {name: dict(counters) for name, counters in self._tools.items()}
+        for counters in tools.values():
+            counters["avg_returned_tokens"] = counters["returned_chars"] / CHARS_PER_TOKEN / counters["calls"]
+        raw = sum(counters["raw_chars"] for counters in tools.values())
+        returned = sum(counters["returned_chars"] for counters in tools.values())
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "token_budget": TOOL_OUTPUT_TOKENS,
+            "tokens_saved": (raw - returned) // CHARS_PER_TOKEN,
+            "tools": tools,
+        }
+
+
+tool_output_cache = ToolOutputCache()
+
+
+## BROWSER TOOLSET ##
+@dataclass
+class BrowserOutputToolset(WrapperToolset):
+    """
+    Wraps the browser MCP toolset for one agent run. Read-only extractions are
+    served from `tool_output_cache` while the page is unchanged, HTML loses
+    scripts, styles and presentational attributes, and results over `budget`
+    tokens are split into chunks the model asks for with `chunk`. Content
+    already returned earlier in the run comes back as a short note instead.
+    """
+
+    budget: int = TOOL_OUTPUT_TOKENS
+    cache: ToolOutputCache = field(default_factory=lambda: tool_output_cache)
+    _delivered: set = field(default_factory=set)  # (digest, chunk) returned in this run
+    _url_tool: object = None  # getURL's ToolsetTool, to key entries by page URL
+
+    async def get_tools(self, ctx):
+        tools = {name: tool for name, tool in (await self.wrapped.get_tools(ctx)).items() if name not in POOL_TOOLS}
+        self._url_tool = tools.get("getURL")
+        if self.budget < 0:
+            return tools
+        for name in EXTRACT_TOOLS & tools.keys():
+            tool_def = tools[name].tool_def
+            schema = dict(tool_def.parameters_json_schema)
+            schema["properties"] = {**schema.get("properties", {}), "chunk": {
+                "type": "integer", "description": "Part of a long result to return, starting at 1", "default": 1}}
+            tools[name] = replace(tools[name], tool_def=replace(
+                tool_def, parameters_json_schema=schema, description=(tool_def.description or "") + CHUNK_DESCRIPTION))
+        return tools
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        session = getattr(ctx.deps, "session", None)
+        session_key = session.user_id if session is not None else None
+        page_id = tool_args.get("pageId") or "default"
+        if name not in EXTRACT_TOOLS:
+            if name not in PASSIVE_TOOLS:
+                self.cache.invalidate(session_key, page_id)
+            result = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+            self.cache.record(name, len(str(result)), len(str(result)))
+            return result
+
+        args = dict(tool_args)
+        chunk = args.pop("chunk", 1)
+        generation = self.cache.generation(session_key, page_id)
+        url = await self._page_url(tool_args.get("pageId"), ctx)
+        key = (session_key, page_id, generation, url, name, json.dumps(args, sort_keys=True)) if url else None
+        entry = self.cache.get(key) if key else None
+        hit = entry is not None
+        if entry is None:
+            result = await self.wrapped.call_tool(name, args, ctx, tool)
+            payload_key, text = _payload(result)
+            if text is None:
+                # errors and non-text results pass through untouched
+                self.cache.record(name, len(str(result)), len(str(result)))
+                return result
+            entry = await self._process(name, payload_key, text)
+            if key:
+                self.cache.put(key, entry)
+        return self._deliver(name, entry, chunk, hit)
+
+    async def _page_url(self, page_id, ctx) -> str | None:
+        if self._url_tool is None:
+            return None
+        try:
+            args = {"pageId": page_id} if page_id else {}
+            result = await self.wrapped.call_tool("getURL", args, ctx, self._url_tool)
+            return result.get("url") if isinstance(result, dict) else None
+        except Exception:
+            return None
+
+    async def _process(self, name: str, payload_key, text: str) -> CachedOutput:
+        if name in HTML_TOOLS:
+            # pure-Python parsing of a large page, kept off the event loop
+            processed = await compute_executor.run(strip_markup, text)
+        else:
+            processed = compact_text(text)
+        digest = hashlib.sha256(processed.encode("utf-8")).hexdigest()
+        return CachedOutput(digest, split_chunks(processed, self.budget), payload_key, len(text),
+                            time.monotonic() + self.cache.ttl)
+
+    def _deliver(self, name: str, entry: CachedOutput, chunk, hit: bool):
+        total = len(entry.chunks)
+        if not isinstance(chunk, int) or not 1 <= chunk <= total:
+            return {"error": f"chunk must be between 1 and {total}"}
+        if (entry.digest, chunk) in self._delivered:
+            result = {"unchanged": True, "note": UNCHANGED_NOTE.format(tool=name)}
+            self.cache.record(name, entry.raw_chars, len(result["note"]), hit=hit, unchanged=True)
+            return result
+        self._delivered.add((entry.digest, chunk))
+        text = entry.chunks[chunk - 1]
+        if entry.key is None and total == 1:
+            result = text
+        else:
+            result = {entry.key or "text": text}
+            if total > 1:
+                result.update({"chunk": chunk, "chunks": total})
+        self.cache.record(name, entry.raw_chars, len(text), hit=hit, chunked=total > 1)
+        return result
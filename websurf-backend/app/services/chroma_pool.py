@@ -0,0 +1,59 @@
+## imports ##
+import threading
+import chromadb
+
+
+## CHROMA CLIENT POOL ##
+class ChromaClientPool:
+    """ One Chroma client per storage path, with cached collection handles """
+
+    def __init__(self):
+        self._clients = {}      # db_path (None = in-memory) -> client
+        self._collections = {}  # (db_path, collection name) -> collection handle
+        self._lock = threading.RLock()
+
+    def get_client(self, db_path: str = None):
+        """ Return the shared client for db_path, opening it on first use """
+        with self._lock:
+            client = self._clients.get(db_path)
+            if client is None:
+                client = chromadb.PersistentClient(path=db_path) if db_path else chromadb.Client()
+                self._clients[db_path] = client
+            return client
+
+    def get_collection(self, collection_name: str, db_path: str = None, create: bool = True):
+        """ Return a cached collection handle; raises if missing and create is False """
+        key = (db_path, collection_name)
+        with self._lock:
+            collection = self._collections.get(key)
+            if collection is None:
+                client = self.get_client(db_path)
+                collection = client.get_or_create_collection(name=collection_name) if create \
+                    else client.get_collection(name=collection_name)
+                self._collections[key] = collection
+            return collection
+
+    def delete_collection(self, collection_name: str, db_path: str = None):
+        with self._lock:
+            self._collections.pop((db_path, collection_name), None)
+            self.get_client(db_path).delete_collection(name=collection_name)
+
+    def close_all(self):
+        """ Release every client; called on app shutdown """
+        with self._lock:
+            for db_path, client in self._clients.items():
+                try:
+                    system = getattr(client, "_system", None)
+                    if system is not None:
+                        system.stop()
+                except Exception as e:
+                    print(f"Error closing chroma client for {db_path or 'memory'}: {e}")
+            self._collections.clear()
+            self._clients.clear()
+            try:
+                chromadb.api.client.SharedSystemClient.clear_system_cache()
+            except Exception:
+                pass
+
+
+chroma_pool = ChromaClientPool()
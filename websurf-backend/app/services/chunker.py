@@ -0,0 +1,66 @@
+## imports ##
+from functools import lru_cache
+from typing import Callable
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+SEPARATORS = ["\n\n", "\n", ".", " ", ""]
+
+
+## CHUNKER ##
+class Chunker:
+    """ Reusable text splitter for one (size, overlap, length function) configuration """
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 length_function: Callable[[str], int] = len):
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"chunk_overlap must be at least 0 and below chunk_size ({chunk_size}), "
+                             f"got {chunk_overlap}")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            length_function=length_function,
+            separators=SEPARATORS,
+        )
+
+    def split(self, text: str) -> list[str]:
+        return self.splitter.split_text(text)
+
+    def split_with_offsets(self, text: str) -> list[tuple[str, int]]:
+        """ (chunk, start offset) pairs, with text[start:start + len(chunk)] == chunk """
+        # langchain's start_index steps back by the overlap in characters, which is
+        # wrong when length is measured in tokens; every chunk starts after the last one
+        pairs, cursor = [], 0
+        for chunk in self.splitter.split_text(text):
+            start = text.find(chunk, cursor)
+            if start < 0:
+                start = text.find(chunk)
+            pairs.append((chunk, start))
+            cursor = start + 1
+        return pairs
+
+
+@lru_cache(maxsize=32)
+def get_chunker(chunk_size: int = 500, chunk_overlap: int = 50, unit: str = "chars",
+                model_name: str = None) -> Chunker:
+    """
+    Cached chunker per configuration. With unit='tokens' chunks are measured with the
+    embedder's tokenizer and capped at its max sequence length, so nothing is truncated.
+    """
+    if unit == "chars":
+        return Chunker(chunk_size, chunk_overlap)
+    if unit != "tokens":
+        raise ValueError(f"Unknown chunk length unit: {unit}")
+    from app.services.embedder_registry import get_embedder
+    embedder = get_embedder(model_name)
+    return token_chunker(embedder.tokenizer, embedder.max_seq_length, chunk_size, chunk_overlap)
+
+
+def token_chunker(tokenizer, max_seq_length: int, chunk_size: int = 500, chunk_overlap: int = 50) -> Chunker:
+    """ Chunker measured in tokenizer tokens, leaving room for the [CLS]/[SEP] tokens """
+
+    def token_length(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False, return_attention_mask=False)["input_ids"])
+
+    return Chunker(min(chunk_size, max_seq_length - 2), chunk_overlap, token_length)
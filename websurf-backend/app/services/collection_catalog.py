@@ -0,0 +1,139 @@
+## imports ##
+import time
+import asyncio
+import threading
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from app.services.db import SessionLocal
+from app.models.collection_catalog import CollectionRecord
+from app.config import CATALOG_CACHE_TTL_SECONDS
+
+SESSION_COLLECTION_PREFIX = "session_"  # per-user conversation memory, hidden from shared listings
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+## COLLECTION CATALOG ##
+class CollectionCatalog:
+    """
+    Persistent list of RAG collections with per-collection statistics, stored in
+    the `collection_catalog` table so every uvicorn worker sees the same set.
+    Reads are served from an in-process snapshot refreshed every `ttl` seconds;
+    writes from this process update the snapshot immediately.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshot = None  # name -> record dict
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    ## reads ##
+    async def records(self, include_sessions: bool = False) -> dict:
+        """ name -> {description, embedding_model, dimension, chunk_count, byte_size, last_updated} """
+        if self._snapshot is None or time.monotonic() - self._loaded_at > self.ttl:
+            await asyncio.to_thread(self._refresh)
+        return {name: dict(record) for name, record in self._snapshot.items()
+                if include_sessions or not name.startswith(SESSION_COLLECTION_PREFIX)}
+
+    async def descriptions(self, include_sessions: bool = False) -> dict:
+        """ name -> description """
+        return {name: record["description"] for name, record in (await self.records(include_sessions)).items()}
+
+    async def names(self, include_sessions: bool = False) -> list[str]:
+        return list(await self.records(include_sessions))
+
+    async def describe_lines(self) -> list[str]:
+        """ One line per shared collection, for the agent's system prompt """
+        lines = []
+        for name, record in (await self.records()).items():
+            stats = f"{record['chunk_count']} chunks"
+            if record["last_updated"]:
+                stats += f", updated {record['last_updated']:%Y-%m-%d %H:%M}"
+            lines.append(f"{name}: {record['description']} ({stats})\n")
+        return lines
+
+    async def describe(self) -> str:
+        return "".join(await self.describe_lines())
+
+    ## writes ##
+    async def register(self, name: str, description: str = "") -> bool:
+        """ Add a collection if missing, updating its description when one is given; True if it is new """
+        return await asyncio.to_thread(self._upsert, name, description=description or None)
+
+    async def update_stats(self, name: str, embedding_model: str = None, dimension: int = None,
+                           chunk_count: int = None, byte_size: int = None):
+        await asyncio.to_thread(self._upsert, name, embedding_model=embedding_model, dimension=dimension,
+                                chunk_count=chunk_count, byte_size=byte_size)
+
+    async def remove(self, name: str):
+        await asyncio.to_thread(self._delete, [name])
+
+    async def clear(self):
+        await asyncio.to_thread(self._delete, None)
+
+    def invalidate(self):
+        self._snapshot = None
+
+    ## persistence ##
+    @staticmethod
+    def _to_dict(row: CollectionRecord) -> dict:
+        return {
+            "description": row.description or "",
+            "embedding_model": row.embedding_model,
+            "dimension": row.dimension,
+            "chunk_count": row.chunk_count or 0,
+            "byte_size": row.byte_size or 0,
+            "last_updated": row.last_updated,
+        }
+
+    def _refresh(self):
+        with SessionLocal() as db:
+            rows = db.query(CollectionRecord).order_by(CollectionRecord.created_at).all()
+            snapshot = {row.name: self._to_dict(row) for row in rows}
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+
+    def _upsert(self, name: str, **fields) -> bool:
+        fields = {key: value for key, value in fields.items() if value is not None}
+        for attempt in range(2):
+            with SessionLocal() as db:
+                row = db.get(CollectionRecord, name)
+                created = row is None
+                if created:
+                    row = CollectionRecord(name=name, description="", chunk_count=0, byte_size=0, created_at=_now())
+                    db.add(row)
+                for key, value in fields.items():
+                    setattr(row, key, value)
+                row.last_updated = _now()
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # another worker registered it first, update that row instead
+                    db.rollback()
+                    if attempt:
+                        raise
+                    continue
+                record = self._to_dict(row)
+            with self._lock:
+                if self._snapshot is not None:
+                    self._snapshot[name] = record
+            return created
+
+    def _delete(self, names: list = None):
+        with SessionLocal() as db:
+            query = db.query(CollectionRecord)
+            if names is not None:
+                query = query.filter(CollectionRecord.name.in_(names))
+            query.delete(synchronize_session=False)
+            db.commit()
+        with self._lock:
+            if self._snapshot is not None:
+                for name in list(self._snapshot) if names is None else names:
+                    self._snapshot.pop(name, None)
+
+
+collection_catalog = CollectionCatalog()
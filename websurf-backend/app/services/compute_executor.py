@@ -0,0 +1,88 @@
+## imports ##
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.config import COMPUTE_WORKERS, COMPUTE_QUEUE_SIZE, COMPUTE_ADMISSION_TIMEOUT, INGESTION_COMPUTE_WORKERS
+
+
+class ComputeBusyError(RuntimeError):
+    """ Raised when the compute queue stays full past the admission timeout """
+
+
+## COMPUTE EXECUTOR ##
+class ComputeExecutor:
+    """
+    Bounded thread pool for CPU-bound work (encode, PDF parsing, indexing).
+    Threads are used so every worker shares the embedder registry; torch and
+    pdfplumber release the GIL for most of their work. A job holds its
+    admission slot until its thread finishes, even when the caller stops
+    waiting, so the bound counts the work actually running.
+    """
+
+    def __init__(self, max_workers: int = COMPUTE_WORKERS, queue_size: int = COMPUTE_QUEUE_SIZE,
+                 admission_timeout: float = COMPUTE_ADMISSION_TIMEOUT, name: str = "compute"):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.admission_timeout = admission_timeout
+        self._pool = None
+        self._slots = None  # admission semaphore, created inside the running loop
+        self.submitted = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        if self._slots is None:
+            # running + queued jobs, anything beyond waits for a slot
+            self._slots = asyncio.Semaphore(self.max_workers + self.queue_size)
+
+    async def run(self, func, *args, **kwargs):
+        """ Run func(*args, **kwargs) on the pool, waiting for an admission slot first """
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.admission_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ComputeBusyError("Compute queue is full, try again later.")
+        self.submitted += 1
+        loop, slots = asyncio.get_running_loop(), self._slots
+
+        def release(_):
+            # runs on the worker thread once the job is really over
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # loop already closed
+
+        try:
+            future = self._pool.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        in_flight = 0
+        if self._slots is not None:
+            in_flight = self.max_workers + self.queue_size - self._slots._value
+        return {
+            "max_workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+
+compute_executor = ComputeExecutor()
+# whole documents run here, so a large ingest never queues chat-path query encodes
+ingestion_executor = ComputeExecutor(INGESTION_COMPUTE_WORKERS, INGESTION_COMPUTE_WORKERS,
+                                     admission_timeout=None, name="ingest")
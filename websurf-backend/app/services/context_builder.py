@@ -0,0 +1,150 @@
+## imports ##
+import re
+import threading
+from dataclasses import dataclass
+from app.config import (PROMPT_BUDGET_SYSTEM, PROMPT_BUDGET_COLLECTIONS, PROMPT_BUDGET_MEMORY,
+                        SESSION_LIMIT_THRESHOLD, PROMPT_BUDGET_QUERY)
+
+CHARS_PER_TOKEN = 4  # Gemini averages about four characters per token on English text
+MIN_PARTIAL_TOKENS = 32  # a truncated item shorter than this is dropped instead
+_WORD_RE = re.compile(r"\w+")
+
+DEFAULT_BUDGETS = {
+    "system": PROMPT_BUDGET_SYSTEM,
+    "collections": PROMPT_BUDGET_COLLECTIONS,
+    "memory": PROMPT_BUDGET_MEMORY,
+    "summary": SESSION_LIMIT_THRESHOLD,
+    "query": PROMPT_BUDGET_QUERY,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_tokens(text: str, budget: int, keep_tail: bool = False) -> str:
+    """ Cut text to about `budget` tokens on a word boundary; budget < 0 means no limit """
+    if budget < 0 or estimate_tokens(text) <= budget:
+        return text
+    limit = max(0, budget * CHARS_PER_TOKEN - 3)
+    if keep_tail:
+        cut = text[len(text) - limit:] if limit else ""
+        space = cut.find(" ")
+        return "..." + (cut[space + 1:] if 0 <= space < 40 else cut)
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit - 40 else cut) + "..."
+
+
+def rank_by_overlap(items: list[str], query: str) -> list[str]:
+    """ Items sharing the most words with the query first; ties keep their order """
+    terms = set(_WORD_RE.findall(query.lower()))
+    return sorted(items, key=lambda item: -len(terms & set(_WORD_RE.findall(item.lower()))))
+
+
+def fit_ranked(items: list[str], budget: int, separator: str = "\n") -> list[str]:
+    """ Items in rank order until the budget is spent; the one that overflows is truncated """
+    if budget < 0:
+        return list(items)
+    kept, left = [], budget
+    for item in items:
+        cost = estimate_tokens(item + separator)
+        if cost <= left:
+            kept.append(item)
+            left -= cost
+            continue
+        if left >= MIN_PARTIAL_TOKENS:
+            kept.append(truncate_tokens(item, left))
+        break
+    return kept
+
+
+@dataclass
+class PromptContext:
+    text: str
+    tokens: dict  # section -> estimated tokens, plus "total"
+
+
+## CONTEXT BUILDER ##
+class ContextBuilder:
+    """
+    Assembles agent prompts from named sections, each held to a token budget:
+    the static system pieces share one budget and are trimmed once and cached,
+    ranked content (collections, memory hits) is kept best-first until its
+    budget is spent, and the session summary keeps its most recent part. Token counts are estimates
+    (CHARS_PER_TOKEN); the model's own count comes back in the run usage.
+    """
+
+    def __init__(self, budgets: dict = None):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self._static = {}  # piece keys -> trimmed static texts
+        self._collections = (None, None)  # (catalog lines, block) of the last catalog that fit whole
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._totals = {}  # section -> tokens summed over requests
+
+    ## sections ##
+    def system(self, pieces: list[tuple[str, str]]) -> list[str]:
+        """ Static (key, text) pieces sharing the system budget; over it, each keeps its share of the budget """
+        keys = tuple(key for key, _ in pieces)
+        cached = self._static.get(keys)
+        if cached is None:
+            budget = self.budgets["system"]
+            total = sum(estimate_tokens(text) for _, text in pieces)
+            if budget < 0 or total <= budget:
+                cached = [text for _, text in pieces]
+            else:
+                cached = [truncate_tokens(text, budget * estimate_tokens(text) // total) for _, text in pieces]
+            self._static[keys] = cached
+        return cached
+
+    def collections(self, lines: list[str], query: str) -> str:
+        lines = tuple(lines)
+        cached_lines, block = self._collections
+        if lines == cached_lines:
+            return block
+        block = "".join(lines)
+        budget = self.budgets["collections"]
+        if budget < 0 or estimate_tokens(block) <= budget:
+            self._collections = (lines, block)
+            return block
+        # too many collections: the ones matching the query win
+        return "".join(fit_ranked(rank_by_overlap(list(lines), query), budget, separator=""))
+
+    def memory(self, hits: list[str]) -> str:
+        """ Memory hits arrive best first """
+        return "\n---\n".join(fit_ranked(hits, self.budgets["memory"], separator="\n---\n"))
+
+    def summary(self, text: str) -> str:
+        return truncate_tokens(text or "", self.budgets["summary"], keep_tail=True)
+
+    def query(self, text: str) -> str:
+        return truncate_tokens(text or "", self.budgets["query"])
+
+    ## assembly ##
+    def assemble(self, sections: list[tuple[str, str]]) -> PromptContext:
+        """ Join (section name, text) pairs in order, skipping empty ones """
+        parts, tokens = [], {}
+        for name, text in sections:
+            if text:
+                parts.append(text)
+                tokens[name] = tokens.get(name, 0) + estimate_tokens(text)
+        text = "\n".join(parts)
+        tokens["total"] = estimate_tokens(text)
+        with self._lock:
+            self.requests += 1
+            for name, count in tokens.items():
+                self._totals[name] = self._totals.get(name, 0) + count
+        return PromptContext(text, tokens)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "budgets": dict(self.budgets),
+                "avg_tokens": {name: total / self.requests for name, total in self._totals.items()}
+                if self.requests else {},
+            }
+
+
+context_builder = ContextBuilder()
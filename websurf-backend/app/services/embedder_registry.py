@@ -0,0 +1,90 @@
+## imports ##
+import threading
+from collections import OrderedDict
+from sentence_transformers import SentenceTransformer
+from app.config import EMBEDDING_MODEL, EMBEDDER_MEMORY_CAP_MB
+
+
+## EMBEDDER REGISTRY ##
+class EmbedderRegistry:
+    """ Process-wide cache of SentenceTransformer models keyed by model name """
+
+    def __init__(self, memory_cap_mb: int = EMBEDDER_MEMORY_CAP_MB):
+        self.memory_cap = memory_cap_mb * 1024 * 1024
+        self._models = OrderedDict()  # model name -> (embedder, size in bytes)
+        self._lock = threading.Lock()
+        self._loading = {}  # model name -> lock, so one model loads only once
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(self, model_name: str = None) -> SentenceTransformer:
+        """ Return a loaded embedder, loading it lazily on first use """
+        model_name = model_name or EMBEDDING_MODEL
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                self.hits += 1
+                return self._models[model_name][0]
+            load_lock = self._loading.setdefault(model_name, threading.Lock())
+
+        # load outside the registry lock so other models stay available
+        with load_lock:
+            with self._lock:
+                if model_name in self._models:
+                    self._models.move_to_end(model_name)
+                    self.hits += 1
+                    return self._models[model_name][0]
+            print(f"Loading embedding model: {model_name}")
+            embedder = SentenceTransformer(model_name)
+            size = self._model_size(embedder)
+            with self._lock:
+                self._models[model_name] = (embedder, size)
+                self.loads += 1
+                self._loading.pop(model_name, None)
+                self._evict(keep=model_name)
+            return embedder
+
+    def evict(self, model_name: str) -> bool:
+        """ Drop a model from the registry """
+        with self._lock:
+            return self._models.pop(model_name, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": {name: size for name, (_, size) in self._models.items()},
+                "memory_bytes": sum(size for _, size in self._models.values()),
+                "memory_cap_bytes": self.memory_cap,
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self, keep: str):
+        # evict least recently used models until we fit under the cap,
+        # but never the model that was just requested
+        total = sum(size for _, size in self._models.values())
+        while total > self.memory_cap and len(self._models) > 1:
+            name, (_, size) = next(iter(self._models.items()))
+            if name == keep:
+                self._models.move_to_end(name)
+                continue
+            del self._models[name]
+            total -= size
+            self.evictions += 1
+            print(f"Evicted embedding model: {name}")
+
+    @staticmethod
+    def _model_size(embedder) -> int:
+        try:
+            return sum(p.numel() * p.element_size() for p in embedder.parameters())
+        except Exception:
+            return 0
+
+
+embedder_registry = EmbedderRegistry()
+
+def get_embedder(model_name: str = None) -> SentenceTransformer:
+    """ Shortcut for the process-wide registry """
+    return embedder_registry.get(model_name)
@@ -0,0 +1,68 @@
+## imports ##
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from app.config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS
+
+
+## QUERY EMBEDDING CACHE ##
+def normalize_query(text: str) -> str:
+    """ Normalize a query so trivially different spellings share a cache entry """
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """ Bounded LRU cache with TTL mapping (model name, query) to an embedding """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, embedding)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_name: str, text: str):
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, embedding = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model_name: str, text: str, embedding):
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, embedding)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+query_embedding_cache = EmbeddingCache()
@@ -0,0 +1,295 @@
+## imports ##
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from app.services.db import SessionLocal, add_record
+from app.models.ingestion_job import IngestionJob
+from app.services.rag_service import data_injestion
+from app.services.rag_pipeline import IngestionCancelled
+from app.config import (INGESTION_WORKERS, INGESTION_UPLOAD_DIR, INGESTION_JOB_STALE_SECONDS,
+                        INGESTION_JOB_HEARTBEAT_SECONDS)
+
+ACTIVE_STATUSES = ("queued", "running")
+PROGRESS_PERSIST_INTERVAL = 1.0  # seconds between progress writes to the database
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+## INGESTION JOB QUEUE ##
+class IngestionJobQueue:
+    """
+    Background queue for document ingestion. Jobs are stored in the
+    `ingestion_jobs` table, so they survive restarts and every uvicorn worker
+    can claim them. Each worker process runs `workers` jobs at a time. A
+    partial unique index lets only one job per collection be running, so the
+    database serializes writers across processes. Running jobs refresh
+    `updated_at` every `heartbeat` seconds, and jobs that stop doing so for
+    INGESTION_JOB_STALE_SECONDS go back to the queue.
+    """
+
+    def __init__(self, workers: int = INGESTION_WORKERS, upload_dir: str = INGESTION_UPLOAD_DIR,
+                 poll_interval: float = 2.0, heartbeat: float = INGESTION_JOB_HEARTBEAT_SECONDS):
+        self.workers = workers
+        self.upload_dir = upload_dir
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self._tasks = []
+        self._wakeup = None
+        self._stopping = False
+        self._running = {}           # job id -> live state for jobs running in this process
+        self._cancel_events = {}     # job id -> threading.Event seen by the pipeline
+
+    ## lifecycle ##
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def shutdown(self):
+        """ Stop workers; interrupted jobs go back to the queue and resume on next start """
+        self._stopping = True
+        for event in self._cancel_events.values():
+            event.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    ## public api ##
+    async def submit(self, collection_name: str, description: str, source_type: str,
+                     source: str, source_name: str = None) -> dict:
+        now = _now()
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            collection_name=collection_name,
+            description=description,
+            source_type=source_type,
+            source=source,
+            source_name=source_name,
+            status="queued",
+            pages_parsed=0,
+            chunks_embedded=0,
+            chunks_indexed=0,
+            created_at=now,
+            updated_at=now,
+        )
+        db = SessionLocal()
+        try:
+            saved = await add_record(db, job)
+            if saved is None:
+                raise RuntimeError("Could not persist ingestion job.")
+            state = self._to_dict(saved)
+        finally:
+            db.close()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return state
+
+    def save_upload(self, fileobj, filename: str) -> str:
+        """ Spool an uploaded file to disk so the job can outlive the request """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        name = os.path.basename(filename or "upload.pdf")
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}_{name}")
+        with open(path, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        return path
+
+    async def get(self, job_id: str):
+        if job_id in self._running:
+            return dict(self._running[job_id])
+        return await asyncio.to_thread(self._load, job_id)
+
+    async def cancel(self, job_id: str):
+        event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        return await asyncio.to_thread(self._mark_cancelled, job_id)
+
+    ## workers ##
+    async def _worker(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _reaper(self):
+        """ Requeue jobs of dead workers, then wake the workers to pick them up """
+        while not self._stopping:
+            try:
+                if await asyncio.to_thread(self._requeue_stale):
+                    self._wakeup.set()
+            except Exception as e:
+                print(f"Error requeueing stale ingestion jobs: {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    async def _beat(self, job: dict, cancel_event: threading.Event):
+        # keeps a long page or embedding batch from looking like a dead worker
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            job["updated_at"] = _now()
+            await asyncio.to_thread(self._persist_progress, job, cancel_event)
+
+    async def _run(self, job: dict):
+        job_id = job["id"]
+        cancel_event = threading.Event()
+        self._running[job_id] = job
+        self._cancel_events[job_id] = cancel_event
+        last_persist = [0.0]
+
+        def progress(pages_parsed: int, chunks_embedded: int, chunks_indexed: int):
+            # called from the compute thread
+            job.update(pages_parsed=pages_parsed, chunks_embedded=chunks_embedded,
+                       chunks_indexed=chunks_indexed, updated_at=_now())
+            now = time.monotonic()
+            if now - last_persist[0] >= PROGRESS_PERSIST_INTERVAL:
+                last_persist[0] = now
+                self._persist_progress(job, cancel_event)
+
+        if job["source_type"] == "text":
+            source_kwargs = {"text_content": job["source"]}
+        elif job["source_type"] == "pdf_url":
+            source_kwargs = {"pdf_url": job["source"]}
+        else:
+            source_kwargs = {"pdf_path": job["source"], "source": job["source_name"]}
+
+        heartbeat = asyncio.create_task(self._beat(job, cancel_event))
+        try:
+            await data_injestion(collection_name=job["collection_name"], description=job["description"],
+                                 progress=progress, cancel_event=cancel_event, **source_kwargs)
+            job["status"] = "completed"
+        except IngestionCancelled:
+            job["status"] = "queued" if self._stopping or job.get("requeued") else "cancelled"
+        except asyncio.CancelledError:
+            job["status"] = "queued"
+            raise
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            heartbeat.cancel()
+            job["updated_at"] = _now()
+            await asyncio.shield(asyncio.to_thread(self._persist_final, job))
+            if job["status"] != "queued" and job["source_type"] == "file" and os.path.exists(job["source"]):
+                os.remove(job["source"])
+            self._running.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+
+    ## persistence ##
+    @staticmethod
+    def _to_dict(job: IngestionJob) -> dict:
+        return {
+            "id": job.id,
+            "collection_name": job.collection_name,
+            "description": job.description,
+            "source_type": job.source_type,
+            "source": job.source,
+            "source_name": job.source_name,
+            "status": job.status,
+            "pages_parsed": job.pages_parsed or 0,
+            "chunks_embedded": job.chunks_embedded or 0,
+            "chunks_indexed": job.chunks_indexed or 0,
+            "error": job.error,
+            "created_at": job.created_at,
+            "updated_at": job.updated_at,
+        }
+
+    def _load(self, job_id: str):
+        with SessionLocal() as db:
+            job = db.get(IngestionJob, job_id)
+            return self._to_dict(job) if job else None
+
+    def _claim_next(self):
+        with SessionLocal() as db:
+            busy = db.query(IngestionJob.collection_name).filter(IngestionJob.status == "running")
+            candidates = db.query(IngestionJob.id).filter(IngestionJob.status == "queued",
+                                                          IngestionJob.collection_name.not_in(busy)) \
+                .order_by(IngestionJob.created_at).limit(5).all()
+            for (job_id,) in candidates:
+                # conditional update, so only one worker process wins each job; the unique
+                # index rejects it if another process started a job on the same collection
+                try:
+                    claimed = db.query(IngestionJob) \
+                        .filter(IngestionJob.id == job_id, IngestionJob.status == "queued") \
+                        .update({"status": "running", "updated_at": _now()}, synchronize_session=False)
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    continue
+                if claimed:
+                    return self._to_dict(db.get(IngestionJob, job_id))
+        return None
+
+    def _requeue_stale(self) -> int:
+        # jobs whose worker died stop sending heartbeats and go back to the queue
+        cutoff = _now() - timedelta(seconds=INGESTION_JOB_STALE_SECONDS)
+        with SessionLocal() as db:
+            requeued = db.query(IngestionJob) \
+                .filter(IngestionJob.status == "running", IngestionJob.updated_at < cutoff) \
+                .update({"status": "queued"}, synchronize_session=False)
+            db.commit()
+        return requeued
+
+    def _persist_progress(self, job: dict, cancel_event: threading.Event):
+        try:
+            with SessionLocal() as db:
+                row = db.get(IngestionJob, job["id"])
+                if row is None:
+                    return
+                if row.status == "cancelled":
+                    # cancelled through another worker process
+                    cancel_event.set()
+                    return
+                if row.status == "queued":
+                    # requeued as stale, a new claim runs it again
+                    job["requeued"] = True
+                    cancel_event.set()
+                    return
+                row.pages_parsed = job["pages_parsed"]
+                row.chunks_embedded = job["chunks_embedded"]
+                row.chunks_indexed = job["chunks_indexed"]
+                row.updated_at = job["updated_at"]
+                db.commit()
+        except Exception as e:
+            print(f"Error saving progress for ingestion job {job['id']}: {e}")
+
+    def _persist_final(self, job: dict):
+        if job.get("requeued"):
+            return
+        with SessionLocal() as db:
+            row = db.get(IngestionJob, job["id"])
+            if row is None:
+                return
+            for key in ("status", "pages_parsed", "chunks_embedded", "chunks_indexed", "error", "updated_at"):
+                setattr(row, key, job.get(key))
+            db.commit()
+
+    def _mark_cancelled(self, job_id: str):
+        with SessionLocal() as db:
+            job = db.get(IngestionJob, job_id)
+            if job is None:
+                return None
+            if job.status in ACTIVE_STATUSES:
+                job.status = "cancelled"
+                job.updated_at = _now()
+                db.commit()
+            return self._to_dict(job)
+
+
+ingestion_jobs = IngestionJobQueue()
@@ -0,0 +1,170 @@
+## imports ##
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from app.config import VECTOR_STORE_DIR, RRF_K
+
+_TERM_RE = re.compile(r"\S+")
+_TOKEN_RE = re.compile(r"[^\W_]+")  # unicode61 token characters: letters and digits, `_` separates
+_MAX_QUERY_TERMS = 32
+MAX_TERM_DOC_FRACTION = 0.1  # query terms in more chunks than this are skipped, like stopwords
+MIN_SELECTIVE_DOCS = 100  # smaller collections keep every term
+_SQL_BATCH = 500  # ids per IN (...) clause
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> dict[str, float]:
+    """ Fuse ranked id lists: score(id) = sum of 1 / (k + rank) over the lists it appears in """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def query_terms(query: str) -> list[str]:
+    terms = []
+    for term in _TERM_RE.findall(query):
+        if any(ch.isalnum() for ch in term) and term not in terms:
+            terms.append(term)
+    return terms[:_MAX_QUERY_TERMS]
+
+
+def fts_tokens(term: str) -> list[str]:
+    """ Tokens of a term as the FTS5 unicode61 tokenizer (remove_diacritics 2) stores them in the vocab """
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", term.lower()) if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(folded)
+
+
+def match_expression(terms: list[str]) -> str:
+    """
+    FTS5 query matching any of the terms. Each term is quoted as a phrase, so
+    identifiers like ERR_CONNECTION_REFUSED or E-1234 match as written.
+    """
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+## LEXICAL INDEX ##
+class LexicalIndex:
+    """
+    BM25 inverted index per collection, kept in a SQLite FTS5 table under
+    `<db_path or VECTOR_STORE_DIR>/_lexical/`. Chunks are added in the same
+    batches as their vectors, so the index grows incrementally with ingestion.
+    """
+
+    def __init__(self, root: str = VECTOR_STORE_DIR):
+        self.root = root
+        self._connections = {}  # index file -> (connection, lock)
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str, db_path: str = None) -> str:
+        return os.path.join(db_path or self.root, "_lexical", f"{collection_name}.bm25.sqlite")
+
+    def _connect(self, collection_name: str, db_path: str = None):
+        path = self._path(collection_name, db_path)
+        with self._lock:
+            entry = self._connections.get(path)
+            if entry is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                # external-content FTS table over `docs`, kept in sync by triggers
+                db.executescript("""
+                    CREATE TABLE IF NOT EXISTS docs (rowid INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT);
+                    CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5(
+                        document, content='docs', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');
+                    CREATE VIRTUAL TABLE IF NOT EXISTS vocab USING fts5vocab(terms, 'row');
+                    CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+                        INSERT INTO terms(rowid, document) VALUES (new.rowid, new.document);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+                        INSERT INTO terms(terms, rowid, document) VALUES ('delete', old.rowid, old.document);
+                    END;
+                """)
+                entry = self._connections[path] = (db, threading.Lock())
+            return entry
+
+    def add(self, collection_name: str, ids: list, documents: list, db_path: str = None):
+        """ Index chunks; ids are content hashes, so an id already present is left as is """
+        if not ids:
+            return
+        db, lock = self._connect(collection_name, db_path)
+        with lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("INSERT OR IGNORE INTO docs (id, document) VALUES (?, ?)", zip(ids, documents))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def delete(self, collection_name: str, ids: list, db_path: str = None):
+        if not ids:
+            return
+        db, lock = self._connect(collection_name, db_path)
+        with lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for i in range(0, len(ids), _SQL_BATCH):
+                    batch = list(ids[i:i + _SQL_BATCH])
+                    db.execute(f"DELETE FROM docs WHERE id IN ({','.join('?' * len(batch))})", batch)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def drop(self, collection_name: str, db_path: str = None):
+        path = self._path(collection_name, db_path)
+        with self._lock:
+            entry = self._connections.pop(path, None)
+            if entry is not None:
+                entry[0].close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def search(self, collection_name: str, query: str, k: int = 10, db_path: str = None) -> list[tuple[str, float]]:
+        """ Top-k (id, bm25 score) pairs, best first; higher scores are better """
+        terms = query_terms(query)
+        if not terms or not os.path.exists(self._path(collection_name, db_path)):
+            return []
+        db, lock = self._connect(collection_name, db_path)
+        with lock:
+            terms = self._selective(db, terms)
+            if not terms:
+                return []
+            expression = match_expression(terms)
+            # FTS5 rank is bm25() negated, so ascending rank is best first
+            rows = db.execute("SELECT docs.id, -terms.rank FROM terms JOIN docs ON docs.rowid = terms.rowid "
+                              "WHERE terms MATCH ? ORDER BY terms.rank LIMIT ?", (expression, k)).fetchall()
+        return rows
+
+    @staticmethod
+    def _selective(db, terms: list[str]) -> list[str]:
+        """
+        Drop terms whose every token appears in most chunks. They add almost
+        nothing to BM25 but their posting lists dominate query time.
+        """
+        # rowids have gaps after deletes, so count the live chunks
+        total = db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        tokens = {token for term in terms for token in fts_tokens(term)}
+        if total < MIN_SELECTIVE_DOCS or not tokens:
+            return terms
+        common = {term for term, docs in db.execute(
+            f"SELECT term, doc FROM vocab WHERE term IN ({','.join('?' * len(tokens))})", list(tokens))
+            if docs > total * MAX_TERM_DOC_FRACTION}
+        return [term for term in terms if not all(token in common for token in fts_tokens(term))]
+
+    def search_many(self, collection_name: str, queries: list[str], k: int = 10,
+                    db_path: str = None) -> list[list[tuple[str, float]]]:
+        return [self.search(collection_name, query, k, db_path) for query in queries]
+
+    def close(self):
+        with self._lock:
+            for db, _ in self._connections.values():
+                db.close()
+            self._connections.clear()
+
+
+lexical_index = LexicalIndex()
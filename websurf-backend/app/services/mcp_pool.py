@@ -0,0 +1,376 @@
+## imports ##
+import os
+import glob
+import time
+import shutil
+import asyncio
+import psutil
+from pathlib import Path
+from contextlib import asynccontextmanager
+from app.config import (MCP_POOL_SIZE, MCP_LEASE_TIMEOUT, MCP_IDLE_SECONDS, MCP_HEALTH_INTERVAL,
+                        MCP_HEALTH_TIMEOUT, MCP_MEMORY_CAP_MB, MCP_PROFILE_ROOT)
+
+
+def get_browser_script_path():
+    """Find the browser-mcp.js script path"""
+    # Try environment variable first
+    env_path = os.getenv('MCP_BROWSER_SCRIPT_PATH')
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    # Get the current file's directory and go up to project root
+    current_file = Path(__file__).resolve()
+
+    # Try relative paths - updated for new structure
+    script_paths = [
+        # From websurf-backend/app/services/ -> project root
+        current_file.parent.parent.parent.parent / 'websurf-mcp' / 'browser-mcp.js',
+        # From websurf-backend/app/ -> project root
+        current_file.parent.parent.parent / 'websurf-mcp' / 'browser-mcp.js',
+        # Legacy paths (string based)
+        '../../websurf-mcp/browser-mcp.js',
+        '../../../websurf-mcp/browser-mcp.js',
+        'websurf-mcp/browser-mcp.js',
+        'browser-mcp.js',
+        '../websurf-mcp/browser-mcp.js',
+    ]
+
+    for path in script_paths:
+        if isinstance(path, Path):
+            abs_path = path
+        else:
+            abs_path = Path(path).resolve()
+
+        if abs_path.exists():
+            print(f"Found browser script at: {abs_path}")
+            return str(abs_path)
+
+    print(f"WARNING: Could not find browser-mcp.js. Searched from: {current_file}")
+    return None
+
+
+class McpWorker:
+    """ One browser-mcp.js process driving its own Chromium profile """
+
+    def __init__(self, slot: int, server, profile: str):
+        self.slot = slot
+        self.server = server
+        self.profile = profile
+        self.leased = False
+        self.session_key = None  # last lessee, preferred for its next request
+        self.leases = 0
+        self.started_at = time.monotonic()
+        self.last_used = time.monotonic()
+
+    def memory_bytes(self) -> int:
+        """ RSS of the Chromium processes running on this worker's profile """
+        flag = f"--user-data-dir={self.profile}"
+        total = 0
+        for proc in psutil.process_iter(["cmdline", "memory_info"]):
+            try:
+                if flag in (proc.info["cmdline"] or []):
+                    total += proc.info["memory_info"].rss
+            except (psutil.Error, TypeError):
+                continue
+        return total
+
+
+## BROWSER POOL ##
+class McpBrowserPool:
+    """
+    Pool of browser-mcp.js workers. A request leases one worker for its whole
+    agent run, so concurrent users never share pages, and a session goes back
+    to the worker it used last when that one is free. Every worker starts on
+    a fresh profile that is deleted when it stops, and a worker last used by
+    another session has its pages, cookies and site storage cleared by the
+    resetSession tool before it is handed over, which keeps Chromium running;
+    only a worker whose reset fails is restarted. Profiles are named per
+    process and slot, so uvicorn workers never share one. Workers start on demand up to `size`; a maintenance loop
+    pings idle ones, restarts those that stopped answering, closes those idle
+    past `idle_seconds`, and closes idle browsers while the pool is over its
+    memory cap.
+    """
+
+    def __init__(self, size: int = MCP_POOL_SIZE, lease_timeout: float = MCP_LEASE_TIMEOUT,
+                 idle_seconds: float = MCP_IDLE_SECONDS, health_interval: float = MCP_HEALTH_INTERVAL,
+                 memory_cap_mb: int = MCP_MEMORY_CAP_MB, profile_root: str = MCP_PROFILE_ROOT):
+        self.size = size
+        self.lease_timeout = lease_timeout
+        self.idle_seconds = idle_seconds
+        self.health_interval = health_interval
+        self.memory_cap = memory_cap_mb * 1024 * 1024
+        self.profile_root = profile_root
+        self._workers = {}  # slot -> McpWorker
+        self._starting = set()  # slots being spawned
+        self._cond = None
+        self._maintainer = None
+        self._over_cap = False
+        self._closing = False
+        self.leases = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.resets = 0  # browser state cleared to hand a worker to another session
+        self.reaped = 0
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    ## leasing ##
+    @asynccontextmanager
+    async def lease(self, session_key: str = None):
+        """ Yields an MCP server for exclusive use, or None when no browser is available in time """
+        worker = await self._acquire(session_key)
+        failed = False
+        try:
+            yield worker.server if worker else None
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if worker is not None:
+                await self._release(worker, check=failed)
+
+    def _pick(self, session_key: str = None, reuse: bool = False):
+        """ An idle worker this session can use as is; with `reuse`, any idle worker """
+        idle = [worker for worker in self._workers.values() if not worker.leased]
+        for worker in idle:
+            if worker.session_key == session_key or worker.session_key is None:
+                return worker
+        if reuse and idle:
+            # least recently used keeps the others warm for their sessions
+            return min(idle, key=lambda worker: worker.last_used)
+        return None
+
+    async def _acquire(self, session_key: str = None):
+        cond = self._condition()
+        deadline = time.monotonic() + self.lease_timeout
+        slot = None
+        async with cond:
+            while True:
+                if self._closing:
+                    return None
+                worker = self._pick(session_key)
+                if worker is not None:
+                    worker.leased = True
+                    break
+                # a fresh worker is cheaper than resetting another session's
+                if len(self._workers) + len(self._starting) < self.size and not self._over_cap:
+                    slot = min(set(range(self.size)) - set(self._workers) - self._starting)
+                    self._starting.add(slot)
+                    break
+                worker = self._pick(session_key, reuse=True)
+                if worker is not None:
+                    worker.leased = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    print("WARNING: no browser worker free, running without browser tools")
+                    return None
+                self.waits += 1
+                try:
+                    await asyncio.wait_for(cond.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+        if slot is not None:
+            worker = await self._spawn(slot)
+        elif worker.session_key not in (None, session_key):
+            worker = await self._reset(worker)
+        if worker is None:
+            return None
+        worker.session_key = session_key
+        worker.leases += 1
+        self.leases += 1
+        return worker
+
+    async def _release(self, worker: McpWorker, check: bool = False):
+        # a failed run may have taken the browser down with it
+        if check and not await self._healthy(worker):
+            await self._restart(worker)
+        async with self._condition():
+            worker.leased = False
+            worker.last_used = time.monotonic()
+            self._condition().notify()
+
+    ## worker lifecycle ##
+    def _profile(self, slot: int) -> str:
+        return f"{self.profile_root}-{os.getpid()}-{slot}"
+
+    def _remove_stale_profiles(self):
+        """ Profiles left behind by backend processes that are gone """
+        for path in glob.glob(f"{glob.escape(self.profile_root)}-*-*"):
+            pid = path[len(self.profile_root) + 1:].split("-")[0]
+            if pid.isdigit() and int(pid) != os.getpid() and not psutil.pid_exists(int(pid)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    async def _spawn(self, slot: int, leased: bool = True):
+        """ Start a worker in a reserved slot; None if it cannot start """
+        worker = None
+        try:
+            browser_script = get_browser_script_path()
+            if not browser_script:
+                print("WARNING: browser-mcp.js not found, browser tools disabled")
+                return None
+
+            from pydantic_ai.mcp import MCPServerStdio
+
+            profile = self._profile(slot)
+            # nothing of the previous lessee survives into this worker
+            await asyncio.to_thread(shutil.rmtree, profile, True)
+            server = MCPServerStdio(
+                command='node',
+                args=[browser_script],
+                timeout=60,
+                env={**os.environ, "WEBSURF_PROFILE_PATH": profile}
+            )
+            # Initialize the connection (this starts the browser process)
+            await server.__aenter__()
+            worker = McpWorker(slot, server, profile)
+            worker.leased = leased
+            print(f"MCP browser worker {slot} started with profile: {profile}")
+            return worker
+        except Exception as e:
+            print(f"Failed to start MCP browser worker {slot}: {e}")
+            return None
+        finally:
+            async with self._condition():
+                self._starting.discard(slot)
+                if worker is not None:
+                    self._workers[slot] = worker
+                self._condition().notify()
+
+    async def _close(self, worker: McpWorker, keep_slot: bool = False):
+        """ Stop a worker; `keep_slot` reserves its slot for a replacement """
+        async with self._condition():
+            self._workers.pop(worker.slot, None)
+            if keep_slot:
+                self._starting.add(worker.slot)
+            self._condition().notify()
+        try:
+            await asyncio.wait_for(worker.server.__aexit__(None, None, None), timeout=5.0)
+        except asyncio.TimeoutError:
+            print(f"MCP browser worker {worker.slot} cleanup timed out")
+        except Exception as e:
+            print(f"Error closing MCP browser worker {worker.slot}: {e}")
+        await asyncio.to_thread(shutil.rmtree, worker.profile, True)
+
+    async def _reset(self, worker: McpWorker):
+        """ Clear the previous session's browser state; restarts the worker if that fails """
+        try:
+            await asyncio.wait_for(worker.server.direct_call_tool("resetSession", {}), timeout=MCP_HEALTH_TIMEOUT)
+            self.resets += 1
+            return worker
+        except Exception as e:
+            print(f"Resetting MCP browser worker {worker.slot} failed, restarting: {e}")
+            return await self._restart(worker, leased=True)
+
+    async def _restart(self, worker: McpWorker, leased: bool = False):
+        """ Replace a worker in its slot; the replacement starts idle unless `leased` """
+        if not leased:
+            print(f"MCP browser worker {worker.slot} stopped responding, restarting")
+        self.restarts += 1
+        await self._close(worker, keep_slot=True)
+        if self._closing:
+            async with self._condition():
+                self._starting.discard(worker.slot)
+            return None
+        return await self._spawn(worker.slot, leased=leased)
+
+    @staticmethod
+    async def _healthy(worker: McpWorker) -> bool:
+        try:
+            await asyncio.wait_for(worker.server.list_tools(), timeout=MCP_HEALTH_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    ## maintenance ##
+    async def start(self):
+        await asyncio.to_thread(self._remove_stale_profiles)
+        if self._maintainer is None:
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Error checking MCP browser workers: {e}")
+
+    async def _take_idle(self) -> list:
+        """ Mark idle workers as leased so checks never race a request """
+        async with self._condition():
+            idle = [worker for worker in self._workers.values() if not worker.leased]
+            for worker in idle:
+                worker.leased = True
+            return idle
+
+    async def check(self):
+        """ One maintenance pass: reap idle workers, restart dead ones, enforce the memory cap """
+        now = time.monotonic()
+        for worker in await self._take_idle():
+            if now - worker.last_used > self.idle_seconds:
+                self.reaped += 1
+                await self._close(worker)
+                continue
+            if not await self._healthy(worker):
+                await self._restart(worker)
+                continue
+            await self._release(worker)
+        await self._enforce_memory_cap()
+
+    async def _enforce_memory_cap(self):
+        workers = list(self._workers.values())
+        usage = dict(zip(workers, await asyncio.gather(
+            *(asyncio.to_thread(worker.memory_bytes) for worker in workers))))
+        total = sum(usage.values())
+        self._over_cap = total > self.memory_cap
+        if not self._over_cap:
+            return
+        # idle browsers first, largest first, until the pool fits again
+        for worker in sorted(await self._take_idle(), key=usage.get, reverse=True):
+            if total <= self.memory_cap:
+                await self._release(worker)
+                continue
+            print(f"Closing MCP browser worker {worker.slot}: pool over {self.memory_cap // 2**20} MB")
+            total -= usage.get(worker, 0)
+            self.reaped += 1
+            await self._close(worker)
+        self._over_cap = total > self.memory_cap
+
+    async def shutdown(self):
+        self._closing = True
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            await asyncio.gather(self._maintainer, return_exceptions=True)
+            self._maintainer = None
+        async with self._condition():
+            self._condition().notify_all()
+        await asyncio.gather(*(self._close(worker) for worker in list(self._workers.values())))
+        print("MCP browser pool closed")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "size": self.size,
+            "workers": [{"slot": worker.slot, "leased": worker.leased, "leases": worker.leases,
+                         "idle_seconds": 0 if worker.leased else round(now - worker.last_used, 1),
+                         "uptime_seconds": round(now - worker.started_at, 1)}
+                        for worker in sorted(self._workers.values(), key=lambda worker: worker.slot)],
+            "starting": len(self._starting),
+            "leases": self.leases,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "resets": self.resets,
+            "reaped": self.reaped,
+            "over_memory_cap": self._over_cap,
+            "memory_cap_mb": self.memory_cap // 2**20,
+        }
+
+
+mcp_pool = McpBrowserPool()
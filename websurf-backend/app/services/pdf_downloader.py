@@ -0,0 +1,180 @@
+## imports ##
+import os
+import json
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import httpx
+from app.config import PDF_CACHE_DIR, PDF_DOWNLOAD_MAX_MB, PDF_CACHE_MAX_MB, PDF_DOWNLOAD_TIMEOUT, PDF_SPOOL_MAX_MB
+
+
+class DownloadError(RuntimeError):
+    """ Raised when a PDF cannot be fetched within the size and time limits """
+
+
+## PDF DOWNLOADER ##
+class PdfDownloader:
+    """
+    Async PDF fetcher with a pooled HTTP client and an on-disk cache keyed by URL.
+    Cached files are revalidated with ETag / Last-Modified, so re-adding an
+    unchanged URL costs a single 304 round trip. The cache holds at most
+    `cache_mb`; every use refreshes a file's mtime and the least recently
+    used files are evicted first.
+    """
+
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_mb: int = PDF_DOWNLOAD_MAX_MB,
+                 timeout: float = PDF_DOWNLOAD_TIMEOUT, spool_mb: int = PDF_SPOOL_MAX_MB,
+                 cache_mb: int = PDF_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 1024 * 1024
+        self.cache_bytes = cache_mb * 1024 * 1024
+        self.timeout = timeout
+        self.spool_bytes = spool_mb * 1024 * 1024
+        self._client = None
+        self.downloads = 0
+        self.revalidated = 0
+        self.bytes_downloaded = 0
+        self.evicted = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.pdf"), os.path.join(self.cache_dir, f"{key}.json")
+
+    async def fetch(self, url: str) -> str:
+        """ Return a local path to the PDF at url, downloading only if it changed """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            return await asyncio.wait_for(self._fetch(url), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise DownloadError(f"Timed out downloading {url} after {self.timeout}s")
+        except httpx.HTTPError as e:
+            raise DownloadError(f"Failed to download {url}: {e}")
+
+    async def _fetch(self, url: str) -> str:
+        pdf_path, meta_path = self._cache_paths(url)
+        meta = self._read_meta(meta_path) if os.path.exists(pdf_path) else None
+
+        # conditional request when we already hold a copy
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and meta:
+                self.revalidated += 1
+                await asyncio.to_thread(self._touch, pdf_path)
+                return pdf_path
+            response.raise_for_status()
+
+            length = response.headers.get("content-length")
+            if length and length.isdigit() and int(length) > self.max_bytes:
+                raise DownloadError(f"PDF at {url} is larger than {self.max_bytes} bytes")
+
+            # per-request spool, kept in memory until it grows past spool_bytes
+            with tempfile.SpooledTemporaryFile(max_size=self.spool_bytes) as spool:
+                size = 0
+                async for block in response.aiter_bytes():
+                    size += len(block)
+                    if size > self.max_bytes:
+                        raise DownloadError(f"PDF at {url} is larger than {self.max_bytes} bytes")
+                    spool.write(block)
+                spool.seek(0)
+                await asyncio.to_thread(self._store, spool, pdf_path)
+
+            self._write_meta(meta_path, {
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "size": size,
+            })
+            self.downloads += 1
+            self.bytes_downloaded += size
+            await asyncio.to_thread(self._evict, pdf_path)
+            return pdf_path
+
+    def _store(self, spool, pdf_path: str):
+        # write next to the target and swap in atomically so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(spool, f)
+            os.replace(tmp_path, pdf_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _touch(pdf_path: str):
+        try:
+            os.utime(pdf_path)
+        except OSError:
+            pass
+
+    def _evict(self, keep: str):
+        """ Remove least recently used PDFs until the cache fits cache_bytes; `keep` always stays """
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pdf"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.cache_bytes:
+                break
+            if path == keep:
+                continue
+            for victim in (path, path[:-len(".pdf")] + ".json"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+            self.evicted += 1
+
+    @staticmethod
+    def _read_meta(meta_path: str):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path: str, meta: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def stats(self) -> dict:
+        return {
+            "downloads": self.downloads,
+            "revalidated": self.revalidated,
+            "bytes_downloaded": self.bytes_downloaded,
+            "evicted": self.evicted,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+pdf_downloader = PdfDownloader()
@@ -0,0 +1,103 @@
+## imports ##
+from dataclasses import dataclass
+import numpy as np
+
+MODES = ("float32", "float16", "int8")
+SEARCH_BLOCK_ROWS = 65536  # rows dequantized at a time while searching
+
+
+## QUANTIZED VECTORS ##
+@dataclass
+class QuantizedVectors:
+    """ Embedding matrix stored as float32, float16, or int8 with a per-vector scale """
+    mode: str
+    data: np.ndarray
+    scale: np.ndarray = None  # (n,) float32, int8 only
+    norms: np.ndarray = None  # (n,) float32 squared norms, computed per block when missing
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def dequantize(self, start: int = 0, stop: int = None) -> np.ndarray:
+        block = self.data[start:stop]
+        if self.mode == "int8":
+            return block.astype(np.float32) * self.scale[start:stop, None]
+        return np.asarray(block, dtype=np.float32)
+
+    def dot(self, queries: np.ndarray, start: int = 0, stop: int = None) -> np.ndarray:
+        """ queries @ rows[start:stop].T, applying int8 scales after the product instead of to every element """
+        block = self.data[start:stop]
+        if self.mode == "int8":
+            return (queries @ block.astype(np.float32).T) * self.scale[start:stop]
+        return queries @ np.asarray(block, dtype=np.float32).T
+
+    def search(self, queries: np.ndarray, k: int = 10, mask: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact squared-L2 top-k, dequantizing block by block; returns (indices, distances).
+        Rows where `mask` is False are skipped.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n = len(self)
+        k = min(k, n if mask is None else int(mask.sum()))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        q_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        best_idx = np.empty((len(queries), 0), dtype=np.int64)
+        best_dist = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            stop = min(n, start + SEARCH_BLOCK_ROWS)
+            if self.norms is not None:
+                block_norms = self.norms[start:stop]
+            else:
+                block = self.dequantize(start, stop)
+                block_norms = np.einsum("ij,ij->i", block, block)
+            dist = q_norms + block_norms[None, :] - 2.0 * self.dot(queries, start, stop)
+            if mask is not None:
+                dist[:, ~mask[start:stop]] = np.inf
+            # merge this block's candidates with the running top-k
+            idx = np.concatenate([best_idx, np.arange(start, stop)[None, :].repeat(len(queries), 0)], 1)
+            dist = np.concatenate([best_dist, dist], 1)
+            top = np.argpartition(dist, k - 1, axis=1)[:, :k] if dist.shape[1] > k else np.argsort(dist, axis=1)
+            best_idx = np.take_along_axis(idx, top, 1)
+            best_dist = np.take_along_axis(dist, top, 1)
+        order = np.argsort(best_dist, axis=1)
+        return np.take_along_axis(best_idx, order, 1), np.maximum(np.take_along_axis(best_dist, order, 1), 0)
+
+
+def quantize(vectors: np.ndarray, mode: str = "float32") -> QuantizedVectors:
+    """ Quantize an (n, dim) embedding matrix """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if mode == "float32":
+        return QuantizedVectors(mode, vectors)
+    if mode == "float16":
+        return QuantizedVectors(mode, vectors.astype(np.float16))
+    if mode == "int8":
+        # symmetric per-vector scale so every row uses the full int8 range
+        scale = np.abs(vectors).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        data = np.clip(np.rint(vectors / scale[:, None]), -127, 127).astype(np.int8)
+        return QuantizedVectors(mode, data, scale.astype(np.float32))
+    raise ValueError(f"Unknown quantization mode: {mode} (expected one of {MODES})")
+
+
+def evaluate_quantization(vectors: np.ndarray, queries: np.ndarray, mode: str, k: int = 10) -> dict:
+    """ Memory saved and recall@k lost by `mode` against the float32 baseline """
+    baseline = quantize(vectors, "float32")
+    quantized = quantize(vectors, mode)
+    expected, _ = baseline.search(queries, k)
+    got, _ = quantized.search(queries, k)
+    overlap = [len(set(e) & set(g)) / max(1, len(e)) for e, g in zip(expected.tolist(), got.tolist())]
+    recall = float(np.mean(overlap)) if overlap else 1.0
+    return {
+        "mode": mode,
+        "vectors": len(baseline),
+        "float32_bytes": baseline.nbytes,
+        "quantized_bytes": quantized.nbytes,
+        "memory_saved": 1.0 - quantized.nbytes / max(1, baseline.nbytes),
+        f"recall_at_{k}": recall,
+        "recall_lost": 1.0 - recall,
+    }
@@ -5,6 +5,8 @@ import sys
 import requests
 import os
 import re
+import hashlib
+import tempfile
 import unicodedata
 
 dependencies = [
@@ -31,123 +33,269 @@ print("\nAll dependencies are ready to use!")
 
 
 ##Imports ##
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-import chromadb
-from sentence_transformers import SentenceTransformer
+import numpy as np
 import pdfplumber as pdf_tool
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index
+from app.services.embedder_registry import get_embedder
+from app.services.text_normalizer import pdf_normalizer
+from app.services.chunker import get_chunker
+from app.config import EMBEDDING_MODEL, PDF_DOWNLOAD_TIMEOUT, CHUNK_LENGTH_UNIT
+
+
+TEXT_SOURCE = "text" #source label for raw text / chunk ingestion
+
+class IngestionCancelled(Exception):
+    """ Raised inside the pipeline when an ingestion job is cancelled """
+
+def make_chunk_id(collection_name:str,source:str,text:str)->str:
+    #content-addressed id: same collection, source and normalized text -> same id
+    normalized=" ".join(unicodedata.normalize("NFKC",text).split())
+    return hashlib.sha256(f"{collection_name}\x1f{source}\x1f{normalized}".encode("utf-8")).hexdigest()[:32]
 
 
 ## RAG PIPELINE ##
 class RagPipeline:
-    def __init__(self):
+    def __init__(self,embedding_model:str=None,source:str=TEXT_SOURCE):
         self.chunks=None
+        self.metadatas=None #page and character offsets per chunk
         self.embeddings=None
         self.pages=1 #bydefault
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.client=chromadb.Client()
+        self.embedding_model=embedding_model or EMBEDDING_MODEL
+        self.db_path=None #backend default storage (in-memory for chroma)
+        self.source=source #where the chunks came from, part of the chunk ids
+        self.embedded=0 #chunks sent to the encoder
+        self.unchanged=0 #chunks already stored, encoder skipped
+        self.indexed=0 #chunks written or confirmed in the collection
+        self.progress=None #optional callback(pages_parsed, chunks_embedded, chunks_indexed)
+        self.cancel_event=None #optional threading.Event checked between pages and batches
+
+    @property
+    def embedder(self):
+        # shared model from the process-wide registry, loaded once
+        return get_embedder(self.embedding_model)
         
     def chunks_from_pdf(self,pdf_path:str,chunk_overlap:int=50):
         #make chunks from pdf file
-        pages=[]
+        self.chunks,self.metadatas=[],[]
+        for chunk,metadata in self.iter_pdf_chunks(pdf_path,chunk_overlap=chunk_overlap):
+            self.chunks.append(chunk)
+            self.metadatas.append(metadata)
+
+    def iter_pdf_pages(self,pdf_path):
+        #yield (page number, cleaned text) one page at a time, pages start at 1
         with pdf_tool.open(pdf_path) as pdf:
-            for page in pdf.pages:
+            for page_number,page in enumerate(pdf.pages,start=1):
                 text = page.extract_text()
+                page.close() #drop parsed layout objects so memory stays flat
+                self.pages=page_number
+                self._check_cancelled()
+                self._report_progress()
                 if text:
-                    pages.append(self._clean_text(text))
-        pdf_content = "\n".join(pages)
-        self.pages=len(pages)
-        self.chunks=self._make_chunks(text_content=pdf_content,
-                     chunk_size=500,chunk_overlap=chunk_overlap)
+                    yield page_number,self._clean_text(text)
+
+    def iter_pdf_chunks(self,pdf_path,chunk_size:int=500,chunk_overlap:int=50):
+        #yield (chunk, metadata) with the exact page and character offsets in that page
+        for page_number,text in self.iter_pdf_pages(pdf_path):
+            for chunk,start in self._make_chunks_with_offsets(text,chunk_size=chunk_size,
+                                                               chunk_overlap=chunk_overlap):
+                yield chunk,{"page":page_number,"start":start,"end":start+len(chunk)}
+
+    def ingest_pdf_stream(self,pdf_path,collection_name:str='default_collection',db_path:str=None,
+                          append:bool=True,batch_size:int=32,chunk_overlap:int=50,
+                          embedding_model:str=None):
+        #stream pages -> chunks -> batched embeddings -> batched add, memory bounded by batch_size
+        if embedding_model:
+            self.embedding_model = embedding_model
+        self.db_path = db_path
+        collection = self._open_collection(collection_name,db_path=db_path,append=append)
+        return self._ingest_pairs(collection,self.iter_pdf_chunks(pdf_path,chunk_overlap=chunk_overlap),
+                                  batch_size=batch_size)
+
+    def ingest_chunks(self,collection_name:str='default_collection',db_path:str=None,
+                      append:bool=True,batch_size:int=32,embedding_model:str=None):
+        #index self.chunks in batches, embedding only chunks that are not stored yet
+        if embedding_model:
+            self.embedding_model = embedding_model
+        self.db_path = db_path
+        collection = self._open_collection(collection_name,db_path=db_path,append=append)
+        metadatas = self.metadatas if self.metadatas and len(self.metadatas)==len(self.chunks) \
+            else [{"page":1} for _ in self.chunks]
+        return self._ingest_pairs(collection,zip(self.chunks,metadatas),batch_size=batch_size)
+
+    def _ingest_pairs(self,collection,pairs,batch_size:int=32):
+        #batch (chunk, metadata) pairs into the collection, returns number of distinct chunks
+        batch,seen=[],set()
+        for item in pairs:
+            batch.append(item)
+            if len(batch)>=batch_size:
+                self._add_batch(collection,batch,seen)
+                batch=[]
+        if batch:
+            self._add_batch(collection,batch,seen)
+        self._prune_stale(collection,seen)
+        return len(seen)
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise IngestionCancelled("Ingestion cancelled.")
+
+    def _report_progress(self):
+        if self.progress is not None:
+            self.progress(pages_parsed=self.pages,chunks_embedded=self.embedded,
+                          chunks_indexed=self.indexed)
+
+    def _add_batch(self,collection,batch:list,seen:set):
+        #embed and upsert one batch, skipping chunks whose content hash is already stored
+        self._check_cancelled()
+        new={}
+        for chunk,metadata in batch:
+            chunk_id=make_chunk_id(collection.name,self.source,chunk)
+            if chunk_id not in seen and chunk_id not in new:
+                new[chunk_id]=(chunk,{**metadata,"source":self.source})
+        seen.update(new)
+        if not new:
+            return
+        existing=collection.get(ids=list(new),include=[])["ids"]
+        if existing:
+            # unchanged text, only refresh page/offset metadata
+            collection.update(ids=existing,metadatas=[new[i][1] for i in existing])
+            self.unchanged+=len(existing)
+            self.indexed+=len(existing)
+        existing=set(existing)
+        ids=[i for i in new if i not in existing]
+        if ids:
+            chunks=[new[i][0] for i in ids]
+            embeddings=self._encode(chunks)
+            self.embedded+=len(ids)
+            self._report_progress()
+            collection.upsert(
+                ids=ids,
+                documents=chunks,
+                embeddings=embeddings,
+                metadatas=[new[i][1] for i in ids]
+            )
+            self.indexed+=len(ids)
+        # BM25 terms for the same batch; ids already indexed are skipped
+        lexical_index.add(collection.name,list(new),[new[i][0] for i in new],db_path=self.db_path)
+        self._report_progress()
+
+    def _prune_stale(self,collection,seen:set):
+        #re-ingesting a named source replaces it, drop chunks that are gone from the new version
+        if self.source==TEXT_SOURCE:
+            return
+        stored=collection.get(where={"source":self.source},include=[])["ids"]
+        stale=[i for i in stored if i not in seen]
+        if stale:
+            collection.delete(ids=stale)
+            lexical_index.delete(collection.name,stale,db_path=self.db_path)
         
     def chunks_from_url(self,pdf_url:str,chunk_overlap:int=50):
-        #make chunks from the pdf url
-        local_path = "temp.pdf"
-        response = requests.get(pdf_url)
-        with open(local_path, "wb") as f:
+        #make chunks from the pdf url (blocking; the async ingestion path uses pdf_downloader)
+        response = requests.get(pdf_url, timeout=PDF_DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        # unique temp file per call so concurrent downloads never clash
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
             f.write(response.content)
-        self.chunks_from_pdf(local_path)
-        # Check if file exists before deleting
-        if os.path.exists(local_path):
-            os.remove(local_path)
+            local_path = f.name
+        try:
+            self.chunks_from_pdf(local_path,chunk_overlap=chunk_overlap)
+        finally:
+            # Check if file exists before deleting
+            if os.path.exists(local_path):
+                os.remove(local_path)
 
     def chunks_from_text(self,text_content:str,return_chunk:bool=False,chunk_overlap:int=50):
         #make chunks from text
         if return_chunk:
             return self._make_chunks(text_content=text_content)
-        self.chunks=self._make_chunks(text_content=text_content,chunk_overlap=chunk_overlap)
+        pairs=self._make_chunks_with_offsets(text_content,chunk_overlap=chunk_overlap)
+        self.chunks=[chunk for chunk,_ in pairs]
+        self.metadatas=[{"page":1,"start":start,"end":start+len(chunk)} for chunk,start in pairs]
         
     def _clean_text(self,text):
-        # Remove duplicate characters
-        text = re.sub(r'([A-Za-z])\1', r'\1', text)
-       # Normalize unicode
-        text = unicodedata.normalize("NFKD", text)
-       # Remove excessive whitespace and weird spacing
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        # duplicate characters, unicode and whitespace cleanup with precompiled rules
+        return pdf_normalizer.normalize(text)
+
+    def _chunker(self,chunk_size:int=500,chunk_overlap:int=50):
+        #cached splitter per configuration, measured in embedder tokens by default
+        return get_chunker(chunk_size,chunk_overlap,CHUNK_LENGTH_UNIT,self.embedding_model)
 
     def _make_chunks(self,text_content:str,chunk_size:int=500,
                      chunk_overlap:int=50):
-        splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ".", " ", ""]
-        )
-        return splitter.split_text(text_content) #returns the chunks
+        return self._chunker(chunk_size,chunk_overlap).split(text_content) #returns the chunks
+
+    def _make_chunks_with_offsets(self,text_content:str,chunk_size:int=500,
+                                  chunk_overlap:int=50):
+        #returns (chunk, start offset) pairs
+        return self._chunker(chunk_size,chunk_overlap).split_with_offsets(text_content)
         
+    def _encode(self,texts:list)->np.ndarray:
+        #contiguous float32 matrix straight from the encoder, no Python float lists
+        return np.ascontiguousarray(self.embedder.encode(texts,convert_to_numpy=True),dtype=np.float32)
+
     def make_embeddings(self,batch_size:int=32,chunks:list=None,
                         embedding_model:str=None):
-        # Load embedding model if specified, otherwise keep default
+        # Use the requested model for this instance only, otherwise keep default
         if embedding_model:
-            self.embedder = SentenceTransformer(embedding_model)
+            self.embedding_model = embedding_model
         #prepare the embeddings from the chunk
-        self.embeddings=[]
         #check is chunks provided
-        if chunks:self.chunks=chunks    
+        if chunks:
+            self.chunks=chunks
+            self.metadatas=None
+        self.embeddings=None
         for i in range(0, len(self.chunks), batch_size):
-            batch = self.chunks[i:i+batch_size]
-            batch_embeddings = self.embedder.encode(batch).tolist()
-            self.embeddings.extend(batch_embeddings)
+            batch_embeddings = self._encode(self.chunks[i:i+batch_size])
+            if self.embeddings is None:
+                # preallocate once the dimension is known
+                self.embeddings=np.empty((len(self.chunks),batch_embeddings.shape[1]),dtype=np.float32)
+            self.embeddings[i:i+len(batch_embeddings)] = batch_embeddings
         
-    def save_embeddings(self, collection_name: str = 'default_collection', embeddings: list[list] = None,
+    def save_embeddings(self, collection_name: str = 'default_collection', embeddings: np.ndarray = None,
                         db_path: str = None, append: bool = True):
-        # Initialize Chroma client
-        self.client = chromadb.PersistentClient(path=db_path) if db_path else chromadb.Client()
+        # Shared vector store handle for this storage path
+        self.db_path = db_path
         
-        if embeddings:
-            self.embeddings = embeddings
-
-        # Get or create collection
-        collection = self.client.get_or_create_collection(name=collection_name)
-
-        # Generate unique IDs for new documents
-        existing_count = collection.count() if append else 0
-        document_ids = [str(existing_count + i) for i in range(len(self.chunks))]
-
-        # Rough page mapping
-        metadatas = [{"page": i // max(1, len(self.chunks)//self.pages)} for i in range(len(self.chunks))]
-
-        # Add or replace embeddings
-        if append:
-            collection.add(
-                ids=document_ids,
-                documents=self.chunks,
-                embeddings=self.embeddings,
-                metadatas=metadatas
-            )
+        if embeddings is not None:
+            self.embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        collection = self._open_collection(collection_name, db_path=db_path, append=append)
+
+        # Exact page/offset metadata when the source provided it
+        if self.metadatas and len(self.metadatas) == len(self.chunks):
+            metadatas = self.metadatas
         else:
-            # Overwrite the collection if append=False
-            collection.delete()  # Clear existing docs
-            collection.add(
-                ids=document_ids,
-                documents=self.chunks,
-                embeddings=self.embeddings,
-                metadatas=metadatas
-            )
+            metadatas = [{"page": 1} for _ in self.chunks]
+
+        # Content-addressed IDs, duplicates within the batch collapse to one
+        unique = {}
+        for row, (chunk, metadata) in enumerate(zip(self.chunks, metadatas)):
+            chunk_id = make_chunk_id(collection_name, self.source, chunk)
+            unique.setdefault(chunk_id, (row, chunk, {**metadata, "source": self.source}))
+        rows = [row for row, _, _ in unique.values()]
+
+        collection.upsert(
+            ids=list(unique),
+            documents=[chunk for _, chunk, _ in unique.values()],
+            embeddings=self.embeddings[rows],
+            metadatas=[metadata for _, _, metadata in unique.values()]
+        )
+        lexical_index.add(collection_name, list(unique), [chunk for _, chunk, _ in unique.values()], db_path=db_path)
         
+    def _open_collection(self, collection_name: str, db_path: str = None, append: bool = True):
+        # Overwrite the collection if append=False
+        if not append:
+            try:
+                vector_store.delete_collection(collection_name, db_path=db_path)
+            except Exception:
+                pass  # nothing to clear yet
+            lexical_index.drop(collection_name, db_path=db_path)
+        return vector_store.get_collection(collection_name, db_path=db_path)
+
     def retrieve(self,collection_name,query:str,n_results:int=10):
-        collection = self.client.get_or_create_collection(name=collection_name)
-        query_emb=self.embedder.encode(self._make_chunks(query)).tolist()
+        collection = vector_store.get_collection(collection_name, db_path=self.db_path)
+        query_emb=self._encode(self._make_chunks(query))
         results = collection.query(query_embeddings=query_emb,n_results=n_results)['documents'][0]
         # print(results,'\n'*5)
         # for i, (docs_for_query, metas_for_query) in enumerate(zip(results['documents'], results['metadatas'])):
@@ -159,5 +307,6 @@ class RagPipeline:
         
     def delete_data(self,collection_name:str,db_path=None):
         if db_path:
-            self.client = chromadb.PersistentClient(path=db_path)
-        self.client.delete_collection(name=collection_name)
\ No newline at end of file
+            self.db_path = db_path
+        vector_store.delete_collection(collection_name, db_path=self.db_path)
+        lexical_index.drop(collection_name, db_path=self.db_path)
\ No newline at end of file
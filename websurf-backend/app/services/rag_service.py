@@ -1,88 +1,285 @@
 ## imports ##
-from app.services.rag_pipeline import RagPipeline
-import re
-import unicodedata
-import chromadb
+from app.services.rag_pipeline import RagPipeline, TEXT_SOURCE
+from app.services.embedding_cache import query_embedding_cache
+from app.services.embedder_registry import get_embedder
+import asyncio
+import numpy as np
+from app.services.text_normalizer import response_normalizer
+from app.services.quantization import evaluate_quantization
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index, reciprocal_rank_fusion
+from app.config import HYBRID_SEARCH, HYBRID_CANDIDATES
+from app.services.compute_executor import compute_executor, ingestion_executor
+from app.services.pdf_downloader import pdf_downloader
+from app.services.collection_catalog import collection_catalog
 
 rag_model=RagPipeline()
-global avilable_collections
-avilable_collections = {} #dictionary of collection name to description
 
 ## methods ##
 async def data_injestion(pdf_path: str = None, pdf_url: str = None, text_content: str = None,
-                   collection_name: str = "default_collection", description: str = "",
+                   collection_name: str = "default_collection", description: str = None,
                    chunks=None, chunksize: int = 500, chunk_overlap: int = 50, batch_size: int = 32,
-                   embedding_model: str = None, db_path: str = None, append: bool = True):
-    global avilable_collections
-
-    # Register collection info
-    if collection_name not in avilable_collections:
-        avilable_collections[collection_name] = description
-        print(f" New collection registered: {collection_name}")
-    else:
-        if append:
-            print(f"Appending data to existing collection: {collection_name}")
-        else:
-            print(f" Overwriting existing collection: {collection_name}")
-
-    print("🔍 Current collections:", avilable_collections)
+                   embedding_model: str = None, db_path: str = None, append: bool = True,
+                   source: str = None, progress=None, cancel_event=None):
+    # Chunk ids hash the source, so re-adding the same document only embeds what changed
+    source = source or pdf_url or (pdf_path if isinstance(pdf_path, str) else None) or TEXT_SOURCE
     # Create new instance each ingestion (to reset internal state)
-    rag_model = RagPipeline()
-    # Handle ingestion source
+    rag_model = RagPipeline(source=source)
+    rag_model.progress = progress
+    rag_model.cancel_event = cancel_event
+    # Handle ingestion source (parsing runs on the ingestion executor)
+    if pdf_url:
+        # async download into the local PDF cache, then stream it like a file
+        pdf_path = await pdf_downloader.fetch(pdf_url)
     if pdf_path:
-        rag_model.chunks_from_pdf(pdf_path, chunk_overlap=chunk_overlap)
-    elif pdf_url:
-        rag_model.chunks_from_url(pdf_url, chunk_overlap=chunk_overlap)
+        # PDFs stream page by page straight into the collection
+        saved = await ingestion_executor.run(rag_model.ingest_pdf_stream, pdf_path, collection_name=collection_name,
+                                             db_path=db_path, append=append, batch_size=batch_size,
+                                             chunk_overlap=chunk_overlap, embedding_model=embedding_model)
     elif text_content:
-        rag_model.chunks_from_text(text_content, chunk_overlap=chunk_overlap)
+        await ingestion_executor.run(rag_model.chunks_from_text, text_content, chunk_overlap=chunk_overlap)
     elif chunks:
         rag_model.chunks = chunks
     else:
         raise ValueError("Please provide either pdf_path, pdf_url, or text_content.")
-    # Generate embeddings and save
-    rag_model.make_embeddings(embedding_model=embedding_model, batch_size=batch_size)
-    rag_model.save_embeddings(collection_name=collection_name, db_path=db_path, append=append)
-    print(f"Data Ingestion complete: {len(rag_model.chunks)} chunks saved to '{collection_name}'.")
+    if not pdf_path:
+        # Embed new chunks and save, off the event loop
+        saved = await ingestion_executor.run(rag_model.ingest_chunks, collection_name=collection_name,
+                                             db_path=db_path, append=append, batch_size=batch_size,
+                                             embedding_model=embedding_model)
+    print(f"Data Ingestion complete: {saved} chunks in '{collection_name}' "
+          f"({rag_model.embedded} embedded, {rag_model.unchanged} unchanged).")
+    # Register collection info in the shared catalog only once the ingest succeeded
+    if await collection_catalog.register(collection_name, description):
+        print(f" New collection registered: {collection_name}")
+    await collection_catalog.update_stats(collection_name, **await ingestion_executor.run(
+        _collection_stats, rag_model, collection_name, db_path))
+
+def _collection_stats(pipeline: RagPipeline, collection_name: str, db_path: str = None) -> dict:
+    dimension = pipeline.embedder.get_sentence_embedding_dimension()
+    collection = vector_store.get_collection(collection_name, db_path=db_path, create=False)
+    return {
+        "embedding_model": pipeline.embedding_model,
+        "dimension": dimension,
+        "chunk_count": collection.count(),
+        "byte_size": vector_store.size_bytes(collection_name, db_path=db_path, dimension=dimension),
+    }
+
+def embed_texts(texts: list[str], embedding_model: str = None) -> np.ndarray:
+    """ Embed texts into an (n, dim) float32 matrix, serving repeats from the query embedding cache """
+    model_name = embedding_model or rag_model.embedding_model
+    cached = [query_embedding_cache.get(model_name, text) for text in texts]
+    missing = [i for i, emb in enumerate(cached) if emb is None]
+    if missing:
+        # encode all cache misses in a single call
+        encoded = np.asarray(get_embedder(model_name).encode([texts[i] for i in missing], convert_to_numpy=True),
+                             dtype=np.float32)
+        for i, emb in zip(missing, encoded):
+            query_embedding_cache.put(model_name, texts[i], emb.copy())  # don't pin the whole batch
+            cached[i] = emb
+    return np.vstack(cached) if cached else np.empty((0, 0), dtype=np.float32)
+
+def embed_query(query: str, embedding_model: str = None) -> np.ndarray:
+    """ Embed query chunks through the query embedding cache """
+    query_chunks = rag_model.chunks_from_text(text_content=query, return_chunk=True) or [query]
+    return embed_texts(query_chunks, embedding_model=embedding_model)
+
+async def hybrid_query(collection, query_texts: list[str], query_embeddings: np.ndarray, n_results: int,
+                       groups: list[list[int]] = None, db_path: str = None) -> dict:
+    """
+    Dense and BM25 candidates fused with reciprocal-rank fusion, one result row per query text.
+    `groups[i]` lists the embedding rows of query_texts[i] (default: row i). Returns a Chroma-shaped
+    dict plus `scores` (fused, higher is better). `distances` are squared L2 to the nearest query
+    embedding, as both stores return them, so they compare across collections sharing an embedder.
+    """
+    groups = groups or [[i] for i in range(len(query_texts))]
+    candidates = n_results * HYBRID_CANDIDATES if HYBRID_SEARCH else n_results
+    dense_search = compute_executor.run(collection.query, query_embeddings=query_embeddings, n_results=candidates)
+    if HYBRID_SEARCH:
+        dense, lexical = await asyncio.gather(dense_search, compute_executor.run(
+            lexical_index.search_many, collection.name, query_texts, candidates, db_path))
+    else:
+        dense, lexical = await dense_search, [[] for _ in query_texts]
+
+    # best distance per stored chunk across the dense rows
+    found = {}
+    for ids, docs, metas, dists in zip(dense["ids"], dense["documents"], dense["metadatas"], dense["distances"]):
+        for doc_id, doc, meta, dist in zip(ids, docs, metas, dists):
+            if doc_id not in found or dist < found[doc_id][2]:
+                found[doc_id] = (doc, meta, dist)
+
+    fused = []
+    for rows, lexical_hits in zip(groups, lexical):
+        scores = reciprocal_rank_fusion([dense["ids"][row] for row in rows] + [[doc_id for doc_id, _ in lexical_hits]])
+        fused.append(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+    # BM25-only hits are read back from the vector store, which stays the source of truth
+    missing = list({doc_id for ranking in fused for doc_id, _ in ranking[:n_results] if doc_id not in found})
+    if missing:
+        stored = await compute_executor.run(collection.get, ids=missing,
+                                             include=["documents", "metadatas", "embeddings"])
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        for doc_id, doc, meta, emb in zip(stored["ids"], stored["documents"], stored["metadatas"],
+                                          stored["embeddings"]):
+            diff = queries - np.asarray(emb, dtype=np.float32)
+            found[doc_id] = (doc, meta, float(np.einsum("ij,ij->i", diff, diff).min()))
+
+    result = {"ids": [], "documents": [], "metadatas": [], "distances": [], "scores": []}
+    for ranking in fused:
+        # index entries whose vectors are gone are skipped
+        ranking = [(doc_id, score) for doc_id, score in ranking if doc_id in found][:n_results]
+        result["ids"].append([doc_id for doc_id, _ in ranking])
+        result["documents"].append([found[doc_id][0] for doc_id, _ in ranking])
+        result["metadatas"].append([found[doc_id][1] for doc_id, _ in ranking])
+        result["distances"].append([found[doc_id][2] for doc_id, _ in ranking])
+        result["scores"].append([score for _, score in ranking])
+    return result
 
 async def query_engine(query,collection_name="default_collection",pretty_print=True,
                  n_results=5,db_path=None):
-    rag_model.chunks_from_text(text_content=query)
-    rag_model.make_embeddings()
-    rag_model.client = chromadb.PersistentClient(path=db_path) if db_path else chromadb.Client()
-    collection = rag_model.client.get_collection(name=collection_name)
-    results = collection.query(query_embeddings=rag_model.embeddings,n_results=n_results)
+    query_embeddings = await compute_executor.run(embed_query, query)
+    collection = vector_store.get_collection(collection_name, db_path=db_path, create=False)
+    # every query chunk ranks the same candidates, fused into one list
+    results = await hybrid_query(collection, [query], query_embeddings, n_results,
+                                 groups=[list(range(len(query_embeddings)))], db_path=db_path)
     return await _clean_documents_result(results) if pretty_print else results
 
+async def search_collections(query: str, collection_names: list[str] = None, n_results: int = 5,
+                             db_path: str = None) -> list[dict]:
+    """
+    Embed the query once, search collections concurrently and merge into one global top-k,
+    fused with RRF over every collection's dense and BM25 rankings.
+    """
+    names = list(collection_names) if collection_names else await collection_catalog.names()
+    if not names:
+        return []
+    query_embeddings = await compute_executor.run(embed_query, query)
+
+    async def _search(name):
+        try:
+            collection = vector_store.get_collection(name, db_path=db_path, create=False)
+            return name, await hybrid_query(collection, [query], query_embeddings, n_results,
+                                            groups=[list(range(len(query_embeddings)))], db_path=db_path)
+        except Exception as e:
+            print(f"Search failed for collection '{name}': {e}")
+            return name, None
+
+    # latency tracks the slowest collection, not the sum
+    hits = {}
+    for name, result in await asyncio.gather(*(_search(name) for name in names)):
+        if not result:
+            continue
+        for doc_id, doc, meta, dist, score in zip(result["ids"][0], result["documents"][0], result["metadatas"][0],
+                                                  result["distances"][0], result["scores"][0]):
+            hits[(name, doc_id)] = {"collection": name, "id": doc_id, "document": doc,
+                                    "metadata": meta or {}, "distance": dist, "score": score}
+
+    # a hit's score is its RRF sum over its own collection's rankings, so ordering by it fuses
+    # every collection's rankings at once; BM25-only hits keep their place. Ties go to dense distance.
+    merged = sorted(hits.values(), key=lambda hit: (-hit["score"], hit["distance"]))
+    for hit, cleaned in zip(merged, response_normalizer.normalize_batch([hit["document"] for hit in merged])):
+        hit["document"] = cleaned
+    # documents that clean to nothing are dropped before the cut, so k hits still come back
+    return [hit for hit in merged if hit["document"]][:n_results]
+
+async def batch_query_engine(queries: list[dict], db_path: str = None) -> list[list[dict]]:
+    """
+    Run many searches at once. `queries` holds dicts with `query`, `collection_name` and `k`.
+    All query texts are encoded in one call and each collection is queried once with every
+    embedding aimed at it. Returns one hit list per query, in input order.
+    """
+    if not queries:
+        return []
+    embeddings = await compute_executor.run(embed_texts, [item["query"] for item in queries])
+
+    # group query positions by target collection
+    groups = {}
+    for i, item in enumerate(queries):
+        groups.setdefault(item["collection_name"], []).append(i)
+
+    async def _search(name, positions):
+        collection = vector_store.get_collection(name, db_path=db_path, create=False)
+        n_results = max(queries[i]["k"] for i in positions)
+        result = await hybrid_query(collection, [queries[i]["query"] for i in positions],
+                                    embeddings[positions], n_results, db_path=db_path)
+        return positions, result
+
+    results = [[] for _ in queries]
+    for positions, result in await asyncio.gather(*(_search(name, pos) for name, pos in groups.items())):
+        for row, i in enumerate(positions):
+            k = queries[i]["k"]
+            for doc_id, doc, meta, dist, score in zip(result["ids"][row][:k], result["documents"][row][:k],
+                                                      result["metadatas"][row][:k], result["distances"][row][:k],
+                                                      result["scores"][row][:k]):
+                results[i].append({"id": doc_id, "document": doc, "metadata": meta or {},
+                                   "distance": dist, "score": score})
+
+    # clean every returned document in one normalizer pass
+    hits = [hit for hits in results for hit in hits]
+    for hit, cleaned in zip(hits, response_normalizer.normalize_batch([hit["document"] for hit in hits])):
+        hit["document"] = cleaned
+    return [[hit for hit in hits if hit["document"]] for hits in results]
+
+async def quantization_report(collection_name: str, mode: str = "int8", k: int = 10,
+                              sample: int = 200, db_path: str = None) -> dict:
+    """ Memory saved and recall@k lost if a collection's vectors were stored quantized """
+    collection = vector_store.get_collection(collection_name, db_path=db_path, create=False)
+    stored = await compute_executor.run(collection.get, include=["embeddings"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    if len(vectors) == 0:
+        return {"mode": mode, "vectors": 0}
+    # stored vectors double as queries, a cheap stand-in for real traffic
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(len(vectors), min(sample, len(vectors)), replace=False)]
+    return await compute_executor.run(evaluate_quantization, vectors, queries, mode, k)
+
 async def clean_text_response(text: str) -> str:
-    if not text or not isinstance(text, str):
-        return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r'([,;:.!?])\1+', r'\1', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'•{2,}', '•', text)
-    text = re.sub(r'\b(\w+)( \1\b)+', r'\1', text, flags=re.IGNORECASE)
-    text = re.sub(r'([<>=])\1+', r'\1', text)
-    text = re.sub(r'\.{2,}', '.', text)
-    text = re.sub(r',,', ',', text)
-    text = text.strip()
-    return text
+    return response_normalizer.normalize(text)
 
 async def _clean_documents_result(result_dict: dict) -> list[str]:
     docs = []
     if "documents" in result_dict and result_dict["documents"]:
-        for doc_list in result_dict["documents"]:
-            for doc in doc_list:
-                cleaned = await clean_text_response(doc)
-                if cleaned:
-                    docs.append(cleaned)
+        # one normalizer pass over every retrieved document
+        raw = [doc for doc_list in result_dict["documents"] for doc in doc_list]
+        docs = [doc for doc in response_normalizer.normalize_batch(raw) if doc]
     return docs
 
     
 async def delete_data(collection_name,db_path=None):
-        rag_model.delete_data(collection_name=collection_name,db_path=db_path)
+        await compute_executor.run(rag_model.delete_data, collection_name=collection_name, db_path=db_path)
+        await collection_catalog.remove(collection_name)
         
-async def clear_collections():
-    global avilable_collections
-    for collection_name in avilable_collections.keys():
-        await delete_data(collection_name=collection_name)
-    avilable_collections = {}   
\ No newline at end of file
+async def clear_collections(include_sessions: bool = False):
+    """ Delete every shared collection; users' conversation memory only with include_sessions """
+    for collection_name in await collection_catalog.names(include_sessions=include_sessions):
+        try:
+            await delete_data(collection_name=collection_name)
+        except Exception as e:
+            print(f"Error deleting collection '{collection_name}': {e}")
+    if include_sessions:
+        await collection_catalog.clear()
+
+
+def _missing_collections(names: list[str]) -> list[str]:
+    missing = []
+    for name in names:
+        try:
+            vector_store.get_collection(name, create=False)
+        except Exception:
+            missing.append(name)
+    return missing
+
+
+async def sync_catalog():
+    """
+    The catalog outlives an in-memory vector store; on startup, drop the
+    entries whose collection the store no longer has
+    """
+    if vector_store.persistent:
+        return
+    print("WARNING: vector store is in memory, collections are lost on restart and not shared between workers")
+    names = await collection_catalog.names(include_sessions=True)
+    for name in await asyncio.to_thread(_missing_collections, names):
+        await asyncio.to_thread(lexical_index.drop, name)
+        await collection_catalog.remove(name)
+        print(f"Removed catalog entry for missing collection '{name}'")
@@ -0,0 +1,151 @@
+## imports ##
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from app.services.rag_service import embed_texts
+from app.services.compute_executor import compute_executor
+from app.services.collection_catalog import collection_catalog
+from app.services.embedding_cache import normalize_query
+from app.config import (RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS,
+                        RESPONSE_CACHE_THRESHOLD)
+
+
+@dataclass
+class CachedResponse:
+    answer: str
+    embedding: np.ndarray  # unit-length query embedding
+    stamps: dict  # collection -> last_updated when the answer was produced
+    latency: float  # seconds the agent run took
+    expires_at: float
+
+
+## RESPONSE CACHE ##
+class ResponseCache:
+    """
+    Semantic cache of agent answers. A query hits when an earlier query in the
+    same mode is at least `threshold` cosine-similar and every collection the
+    earlier run consulted still has the catalog `last_updated` it had then, so
+    re-ingesting or deleting a collection invalidates the answers built on it.
+    Answers built on a session's own summary or memory are stored under that
+    user and only served back to them; the rest (all rag mode answers that did
+    not read the session's memory) are shared by all users of this worker.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, maxsize: int = RESPONSE_CACHE_SIZE,
+                 ttl: float = RESPONSE_CACHE_TTL_SECONDS, threshold: float = RESPONSE_CACHE_THRESHOLD):
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._data = OrderedDict()  # (mode, owner, normalized query) -> CachedResponse; owner None is shared
+        self._matrix = {}  # (mode, owner) -> (keys, stacked embeddings), rebuilt after writes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0  # runs that were not cacheable
+        self.invalidated = 0
+        self.saved_seconds = 0.0  # agent time the hits would have cost
+        self.lookup_seconds = 0.0
+
+    async def embed(self, query: str) -> np.ndarray:
+        embedding = (await compute_executor.run(embed_texts, [normalize_query(query)]))[0]
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    async def lookup(self, mode: str, embedding: np.ndarray, user_id: str = None) -> str | None:
+        """ Cached answer for a query embedding, from the shared entries or `user_id`'s own, or None """
+        start = time.perf_counter()
+        stamps = {name: record["last_updated"]
+                  for name, record in (await collection_catalog.records(include_sessions=True)).items()}
+        with self._lock:
+            answer = self._find(mode, user_id, embedding, stamps)
+            if answer is None and user_id is not None:
+                answer = self._find(mode, None, embedding, stamps)
+            if answer is None:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return answer
+
+    def _find(self, mode: str, owner, embedding: np.ndarray, stamps: dict) -> str | None:
+        keys, matrix = self._candidates(mode, owner)
+        if not keys:
+            return None
+        similarity = matrix @ embedding
+        now = time.monotonic()
+        for i in np.argsort(-similarity):
+            if similarity[i] < self.threshold:
+                break
+            entry = self._data.get(keys[i])
+            if entry is None:
+                continue
+            if entry.expires_at < now or any(stamps.get(name) != stamp for name, stamp in entry.stamps.items()):
+                del self._data[keys[i]]
+                self._matrix.pop((mode, owner), None)
+                self.invalidated += 1
+                continue
+            self._data.move_to_end(keys[i])
+            self.hits += 1
+            self.saved_seconds += entry.latency
+            return entry.answer
+        return None
+
+    def _candidates(self, mode: str, owner):
+        cached = self._matrix.get((mode, owner))
+        if cached is None:
+            keys = [key for key in self._data if key[:2] == (mode, owner)]
+            matrix = np.vstack([self._data[key].embedding for key in keys]) if keys else None
+            cached = self._matrix[(mode, owner)] = (keys, matrix)
+        return cached
+
+    async def store(self, mode: str, query: str, embedding: np.ndarray, answer: str,
+                    collections: set, latency: float, user_id: str = None):
+        """
+        Cache an answer, stamped with the current version of the collections it used.
+        `user_id` is required for answers built from that user's personal context.
+        """
+        records = await collection_catalog.records(include_sessions=True)
+        stamps = {name: records.get(name, {}).get("last_updated") for name in collections}
+        with self._lock:
+            self._put((mode, user_id, normalize_query(query)),
+                      CachedResponse(answer, embedding, stamps, latency, time.monotonic() + self.ttl))
+
+    def _put(self, key, entry: CachedResponse):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        self._matrix.clear()
+        self.stores += 1
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._matrix.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "stores": self.stores,
+                "skipped": self.skipped,
+                "invalidated": self.invalidated,
+                "saved_llm_seconds": round(self.saved_seconds, 3),
+                "avg_lookup_ms": self.lookup_seconds / total * 1000 if total else 0.0,
+            }
+
+
+response_cache = ResponseCache()
+
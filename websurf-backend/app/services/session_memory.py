@@ -0,0 +1,135 @@
+## imports ##
+import re
+import time
+import threading
+import numpy as np
+from collections import Counter
+from app.services.rag_pipeline import make_chunk_id
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index
+from app.services.embedder_registry import get_embedder
+from app.services.compute_executor import compute_executor
+from app.services.collection_catalog import collection_catalog
+from app.config import (EMBEDDING_MODEL, SESSION_MEMORY_WINDOW, SESSION_MEMORY_COMPACT_EVERY,
+                        SESSION_MEMORY_SUMMARY_SENTENCES, SESSION_MEMORY_MAX_SUMMARIES)
+
+MEMORY_SOURCE = "conversation"  # source label of session memory entries
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"\w{3,}")
+
+
+def extractive_summary(texts: list[str], max_sentences: int = SESSION_MEMORY_SUMMARY_SENTENCES) -> str:
+    """
+    Keep the sentences whose words recur most across the given turns, in their
+    original order. No model call, so compaction costs one encode of the result.
+    """
+    sentences = [s.strip() for text in texts for s in _SENTENCE_RE.split(text) if len(s.split()) >= 3]
+    if len(sentences) <= max_sentences:
+        return "\n".join(sentences)
+    words = [set(_WORD_RE.findall(s.lower())) for s in sentences]
+    frequency = Counter(word for sentence_words in words for word in sentence_words)
+    scores = [sum(frequency[w] - 1 for w in sentence_words) / (len(sentence_words) or 1) ** 0.5
+              for sentence_words in words]
+    keep = sorted(sorted(range(len(sentences)), key=scores.__getitem__, reverse=True)[:max_sentences])
+    return "\n".join(sentences[i] for i in keep)
+
+
+## SESSION MEMORY ##
+class SessionMemory:
+    """
+    Append-only conversation memory kept in a session's collection. Each turn
+    is one entry written with a single encoder call, bypassing chunking and
+    the ingestion pipeline. The newest `window` turns stay verbatim; once
+    `compact_every` more have piled up, the oldest are folded into one
+    extractive summary entry, so both storage and per-turn cost stay bounded.
+    """
+
+    def __init__(self, window: int = SESSION_MEMORY_WINDOW, compact_every: int = SESSION_MEMORY_COMPACT_EVERY,
+                 max_summaries: int = SESSION_MEMORY_MAX_SUMMARIES, embedding_model: str = EMBEDDING_MODEL):
+        self.window = window
+        self.compact_every = max(1, compact_every)
+        self.max_summaries = max_summaries
+        self.embedding_model = embedding_model
+        self._pending = {}  # collection -> verbatim turns stored, as far as this process knows
+        self._locks = {}  # collection -> lock serialising compaction
+        self._lock = threading.Lock()
+
+    async def append(self, collection_name: str, user_message: str, ai_response: str, db_path: str = None):
+        """ Store one turn; compacts old turns when the window overflows """
+        if collection_name not in self._pending:
+            await collection_catalog.register(collection_name, "Conversation memory")
+        pending = await compute_executor.run(self._append, collection_name, user_message, ai_response, db_path)
+        if pending > self.window + self.compact_every:
+            await compute_executor.run(self._compact, collection_name, db_path)
+            collection = vector_store.get_collection(collection_name, db_path=db_path, create=False)
+            await collection_catalog.update_stats(collection_name, embedding_model=self.embedding_model,
+                                                  chunk_count=await compute_executor.run(collection.count))
+
+    async def clear(self, collection_name: str, db_path: str = None):
+        with self._lock:
+            self._pending.pop(collection_name, None)
+        try:
+            await compute_executor.run(vector_store.delete_collection, collection_name, db_path)
+        except Exception:
+            pass  # nothing stored yet
+        await compute_executor.run(lexical_index.drop, collection_name, db_path)
+        await collection_catalog.remove(collection_name)
+
+    def _lock_for(self, collection_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(collection_name, threading.Lock())
+
+    def _append(self, collection_name: str, user_message: str, ai_response: str, db_path: str = None) -> int:
+        collection = vector_store.get_collection(collection_name, db_path=db_path)
+        if collection_name not in self._pending:
+            # first turn seen by this process; later turns only bump the counter
+            turns = len(collection.get(where={"kind": "turn"}, include=[])["ids"])
+            with self._lock:
+                self._pending.setdefault(collection_name, turns)
+        timestamp = time.time()
+        text = f"User: {user_message}\nAI: {ai_response}"
+        doc_id = make_chunk_id(collection_name, f"{MEMORY_SOURCE}:{timestamp}", text)
+        self._store(collection, doc_id, text, {"kind": "turn", "timestamp": timestamp}, db_path)
+        with self._lock:
+            self._pending[collection_name] += 1
+            return self._pending[collection_name]
+
+    def _store(self, collection, doc_id: str, text: str, metadata: dict, db_path: str = None):
+        embedding = np.asarray(get_embedder(self.embedding_model).encode([text], convert_to_numpy=True),
+                               dtype=np.float32)
+        collection.upsert(ids=[doc_id], documents=[text], embeddings=embedding,
+                          metadatas=[{**metadata, "source": MEMORY_SOURCE, "page": 1}])
+        lexical_index.add(collection.name, [doc_id], [text], db_path=db_path)
+
+    def _compact(self, collection_name: str, db_path: str = None):
+        with self._lock_for(collection_name):
+            collection = vector_store.get_collection(collection_name, db_path=db_path)
+            stored = collection.get(where={"kind": "turn"}, include=["documents", "metadatas"])
+            turns = sorted(zip(stored["ids"], stored["documents"], stored["metadatas"]),
+                           key=lambda turn: turn[2]["timestamp"])
+            old = turns[:max(0, len(turns) - self.window)]
+            if old:
+                ids = [doc_id for doc_id, _, _ in old]
+                summary = extractive_summary([document for _, document, _ in old])
+                # id derived from the folded turns, so a second worker compacting them rewrites the same entry
+                summary_id = make_chunk_id(collection_name, f"{MEMORY_SOURCE}:summary", "".join(ids))
+                self._store(collection, summary_id, f"Earlier in this conversation:\n{summary}",
+                            {"kind": "summary", "timestamp": old[-1][2]["timestamp"],
+                             "first_turn": old[0][2]["timestamp"], "turns": len(old)}, db_path)
+                collection.delete(ids=ids)
+                lexical_index.delete(collection_name, ids, db_path=db_path)
+            self._drop_old_summaries(collection, db_path)
+            with self._lock:
+                self._pending[collection_name] = len(turns) - len(old)
+
+    def _drop_old_summaries(self, collection, db_path: str = None):
+        stored = collection.get(where={"kind": "summary"}, include=["metadatas"])
+        if len(stored["ids"]) <= self.max_summaries:
+            return
+        by_age = sorted(zip(stored["ids"], stored["metadatas"]), key=lambda entry: entry[1]["timestamp"])
+        expired = [doc_id for doc_id, _ in by_age[:len(by_age) - self.max_summaries]]
+        collection.delete(ids=expired)
+        lexical_index.delete(collection.name, expired, db_path=db_path)
+
+
+session_memory = SessionMemory()
@@ -0,0 +1,233 @@
+## imports ##
+import hmac
+import asyncio
+import hashlib
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from app.services.db import SessionLocal
+from app.models.agent_session import AgentSession
+from app.services.collection_catalog import SESSION_COLLECTION_PREFIX
+from app.services.session_memory import session_memory
+from app.config import (SESSION_STORE_BACKEND, SESSION_CACHE_SIZE, SESSION_IDLE_SECONDS, SESSION_REAPER_INTERVAL,
+                        SESSION_COLLECTION_SECRET)
+
+if SESSION_COLLECTION_SECRET:
+    _collection_key = SESSION_COLLECTION_SECRET.encode("utf-8")
+else:
+    # names stay unguessable but change on restart, so memory does not survive it
+    print("WARNING: SESSION_COLLECTION_SECRET and SECRET_KEY are unset, session memory is per process")
+    _collection_key = secrets.token_bytes(32)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def memory_collection_for(user_id: str) -> str:
+    """
+    Private conversation-memory collection of a user. Keyed with a server
+    secret, so the name cannot be derived from the username; stable, so a
+    returning user gets it back.
+    """
+    digest = hmac.new(_collection_key, user_id.encode("utf-8"), hashlib.sha256).hexdigest()
+    return SESSION_COLLECTION_PREFIX + digest[:32]
+
+
+@dataclass
+class SessionState:
+    """ Per-user agent session: rolling summary, memory collection and turn counter """
+    user_id: str
+    memory_collection: str
+    summary: str = ""
+    turns: int = 0
+    last_active: datetime = None
+
+
+## STORE INTERFACE ##
+class SessionStore(ABC):
+    """ Session state keyed by user id, with idle-session eviction """
+
+    def __init__(self, idle_seconds: int = SESSION_IDLE_SECONDS, reaper_interval: float = SESSION_REAPER_INTERVAL):
+        self.idle_seconds = idle_seconds
+        self.reaper_interval = reaper_interval
+        self._reaper = None
+
+    @abstractmethod
+    async def get(self, user_id: str) -> SessionState:
+        """ Load the user's session, creating an empty one on first use """
+
+    @abstractmethod
+    async def update(self, user_id: str, **fields) -> SessionState: ...
+
+    @abstractmethod
+    async def record_turn(self, user_id: str) -> int:
+        """ Atomically bump and return the turn counter """
+
+    @abstractmethod
+    async def delete(self, user_id: str): ...
+
+    @abstractmethod
+    async def evict_idle(self) -> list[str]:
+        """ Drop sessions idle longer than idle_seconds; returns their memory collections """
+
+    ## lifecycle ##
+    async def start(self):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self.reaper_interval)
+            try:
+                evicted = await self.evict_idle()
+            except Exception as e:
+                print(f"Error evicting idle sessions: {e}")
+                continue
+            if evicted:
+                print(f"Evicted {len(evicted)} idle agent sessions")
+            # an ended session takes its memory, lexical index and catalog row with it
+            for collection_name in evicted:
+                try:
+                    await session_memory.clear(collection_name)
+                except Exception as e:
+                    print(f"Error clearing memory collection {collection_name}: {e}")
+
+
+## IN-PROCESS BACKEND ##
+class InMemorySessionStore(SessionStore):
+    """ LRU of sessions in this process; for single-worker deployments """
+
+    def __init__(self, max_sessions: int = SESSION_CACHE_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # user id -> SessionState, least recently used first
+        self._lock = threading.Lock()
+
+    def _touch(self, user_id: str) -> SessionState:
+        state = self._sessions.get(user_id)
+        if state is None:
+            state = SessionState(user_id=user_id, memory_collection=memory_collection_for(user_id))
+            self._sessions[user_id] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(user_id)
+        state.last_active = _now()
+        return state
+
+    async def get(self, user_id: str) -> SessionState:
+        with self._lock:
+            return replace(self._touch(user_id))
+
+    async def update(self, user_id: str, **fields) -> SessionState:
+        with self._lock:
+            state = self._touch(user_id)
+            for key, value in fields.items():
+                setattr(state, key, value)
+            return replace(state)
+
+    async def record_turn(self, user_id: str) -> int:
+        with self._lock:
+            state = self._touch(user_id)
+            state.turns += 1
+            return state.turns
+
+    async def delete(self, user_id: str):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    async def evict_idle(self) -> list[str]:
+        cutoff = _now() - timedelta(seconds=self.idle_seconds)
+        with self._lock:
+            idle = [user_id for user_id, state in self._sessions.items() if state.last_active < cutoff]
+            return [self._sessions.pop(user_id).memory_collection for user_id in idle]
+
+
+## SQL BACKEND ##
+class SqlSessionStore(SessionStore):
+    """ Sessions in the `agent_sessions` table, shared by every worker and node """
+
+    async def get(self, user_id: str) -> SessionState:
+        return await asyncio.to_thread(self._write, user_id, {})
+
+    async def update(self, user_id: str, **fields) -> SessionState:
+        return await asyncio.to_thread(self._write, user_id, fields)
+
+    async def record_turn(self, user_id: str) -> int:
+        return await asyncio.to_thread(self._increment_turns, user_id)
+
+    async def delete(self, user_id: str):
+        await asyncio.to_thread(self._delete, user_id)
+
+    async def evict_idle(self) -> list[str]:
+        return await asyncio.to_thread(self._evict_idle)
+
+    @staticmethod
+    def _to_state(row: AgentSession) -> SessionState:
+        return SessionState(user_id=row.user_id, memory_collection=row.memory_collection,
+                            summary=row.summary or "", turns=row.turns or 0, last_active=row.last_active)
+
+    def _write(self, user_id: str, fields: dict) -> SessionState:
+        for attempt in range(2):
+            with SessionLocal() as db:
+                row = db.get(AgentSession, user_id)
+                if row is None:
+                    row = AgentSession(user_id=user_id, memory_collection=memory_collection_for(user_id),
+                                       summary="", turns=0)
+                    db.add(row)
+                for key, value in fields.items():
+                    setattr(row, key, value)
+                row.last_active = _now()
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # first request of this user raced on another worker
+                    db.rollback()
+                    if attempt:
+                        raise
+                    continue
+                return self._to_state(row)
+
+    def _increment_turns(self, user_id: str) -> int:
+        self._write(user_id, {})  # make sure the row exists
+        with SessionLocal() as db:
+            db.query(AgentSession).filter(AgentSession.user_id == user_id) \
+                .update({"turns": AgentSession.turns + 1, "last_active": _now()}, synchronize_session=False)
+            db.commit()
+            return db.get(AgentSession, user_id).turns
+
+    def _delete(self, user_id: str):
+        with SessionLocal() as db:
+            db.query(AgentSession).filter(AgentSession.user_id == user_id).delete(synchronize_session=False)
+            db.commit()
+
+    def _evict_idle(self) -> list[str]:
+        cutoff = _now() - timedelta(seconds=self.idle_seconds)
+        with SessionLocal() as db:
+            # RETURNING: only the rows this worker deleted, so each collection is cleared once
+            evicted = db.execute(delete(AgentSession).where(AgentSession.last_active < cutoff)
+                                 .returning(AgentSession.memory_collection)).scalars().all()
+            db.commit()
+            return list(evicted)
+
+
+def get_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sql":
+        return SqlSessionStore()
+    raise ValueError(f"Unknown session store backend: {backend} (expected 'memory' or 'sql')")
+
+
+session_store = get_session_store()
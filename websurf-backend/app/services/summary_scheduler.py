@@ -0,0 +1,101 @@
+## imports ##
+import asyncio
+from typing import Awaitable, Callable
+from app.config import (SUMMARY_CONCURRENCY, SUMMARY_COALESCE_SECONDS, SUMMARY_MAX_PENDING_TURNS,
+                        SUMMARY_FLUSH_TIMEOUT)
+
+
+## SUMMARY SCHEDULER ##
+class SummaryScheduler:
+    """
+    Runs background conversation summaries with at most one task per session.
+    Turns submitted while a session's task is waiting or running are queued
+    and folded into its next run, and a global semaphore caps how many runs
+    are in flight, so summarization load follows the number of active
+    sessions rather than the number of messages.
+    """
+
+    def __init__(self, summarize: Callable[[str, list], Awaitable], max_concurrency: int = SUMMARY_CONCURRENCY,
+                 delay: float = SUMMARY_COALESCE_SECONDS, max_pending: int = SUMMARY_MAX_PENDING_TURNS):
+        self.summarize = summarize  # async (session key, [(query, answer), ...])
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self.max_pending = max_pending
+        self._pending = {}  # session key -> turns waiting for the next run
+        self._tasks = {}  # session key -> its task
+        self._semaphore = None
+        self._wake = None  # set at shutdown to cut the coalescing delay short
+        self._closing = False
+        self.submitted = 0
+        self.dropped = 0
+        self.runs = 0
+        self.summarized = 0  # turns covered by finished or running runs
+        self.failures = 0
+
+    def submit(self, key: str, query: str, answer: str) -> bool:
+        """ Queue one turn for summarization; False once shutting down """
+        if self._closing:
+            return False
+        turns = self._pending.setdefault(key, [])
+        turns.append((query, answer))
+        if len(turns) > self.max_pending:
+            del turns[0]
+            self.dropped += 1
+        self.submitted += 1
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+        return True
+
+    async def _run(self, key: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._wake = asyncio.Event()
+        try:
+            while self._pending.get(key):
+                if not self._closing:
+                    # let a burst of turns land before summarizing
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.delay)
+                    except asyncio.TimeoutError:
+                        pass
+                async with self._semaphore:
+                    turns = self._pending.pop(key, [])
+                    if not turns:
+                        break
+                    self.runs += 1
+                    self.summarized += len(turns)
+                    try:
+                        await self.summarize(key, turns)
+                    except Exception as e:
+                        self.failures += 1
+                        print(f"Background summarization failed for {key}: {e}")
+        finally:
+            self._tasks.pop(key, None)
+
+    async def shutdown(self, timeout: float = SUMMARY_FLUSH_TIMEOUT):
+        """ Stop taking turns, run what is pending without waiting, cancel whatever outlives `timeout` """
+        self._closing = True
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        # waiting tasks skip the rest of their coalescing delay
+        if self._wake is not None:
+            self._wake.set()
+        _, still_running = await asyncio.wait(tasks, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+        if still_running:
+            print(f"Cancelled {len(still_running)} unfinished summaries at shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self._tasks),
+            "pending_turns": sum(len(turns) for turns in self._pending.values()),
+            "max_concurrency": self.max_concurrency,
+            "submitted_turns": self.submitted,
+            "runs": self.runs,
+            "coalesced_turns": self.summarized - self.runs,
+            "dropped_turns": self.dropped,
+            "failures": self.failures,
+        }
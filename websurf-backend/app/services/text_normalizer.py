@@ -0,0 +1,62 @@
+## imports ##
+import re
+import unicodedata
+
+## compiled rules ##
+# repeated punctuation, e.g. "!!" -> "!", "..." -> ".", "•••" -> "•"
+_PUNCT_RE = re.compile(r"([,;:.!?•<>=])\1+")
+# "word word" repeats; the possessive \w++ never backtracks into the word
+_DUP_WORD_RE = re.compile(r"\b(\w++)(?: \1\b)+", re.IGNORECASE)
+# doubled letters from PDF text extraction ("ddoouubbllee"); a whole run of one
+# letter is matched at once, so "aaaa..." costs one substitution, not one per pair
+_LETTER_RUN_RE = re.compile(r"([A-Za-z])\1+")
+# joins a batch into one string so every rule runs once per batch
+_BATCH_SEP = "\x00"
+
+
+def _halve_run(match) -> str:
+    # same result as replacing each non-overlapping pair with one letter
+    return match.group(1) * ((len(match.group()) + 1) // 2)
+
+
+def _collapse(text: str) -> str:
+    # whitespace runs -> single space, str.split is much faster than a \s+ regex
+    return " ".join(text.split())
+
+
+## TEXT NORMALIZER ##
+class TextNormalizer:
+    """ Compiled cleanup rules applied to whole batches of strings """
+
+    def __init__(self, profile: str = "response"):
+        if profile not in ("response", "pdf"):
+            raise ValueError(f"Unknown normalization profile: {profile}")
+        self.profile = profile
+
+    def _apply(self, text: str) -> str:
+        if self.profile == "pdf":
+            text = _LETTER_RUN_RE.sub(_halve_run, text)
+            if not text.isascii():
+                # ASCII is already in NFKD form
+                text = unicodedata.normalize("NFKD", text)
+            return _collapse(text)
+        text = unicodedata.normalize("NFKC", text)
+        text = _PUNCT_RE.sub(r"\1", text)
+        return _DUP_WORD_RE.sub(r"\1", _collapse(text))
+
+    def normalize(self, text: str) -> str:
+        if not text or not isinstance(text, str):
+            return ""
+        return self._apply(text).strip()
+
+    def normalize_batch(self, texts: list) -> list[str]:
+        texts = [text if text and isinstance(text, str) else "" for text in texts]
+        if any(_BATCH_SEP in text for text in texts):
+            return [self.normalize(text) for text in texts]
+        # no rule matches across the separator, so the batch is cleaned in one pass
+        joined = self._apply(_BATCH_SEP.join(texts))
+        return [part.strip() for part in joined.split(_BATCH_SEP)]
+
+
+response_normalizer = TextNormalizer("response")
+pdf_normalizer = TextNormalizer("pdf")
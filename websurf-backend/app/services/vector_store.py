@@ -0,0 +1,541 @@
+## imports ##
+import os
+import re
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from app.services.chroma_pool import chroma_pool
+from app.services.quantization import MODES, QuantizedVectors, quantize
+from app.config import VECTOR_STORE_BACKEND, VECTOR_STORE_DIR, CHROMA_DIR, EMBEDDING_STORAGE_DTYPE
+
+_COLLECTION_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,254}")
+_SQL_BATCH = 500  # ids per IN (...) clause
+IVF_MIN_ROWS = 10_000        # smaller collections are searched exactly
+IVF_REBUILD_FRACTION = 0.1   # rebuild once unindexed rows exceed this share of indexed ones
+IVF_NPROBE = 8               # clusters scanned per query
+IVF_FILES = ("centroids", "order", "offsets", "vectors", "norms", "scale")
+
+
+## INTERFACE ##
+class VectorCollection(ABC):
+    """
+    The subset of the Chroma collection API the RAG pipeline uses. Chroma
+    collections satisfy it as-is; other backends implement it.
+    """
+    name: str
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def get(self, ids: list = None, where: dict = None, include: list = ("documents", "metadatas")) -> dict: ...
+
+    @abstractmethod
+    def upsert(self, ids: list, embeddings, documents: list = None, metadatas: list = None): ...
+
+    @abstractmethod
+    def update(self, ids: list, metadatas: list = None, documents: list = None): ...
+
+    @abstractmethod
+    def delete(self, ids: list): ...
+
+    @abstractmethod
+    def query(self, query_embeddings, n_results: int = 10) -> dict: ...
+
+
+class VectorStore(ABC):
+    """ Opens, drops, and releases collections for one storage backend """
+    backend: str
+    persistent: bool = True  # collections outlive the process
+
+    @abstractmethod
+    def get_collection(self, collection_name: str, db_path: str = None, create: bool = True): ...
+
+    @abstractmethod
+    def delete_collection(self, collection_name: str, db_path: str = None): ...
+
+    @abstractmethod
+    def close(self): ...
+
+    def size_bytes(self, collection_name: str, db_path: str = None, dimension: int = None) -> int:
+        """ Storage used by a collection; estimated from the vector payload unless the backend knows better """
+        count = self.get_collection(collection_name, db_path=db_path, create=False).count()
+        return count * (dimension or 0) * 4
+
+
+## CHROMA BACKEND ##
+class ChromaVectorStore(VectorStore):
+    """ Chroma collections through the shared client pool, stored under db_path (or CHROMA_DIR) """
+    backend = "chroma"
+
+    def __init__(self, root: str = CHROMA_DIR):
+        self.root = root or None
+        self.persistent = self.root is not None
+
+    def get_collection(self, collection_name: str, db_path: str = None, create: bool = True):
+        return chroma_pool.get_collection(collection_name, db_path=db_path or self.root, create=create)
+
+    def delete_collection(self, collection_name: str, db_path: str = None):
+        chroma_pool.delete_collection(collection_name, db_path=db_path or self.root)
+
+    def close(self):
+        chroma_pool.close_all()
+
+
+## IVF INDEX ##
+def _subset(vectors: QuantizedVectors, rows: np.ndarray) -> QuantizedVectors:
+    pick = lambda array: array[rows] if array is not None else None
+    return QuantizedVectors(vectors.mode, vectors.data[rows], pick(vectors.scale), pick(vectors.norms))
+
+
+def _slice(vectors: QuantizedVectors, start: int) -> QuantizedVectors:
+    pick = lambda array: array[start:] if array is not None else None
+    return QuantizedVectors(vectors.mode, vectors.data[start:], pick(vectors.scale), pick(vectors.norms))
+
+
+def _nearest(block: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    scores = np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2.0 * (block @ centroids.T)
+    return np.argmin(scores, axis=1)
+
+
+def build_ivf(vectors: QuantizedVectors, lists: int, iterations: int = 10):
+    """
+    Inverted-file index: k-means centroids plus the rows grouped by nearest centroid.
+    Returns (centroids, order, offsets); cluster c holds order[offsets[c]:offsets[c + 1]].
+    """
+    rng = np.random.default_rng(0)
+    n = len(vectors)
+    sample = _subset(vectors, np.sort(rng.choice(n, min(n, lists * 64), replace=False))).dequantize()
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=lists)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    assign = np.concatenate([_nearest(vectors.dequantize(start, start + 65536), centroids)
+                             for start in range(0, n, 65536)])
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=lists))]).astype(np.int64)
+    return centroids.astype(np.float32), order, offsets
+
+
+## MEMORY-MAPPED BACKEND ##
+class MmapCollection(VectorCollection):
+    """
+    Vectors in flat memory-mapped files, documents and metadata in SQLite.
+
+    Layout of a collection directory:
+      vectors.bin    (rows, dim) in the storage dtype, append-only
+      scale.bin      per-row float32 scale (int8 only)
+      norms.bin      per-row float32 squared norms, so search skips recomputing them
+      rows.sqlite    row -> id, document, metadata, alive flag
+      ivf_<gen>_*.bin  approximate index over the first N rows: centroids, row order,
+                     cluster offsets, and a copy of those rows stored cluster by cluster
+      manifest.json  committed row count and index generation; replaced atomically after every write
+
+    Readers map the files read-only, so every worker process shares one copy
+    through the OS page cache and opening a collection costs a few syscalls.
+    Writers append rows under a SQLite write lock, which serializes them across
+    processes. Replaced or deleted rows are only flagged dead and masked out of
+    search; drop and rebuild the collection to reclaim their space.
+
+    Small collections are searched exactly. From IVF_MIN_ROWS rows on, writers
+    build an IVF index and queries scan only the IVF_NPROBE nearest clusters, each a
+    contiguous slice of the clustered copy, plus the rows appended since the last build.
+    """
+
+    def __init__(self, name: str, path: str, dtype: str = EMBEDDING_STORAGE_DTYPE):
+        self.name = name
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._db_file = os.path.join(path, "rows.sqlite")
+        self._manifest_file = os.path.join(path, "manifest.json")
+        self._db = sqlite3.connect(self._db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db_lock = threading.RLock()  # one connection per collection, shared by threads
+        self._view_lock = threading.Lock()
+        self._inode = os.stat(self._db_file).st_ino
+        self._manifest_stamp = None
+        self._vectors = None  # QuantizedVectors over the mapped files
+        self._alive = None
+        self._ivf = None
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+                             "document TEXT, metadata TEXT, alive INTEGER NOT NULL DEFAULT 1)")
+            self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS rows_live_id ON rows(id) WHERE alive = 1")
+            self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute("INSERT OR IGNORE INTO state VALUES ('dtype', ?)", (dtype,))
+            self.dtype = self._db.execute("SELECT value FROM state WHERE key = 'dtype'").fetchone()[0]
+        if self.dtype not in MODES:
+            raise ValueError(f"Unknown storage dtype: {self.dtype} (expected one of {MODES})")
+
+    ## lifecycle ##
+    def stale(self) -> bool:
+        """ True once the collection was dropped or recreated on disk, possibly by another process """
+        try:
+            return os.stat(self._db_file).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+        self._vectors = self._alive = self._ivf = None
+
+    ## reads ##
+    def count(self) -> int:
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM rows WHERE alive = 1").fetchone()[0]
+
+    def get(self, ids: list = None, where: dict = None, include: list = ("documents", "metadatas")) -> dict:
+        clauses, params = ["alive = 1"], []
+        for key, value in (where or {}).items():
+            if not re.fullmatch(r"\w+", key):
+                raise ValueError(f"Unsupported metadata key: {key}")
+            clauses.append(f"json_extract(metadata, '$.{key}') = ?")
+            params.append(value)
+        sql = f"SELECT row, id, document, metadata FROM rows WHERE {' AND '.join(clauses)}"
+        with self._db_lock:
+            if ids is None:
+                records = self._db.execute(sql + " ORDER BY row", params).fetchall()
+            else:
+                records = []
+                for i in range(0, len(ids), _SQL_BATCH):
+                    batch = list(ids[i:i + _SQL_BATCH])
+                    records += self._db.execute(sql + f" AND id IN ({','.join('?' * len(batch))})",
+                                                params + batch).fetchall()
+        result = {"ids": [record[1] for record in records]}
+        if "documents" in include:
+            result["documents"] = [record[2] for record in records]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(record[3]) if record[3] else None for record in records]
+        if "embeddings" in include:
+            vectors, _, _ = self._view(min_rows=max((record[0] + 1 for record in records), default=0))
+            rows = np.array([record[0] for record in records], dtype=np.int64)
+            result["embeddings"] = vectors.dequantize()[rows] if len(rows) else np.empty((0, 0), np.float32)
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10) -> dict:
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        vectors, alive, ivf = self._view()
+        if vectors is None:
+            empty = [[] for _ in queries]
+            return {"ids": empty, "documents": empty, "metadatas": empty, "distances": empty}
+        if ivf is None:
+            indices, distances = vectors.search(queries, n_results, mask=alive)
+        else:
+            indices, distances = self._search_ivf(vectors, alive, ivf, queries, n_results)
+        records = self._records(set(indices.ravel().tolist()))
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row_indices, row_distances in zip(indices.tolist(), distances.tolist()):
+            hits = [(records[i], d) for i, d in zip(row_indices, row_distances) if i in records]
+            result["ids"].append([record[0] for record, _ in hits])
+            result["documents"].append([record[1] for record, _ in hits])
+            result["metadatas"].append([record[2] for record, _ in hits])
+            result["distances"].append([d for _, d in hits])
+        return result
+
+    @staticmethod
+    def _search_ivf(vectors, alive, ivf, queries, k):
+        centroids, order, offsets, clustered = ivf
+        indexed = len(clustered)
+        nprobe = min(IVF_NPROBE, len(centroids))
+        probes = np.argpartition(np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2.0 * (queries @ centroids.T),
+                                 nprobe - 1, axis=1)[:, :nprobe]
+        # rows appended since the last build are scanned exactly
+        tail = _slice(vectors, indexed) if indexed < len(vectors) else None
+        indices, distances = [], []
+        for query, probe in zip(queries, probes):
+            q_norm = float(query @ query)
+            rows, dists = [], []
+            for c in probe:
+                lo, hi = offsets[c], offsets[c + 1]
+                dist = q_norm + clustered.norms[lo:hi] - 2.0 * clustered.dot(query, lo, hi)
+                rows.append(order[lo:hi])
+                dists.append(np.where(alive[order[lo:hi]], dist, np.inf))
+            if tail is not None:
+                tail_idx, tail_dist = tail.search(query, k, mask=alive[indexed:])
+                rows.append(tail_idx[0] + indexed)
+                dists.append(tail_dist[0])
+            rows, dists = np.concatenate(rows), np.concatenate(dists)
+            top = np.argpartition(dists, k - 1)[:k] if len(dists) > k else np.arange(len(dists))
+            top = top[np.argsort(dists[top], kind="stable")]
+            top = top[np.isfinite(dists[top])]
+            indices.append(rows[top])
+            distances.append(np.maximum(dists[top], 0))
+        width = min(len(row) for row in indices)
+        return np.stack([row[:width] for row in indices]), np.stack([row[:width] for row in distances])
+
+    def _records(self, rows: set) -> dict:
+        rows = list(rows)
+        found = {}
+        with self._db_lock:
+            for i in range(0, len(rows), _SQL_BATCH):
+                batch = rows[i:i + _SQL_BATCH]
+                for row, doc_id, document, metadata in self._db.execute(
+                        f"SELECT row, id, document, metadata FROM rows WHERE alive = 1 "
+                        f"AND row IN ({','.join('?' * len(batch))})", batch):
+                    found[row] = (doc_id, document, json.loads(metadata) if metadata else None)
+        return found
+
+    def _view(self, min_rows: int = 0):
+        """ Current (vectors, alive mask), remapped only when the manifest changed """
+        try:
+            stat = os.stat(self._manifest_file)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self._view_lock:
+            loaded = len(self._vectors) if self._vectors is not None else 0
+            if stamp != self._manifest_stamp or loaded < min_rows:
+                self._load_view(stamp)
+            return self._vectors, self._alive, self._ivf
+
+    def _load_view(self, stamp):
+        manifest = self._read_manifest()
+        rows, dim = manifest.get("rows", 0), manifest.get("dim")
+        self._manifest_stamp = stamp
+        if not rows:
+            self._vectors = self._alive = self._ivf = None
+            return
+        alive = np.ones(rows, dtype=bool)
+        with self._db_lock:
+            dead = [row for (row,) in self._db.execute("SELECT row FROM rows WHERE alive = 0 AND row < ?", (rows,))]
+        alive[dead] = False
+        self._vectors = self._map(rows, dim)
+        self._alive = alive
+        self._ivf = self._map_ivf(manifest.get("ivf"), dim)
+
+    def _map(self, rows: int, dim: int, prefix: str = "") -> QuantizedVectors:
+        storage = np.int8 if self.dtype == "int8" else np.dtype(self.dtype)
+        data = np.memmap(self._file(f"{prefix}vectors"), dtype=storage, mode="r", shape=(rows, dim))
+        norms = np.memmap(self._file(f"{prefix}norms"), dtype=np.float32, mode="r", shape=(rows,))
+        scale = np.memmap(self._file(f"{prefix}scale"), dtype=np.float32, mode="r", shape=(rows,)) \
+            if self.dtype == "int8" else None
+        # plain ndarray views of the maps, memmap indexing is slow on the query path
+        view = lambda array: np.asarray(array) if array is not None else None
+        return QuantizedVectors(self.dtype, view(data), view(scale), view(norms))
+
+    def _map_ivf(self, ivf: dict, dim: int):
+        if not ivf:
+            return None
+        try:
+            lists, gen = ivf["lists"], ivf["generation"]
+            centroids = np.memmap(self._file(f"ivf_{gen}_centroids"), dtype=np.float32, mode="r", shape=(lists, dim))
+            order = np.memmap(self._file(f"ivf_{gen}_order"), dtype=np.int64, mode="r", shape=(ivf["rows"],))
+            offsets = np.memmap(self._file(f"ivf_{gen}_offsets"), dtype=np.int64, mode="r", shape=(lists + 1,))
+            clustered = self._map(ivf["rows"], dim, prefix=f"ivf_{gen}_")
+        except (OSError, ValueError, KeyError):
+            return None  # replaced by a newer build mid-read; exact search until the next refresh
+        return np.asarray(centroids), np.asarray(order), np.asarray(offsets), clustered
+
+    ## writes ##
+    def upsert(self, ids: list, embeddings, documents: list = None, metadatas: list = None):
+        ids = list(ids)
+        if not ids:
+            return
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        with self._write() as db:
+            dim = self._dim(db, embeddings.shape[1])
+            start = db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+            self._append_vectors(start, dim, embeddings)
+            self._maybe_index(db, start + len(ids), dim)
+            db.executemany("UPDATE rows SET alive = 0 WHERE id = ? AND alive = 1", [(i,) for i in ids])
+            db.executemany("INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)", [
+                (start + n, doc_id, document, json.dumps(metadata) if metadata is not None else None)
+                for n, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+            ])
+
+    add = upsert
+
+    def update(self, ids: list, metadatas: list = None, documents: list = None):
+        with self._write() as db:
+            if metadatas is not None:
+                db.executemany("UPDATE rows SET metadata = ? WHERE id = ? AND alive = 1",
+                               [(json.dumps(m), i) for i, m in zip(ids, metadatas)])
+            if documents is not None:
+                db.executemany("UPDATE rows SET document = ? WHERE id = ? AND alive = 1",
+                               list(zip(documents, ids)))
+
+    def delete(self, ids: list = None):
+        with self._write() as db:
+            db.executemany("UPDATE rows SET alive = 0 WHERE id = ? AND alive = 1", [(i,) for i in ids or []])
+
+    def _write(self):
+        return _WriteTransaction(self)
+
+    def _dim(self, db, dim: int) -> int:
+        db.execute("INSERT OR IGNORE INTO state VALUES ('dim', ?)", (str(dim),))
+        stored = int(db.execute("SELECT value FROM state WHERE key = 'dim'").fetchone()[0])
+        if stored != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match collection dimension {stored}")
+        return stored
+
+    def _append_vectors(self, start: int, dim: int, embeddings: np.ndarray):
+        quantized = quantize(embeddings, self.dtype)
+        restored = quantized.dequantize()
+        parts = [("vectors", quantized.data, quantized.data.itemsize * dim),
+                 ("norms", np.einsum("ij,ij->i", restored, restored).astype(np.float32), 4)]
+        if quantized.scale is not None:
+            parts.append(("scale", quantized.scale, 4))
+        for kind, array, row_bytes in parts:
+            with open(self._file(kind), "ab") as f:
+                # drop rows left behind by a writer that died before committing
+                if f.tell() > start * row_bytes:
+                    f.truncate(start * row_bytes)
+                    f.seek(start * row_bytes)
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _maybe_index(self, db, rows: int, dim: int):
+        """ (Re)build the IVF index once enough rows were appended since the last build """
+        ivf = self._state(db, "ivf")
+        indexed = ivf["rows"] if ivf else 0
+        if rows < IVF_MIN_ROWS or rows - indexed < indexed * IVF_REBUILD_FRACTION:
+            return
+        lists = max(16, int(np.sqrt(rows)))
+        vectors = self._map(rows, dim)
+        centroids, order, offsets = build_ivf(vectors, lists)
+        gen = ivf["generation"] + 1 if ivf else 1
+        files = {kind: open(self._file(f"ivf_{gen}_{kind}"), "wb") for kind in IVF_FILES}
+        try:
+            for kind, array in (("centroids", centroids), ("order", order), ("offsets", offsets)):
+                files[kind].write(array.tobytes())
+            for start in range(0, rows, 65536):
+                block = _subset(vectors, order[start:start + 65536])
+                for kind, array in (("vectors", block.data), ("norms", block.norms), ("scale", block.scale)):
+                    if array is not None:
+                        files[kind].write(np.ascontiguousarray(array).tobytes())
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in files.values():
+                f.close()
+        db.execute("INSERT OR REPLACE INTO state VALUES ('ivf', ?)",
+                   (json.dumps({"rows": rows, "lists": lists, "generation": gen}),))
+        if ivf:
+            for kind in IVF_FILES:
+                try:
+                    os.remove(self._file(f"ivf_{ivf['generation']}_{kind}"))
+                except OSError:
+                    pass  # still mapped on Windows, left for the next build
+
+    @staticmethod
+    def _state(db, key: str):
+        value = db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(value[0]) if value else None
+
+    def _write_manifest(self, db):
+        rows = db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        manifest = {"rows": rows, "dim": self._state(db, "dim"), "dtype": self.dtype, "ivf": self._state(db, "ivf")}
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_file)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self._manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _file(self, kind: str) -> str:
+        return os.path.join(self.path, f"{kind}.bin")
+
+
+class _WriteTransaction:
+    """ BEGIN IMMEDIATE ... COMMIT, then publish the new manifest to readers """
+
+    def __init__(self, collection: MmapCollection):
+        self.collection = collection
+
+    def __enter__(self):
+        self.collection._db_lock.acquire()
+        self.collection._db.execute("BEGIN IMMEDIATE")
+        return self.collection._db
+
+    def __exit__(self, exc_type, exc, tb):
+        db = self.collection._db
+        try:
+            if exc_type is None:
+                db.execute("COMMIT")
+                self.collection._write_manifest(db)
+            else:
+                db.execute("ROLLBACK")
+        finally:
+            self.collection._db_lock.release()
+        return False
+
+
+class MmapVectorStore(VectorStore):
+    """ One directory per collection under db_path (or VECTOR_STORE_DIR) """
+    backend = "mmap"
+
+    def __init__(self, root: str = VECTOR_STORE_DIR, dtype: str = EMBEDDING_STORAGE_DTYPE):
+        self.root = root
+        self.dtype = dtype
+        self._collections = {}  # collection directory -> MmapCollection
+        self._lock = threading.RLock()
+
+    def _path(self, collection_name: str, db_path: str = None) -> str:
+        if not _COLLECTION_NAME_RE.fullmatch(collection_name or "") or ".." in collection_name:
+            raise ValueError(f"Invalid collection name: {collection_name}")
+        return os.path.join(db_path or self.root, collection_name)
+
+    def get_collection(self, collection_name: str, db_path: str = None, create: bool = True):
+        path = self._path(collection_name, db_path)
+        with self._lock:
+            collection = self._collections.get(path)
+            if collection is not None and collection.stale():
+                collection.close()
+                self._collections.pop(path, None)
+                collection = None
+            if collection is None:
+                if not create and not os.path.exists(os.path.join(path, "rows.sqlite")):
+                    raise ValueError(f"Collection {collection_name} does not exist.")
+                collection = MmapCollection(collection_name, path, self.dtype)
+                self._collections[path] = collection
+            return collection
+
+    def delete_collection(self, collection_name: str, db_path: str = None):
+        path = self._path(collection_name, db_path)
+        with self._lock:
+            collection = self._collections.pop(path, None)
+            if collection is not None:
+                collection.close()
+            if not os.path.isdir(path):
+                raise ValueError(f"Collection {collection_name} does not exist.")
+            # readers in other processes keep their mappings of the unlinked files
+            shutil.rmtree(path)
+
+    def size_bytes(self, collection_name: str, db_path: str = None, dimension: int = None) -> int:
+        path = self._path(collection_name, db_path)
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file()) if os.path.isdir(path) else 0
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
+
+
+def get_vector_store(backend: str = VECTOR_STORE_BACKEND) -> VectorStore:
+    if backend == "chroma":
+        return ChromaVectorStore()
+    if backend == "mmap":
+        return MmapVectorStore()
+    raise ValueError(f"Unknown vector store backend: {backend} (expected 'chroma' or 'mmap')")
+
+
+vector_store = get_vector_store()
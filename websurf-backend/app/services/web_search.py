@@ -0,0 +1,167 @@
+## imports ##
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Callable
+from ddgs import DDGS
+from app.services.embedding_cache import normalize_query
+from app.config import (WEB_SEARCH_MAX_RESULTS, WEB_SEARCH_MAX_VARIANTS, WEB_SEARCH_CACHE_SIZE,
+                        WEB_SEARCH_TTL_SECONDS, WEB_SEARCH_RATE, WEB_SEARCH_BURST, WEB_SEARCH_TIMEOUT)
+
+
+def ddgs_text_search(query: str, max_results: int) -> list[dict]:
+    """ DuckDuckGo text search; results carry title, href and body """
+    return DDGS().text(query, max_results=max_results) or []
+
+
+class RateLimiter:
+    """ Token bucket: `rate` acquisitions per second on average, up to `burst` at once """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # callers queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+## WEB SEARCH ##
+class WebSearch:
+    """
+    Web search for the agent. Query variants run concurrently, results are
+    cached per normalized query for `ttl` seconds, identical searches in
+    flight share one backend call, and every backend call passes a global
+    rate limit and a timeout. `backend(query, max_results)` is a blocking
+    callable returning result dicts; it runs in a thread and can be swapped
+    for a local stand-in.
+    """
+
+    def __init__(self, backend: Callable[[str, int], list] = ddgs_text_search,
+                 max_variants: int = WEB_SEARCH_MAX_VARIANTS, maxsize: int = WEB_SEARCH_CACHE_SIZE,
+                 ttl: float = WEB_SEARCH_TTL_SECONDS, rate: float = WEB_SEARCH_RATE,
+                 burst: int = WEB_SEARCH_BURST, timeout: float = WEB_SEARCH_TIMEOUT):
+        self.backend = backend
+        self.max_variants = max_variants
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate, burst)
+        self._data = OrderedDict()  # (normalized query, max_results) -> (expires_at, results)
+        self._inflight = {}  # same key -> task fetching it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    async def search(self, queries: list[str], max_results: int = WEB_SEARCH_MAX_RESULTS) -> list[dict]:
+        """ Results for all query variants, interleaved best-first and de-duplicated by URL """
+        variants = list(dict.fromkeys(normalize_query(query) for query in queries if query and query.strip()))
+        variants = variants[:self.max_variants]
+        if not variants:
+            return []
+        per_variant = await asyncio.gather(*(self._search_one(query, max_results) for query in variants))
+        merged, seen = [], set()
+        for rank in range(max(len(results) for results in per_variant)):
+            for results in per_variant:
+                if rank >= len(results):
+                    continue
+                item = results[rank]
+                url = item.get("href") or item.get("url") or item.get("title")
+                if url in seen:
+                    continue
+                seen.add(url)
+                merged.append(item)
+        return merged[:max_results * len(variants)]
+
+    async def _search_one(self, query: str, max_results: int) -> list[dict]:
+        key = (query, max_results)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # a caller giving up must not cancel the search for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key) -> list[dict]:
+        query, max_results = key
+        try:
+            async def limited():
+                await self.limiter.acquire()
+                return await asyncio.to_thread(self.backend, query, max_results)
+
+            results = list(await asyncio.wait_for(limited(), timeout=self.timeout))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"Web search timed out for: {query}")
+            return []
+        except Exception as e:
+            self.failures += 1
+            print(f"Web search failed for {query}: {e}")
+            return []
+        self._put(key, results)
+        return results
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key, results: list):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, results)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "rate_per_second": self.limiter.rate,
+            }
+
+
+web_search = WebSearch()
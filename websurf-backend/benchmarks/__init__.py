@@ -0,0 +1,13 @@
+import os
+import sys
+import types
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# run from websurf-backend: python -m benchmarks.<name>
+# app/__init__.py creates the database tables on import; the benchmarks only
+# need the service modules, so the package is registered without running it
+if "app" not in sys.modules:
+    app = types.ModuleType("app")
+    app.__path__ = [os.path.join(BACKEND_DIR, "app")]
+    sys.modules["app"] = app
@@ -0,0 +1,34 @@
+"""
+Chunker throughput in characters and in tokens.
+Run from websurf-backend: python -m benchmarks.chunker
+"""
+## imports ##
+import time
+import random
+from app.services.chunker import Chunker, token_chunker
+
+
+def main():
+    random.seed(0)
+    words = ["retrieval", "augmented", "generation", "index", "vector", "the", "a", "of", "browser",
+             "agent", "embedding", "collection", "chunk.", "page.\n", "\n\n"]
+    text = " ".join(random.choice(words) for _ in range(200_000))
+
+    configs = [("chars 500/50", Chunker(500, 50))]
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+        configs.append(("tokens 254/50", token_chunker(tokenizer, 256, 500, 50)))
+    except Exception as e:
+        print(f"token chunker skipped: {e}")
+
+    for name, chunker in configs:
+        start = time.perf_counter()
+        chunks = [c for c, _ in chunker.split_with_offsets(text)]
+        elapsed = time.perf_counter() - start
+        avg = sum(len(c) for c in chunks) / max(1, len(chunks))
+        print(f"{name:14s} {len(chunks):6d} chunks  avg {avg:6.0f} chars  {len(chunks) / elapsed:10.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
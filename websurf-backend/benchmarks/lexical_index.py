@@ -0,0 +1,42 @@
+"""
+LexicalIndex ingest and BM25 query latency on a Zipf vocabulary, plus exact identifier matches.
+Run from websurf-backend: python -m benchmarks.lexical_index
+"""
+## imports ##
+import time
+import random
+import tempfile
+from app.services.lexical_index import LexicalIndex
+
+
+def main():
+    random.seed(0)
+    # Zipf-distributed vocabulary: a few stopword-like terms, a long tail of rare ones
+    vocab = ["the", "a", "of", "to", "and"] + [f"word{n}" for n in range(20_000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    codes = [f"ERR_{n}_{random.choice(vocab[5:50]).upper()}" for n in range(500)]
+    docs = [" ".join(random.choices(vocab, weights, k=80)) + f" failed with {codes[n % len(codes)]}"
+            for n in range(50_000)]
+
+    with tempfile.TemporaryDirectory() as root:
+        index = LexicalIndex(root)
+        start = time.perf_counter()
+        for i in range(0, len(docs), 32):  # ingestion batch size
+            index.add("bench", [f"doc{n}" for n in range(i, i + 32)], docs[i:i + 32])
+        ingest = time.perf_counter() - start
+        print(f"ingest  {len(docs)} chunks  {ingest:6.2f}s  {ingest / len(docs) * 1e6:7.1f} us/chunk")
+
+        for name, queries in (("natural", [" ".join(random.choices(vocab, weights, k=6)) for _ in range(200)]),
+                              ("identifier", [f"what does {random.choice(codes)} mean" for _ in range(200)])):
+            start = time.perf_counter()
+            results = [index.search("bench", query, 10) for query in queries]
+            per_query = (time.perf_counter() - start) / len(queries)
+            print(f"query   {name:10s} {per_query * 1000:7.3f} ms  avg hits {sum(map(len, results)) / len(results):.1f}")
+        # identifier queries should surface a chunk carrying that exact code first
+        hits = sum(query.split()[2] in docs[int(top[0][0][3:])] for query, top in zip(queries, results) if top)
+        print(f"identifier top-1 exact matches {hits}/{len(queries)}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Memory saved and recall@10 of every quantization mode on clustered embeddings.
+Run from websurf-backend: python -m benchmarks.quantization
+"""
+## imports ##
+import time
+import numpy as np
+from app.services.quantization import MODES, evaluate_quantization
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # clustered unit vectors, shaped like sentence embeddings (dim 384)
+    centers = rng.normal(size=(200, 384)).astype(np.float32)
+    vectors = centers[rng.integers(0, 200, 50_000)] + 0.6 * rng.normal(size=(50_000, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(len(vectors), 200, replace=False)] + 0.05 * rng.normal(size=(200, 384))
+
+    for mode in MODES:
+        start = time.perf_counter()
+        report = evaluate_quantization(vectors, queries, mode, k=10)
+        print(f"{mode:8s} {report['quantized_bytes'] / 1e6:7.1f} MB  saved {report['memory_saved']:6.1%}  "
+              f"recall@10 {report['recall_at_10']:.4f}  ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+SessionMemory per-turn cost over 500 turns, compaction included, on a throwaway store.
+Run from websurf-backend: python -m benchmarks.session_memory
+"""
+## imports ##
+import time
+import tempfile
+import numpy as np
+from app.services import session_memory as session_memory_module
+from app.services.session_memory import SessionMemory
+from app.services.vector_store import MmapVectorStore
+from app.services.lexical_index import LexicalIndex
+
+
+class _Encoder:
+    def encode(self, texts, convert_to_numpy=True):
+        return np.random.default_rng(len(texts[0])).standard_normal((len(texts), 384)).astype(np.float32)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        store = MmapVectorStore(root)
+        # SessionMemory reads these module attributes, so a throwaway store and a stub encoder stand in
+        session_memory_module.vector_store = store
+        session_memory_module.lexical_index = LexicalIndex(root)
+        session_memory_module.get_embedder = lambda model_name=None: _Encoder()
+        memory = SessionMemory()
+        # compaction is triggered by append(); drive it the same way without the event loop
+        timings = []
+        for turn in range(1, 501):
+            start = time.perf_counter()
+            pending = memory._append("session_bench", f"question {turn} about topic {turn % 7}?",
+                                     f"Answer {turn}. It covers topic {turn % 7} in some detail. See notes.")
+            if pending > memory.window + memory.compact_every:
+                memory._compact("session_bench")
+            timings.append(time.perf_counter() - start)
+            if turn % 100 == 0:
+                recent = timings[-100:]
+                print(f"turns {turn - 99:3d}-{turn:3d}  {sum(recent) / len(recent) * 1000:6.2f} ms/turn  "
+                      f"entries {store.get_collection('session_bench').count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+TextNormalizer against the regex chain it replaced: time and identical output.
+Run from websurf-backend: python -m benchmarks.text_normalizer
+"""
+## imports ##
+import re
+import time
+import random
+import unicodedata
+from app.services.text_normalizer import response_normalizer, pdf_normalizer
+
+
+def legacy_response(text):
+    text = unicodedata.normalize("NFKC", text)
+    text = re.sub(r'([,;:.!?])\1+', r'\1', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'•{2,}', '•', text)
+    text = re.sub(r'\b(\w+)( \1\b)+', r'\1', text, flags=re.IGNORECASE)
+    text = re.sub(r'([<>=])\1+', r'\1', text)
+    text = re.sub(r'\.{2,}', '.', text)
+    text = re.sub(r',,', ',', text)
+    return text.strip()
+
+
+def legacy_pdf(text):
+    text = re.sub(r'([A-Za-z])\1', r'\1', text)
+    text = unicodedata.normalize("NFKD", text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def main():
+    random.seed(0)
+    vocab = ["model", "the", "The", "retrieval", "vector", "index", "...", "!!", "•••", ">>", "==",
+             "a" * 400, "token", "\n\n", "  ", "page", "42", "error_code"]
+    pages = [" ".join(random.choice(vocab) for _ in range(4000)) for _ in range(50)]
+    size_mb = sum(len(page) for page in pages) / 1e6
+
+    for name, legacy, normalizer in (("response", legacy_response, response_normalizer),
+                                     ("pdf", legacy_pdf, pdf_normalizer)):
+        legacy_time = new_time = float("inf")
+        for _ in range(3):  # best of three
+            start = time.perf_counter()
+            expected = [legacy(page) for page in pages]
+            legacy_time = min(legacy_time, time.perf_counter() - start)
+            start = time.perf_counter()
+            got = normalizer.normalize_batch(pages)
+            new_time = min(new_time, time.perf_counter() - start)
+        same = sum(a == b for a, b in zip(expected, got))
+        print(f"{name:8s} {size_mb:.1f} MB  legacy {legacy_time * 1000:8.1f} ms  "
+              f"compiled {new_time * 1000:8.1f} ms  x{legacy_time / new_time:.1f}  "
+              f"identical {same}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
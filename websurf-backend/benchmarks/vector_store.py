@@ -0,0 +1,46 @@
+"""
+MmapVectorStore ingest, first query after mapping, query latency and recall@10 per storage dtype.
+Run from websurf-backend: python -m benchmarks.vector_store
+"""
+## imports ##
+import time
+import tempfile
+import numpy as np
+from app.services.quantization import MODES, quantize
+from app.services.vector_store import MmapVectorStore
+
+
+def main():
+    rng = np.random.default_rng(0)
+    # clustered unit vectors, shaped like sentence embeddings (dim 384)
+    centers = rng.normal(size=(200, 384)).astype(np.float32)
+    vectors = centers[rng.integers(0, 200, 50_000)] + 0.6 * rng.normal(size=(50_000, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(len(vectors), 200, replace=False)] + 0.05 * rng.normal(size=(200, 384))
+    with tempfile.TemporaryDirectory() as root:
+        for dtype in MODES:
+            store = MmapVectorStore(root, dtype)
+            collection = store.get_collection(f"bench_{dtype}")
+            start = time.perf_counter()
+            for i in range(0, len(vectors), 5000):
+                collection.upsert([f"doc{n}" for n in range(i, i + 5000)], vectors[i:i + 5000],
+                                  documents=[f"chunk {n}" for n in range(i, i + 5000)],
+                                  metadatas=[{"page": n // 10} for n in range(i, i + 5000)])
+            ingest = time.perf_counter() - start
+            # a fresh store maps the files instead of loading them
+            reader = MmapVectorStore(root, dtype).get_collection(f"bench_{dtype}", create=False)
+            start = time.perf_counter()
+            reader.query(queries[:1], n_results=10)
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            results = [reader.query(q, n_results=10)["ids"][0] for q in queries]
+            per_query = (time.perf_counter() - start) / len(queries)
+            exact, _ = quantize(vectors).search(queries, 10)
+            recall = np.mean([len({f"doc{n}" for n in e} & set(r)) / 10 for e, r in zip(exact.tolist(), results)])
+            print(f"{dtype:8s} {reader.count():6d} vectors  ingest {ingest:5.2f}s  first query {opened * 1000:6.2f} ms  "
+                  f"query {per_query * 1000:6.3f} ms  recall@10 {recall:.3f}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
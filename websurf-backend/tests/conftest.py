@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# app/__init__.py creates the database tables on import; service modules are
+# tested on their own, so the package is registered without running it
+if "app" not in sys.modules:
+    app = types.ModuleType("app")
+    app.__path__ = [os.path.join(BACKEND_DIR, "app")]
+    sys.modules["app"] = app
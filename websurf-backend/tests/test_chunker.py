@@ -0,0 +1,32 @@
+import random
+import pytest
+from app.services.chunker import Chunker, token_chunker
+
+
+def _sample_text() -> str:
+    random.seed(0)
+    words = ["retrieval", "augmented", "generation", "index", "vector", "the", "a", "of", "browser",
+             "agent", "embedding", "collection", "chunk.", "page.\n", "\n\n"]
+    return " ".join(random.choice(words) for _ in range(5000))
+
+
+def _word_tokenizer(text, add_special_tokens=False, return_attention_mask=False):
+    return {"input_ids": text.split()}
+
+
+@pytest.mark.parametrize("chunker", [Chunker(500, 50), token_chunker(_word_tokenizer, 256, 120, 30)],
+                         ids=["chars", "tokens"])
+def test_offsets_point_at_chunks(chunker):
+    text = _sample_text()
+    pairs = chunker.split_with_offsets(text)
+    assert len(pairs) > 5
+    for chunk, start in pairs:
+        assert text[start:start + len(chunk)] == chunk
+    starts = [start for _, start in pairs]
+    assert starts == sorted(starts)
+
+
+@pytest.mark.parametrize("overlap", [-1, 500, 600])
+def test_invalid_overlap_is_rejected(overlap):
+    with pytest.raises(ValueError):
+        Chunker(500, overlap)
@@ -0,0 +1,26 @@
+import asyncio
+import threading
+import pytest
+from app.services.compute_executor import ComputeExecutor, ComputeBusyError
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_thread_ends():
+    async def run():
+        executor = ComputeExecutor(max_workers=1, queue_size=0, admission_timeout=0.1)
+        blocker = threading.Event()
+        waiter = asyncio.create_task(executor.run(blocker.wait, 5))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.sleep(0.05)
+        try:
+            assert executor.stats()["in_flight"] == 1
+            with pytest.raises(ComputeBusyError):
+                await executor.run(lambda: None)
+        finally:
+            blocker.set()
+        await asyncio.sleep(0.05)
+        assert executor.stats()["in_flight"] == 0
+        assert await executor.run(lambda: 42) == 42
+        executor.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,15 @@
+from app.services.context_builder import ContextBuilder, estimate_tokens
+
+
+def test_system_pieces_share_one_budget():
+    builder = ContextBuilder({"system": 100})
+    pieces = [("base", "base " * 100), ("tasks", "tasks " * 60), ("rag", "rag " * 40)]
+    trimmed = builder.system(pieces)
+    assert sum(estimate_tokens(text) for text in trimmed) <= 100
+    assert all(text for text in trimmed)
+    assert builder.system(pieces) is trimmed
+
+
+def test_system_pieces_under_budget_are_kept_whole():
+    pieces = [("base", "short base"), ("talk", "short instructions")]
+    assert ContextBuilder({"system": 100}).system(pieces) == ["short base", "short instructions"]
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+from app.services import rag_service
+
+
+class _Catalog:
+    def __init__(self):
+        self.registered = []
+
+    async def register(self, name: str, description: str = None) -> bool:
+        self.registered.append((name, description))
+        return True
+
+    async def update_stats(self, name: str, **stats):
+        pass
+
+
+class _Pipeline:
+    fail = False
+
+    def __init__(self, source: str = None):
+        self.embedded = self.unchanged = 0
+
+    def chunks_from_text(self, text: str, chunk_overlap: int = 50):
+        self.chunks = [text]
+
+    def ingest_chunks(self, **kwargs) -> int:
+        if self.fail:
+            raise RuntimeError("embedding failed")
+        self.embedded = len(self.chunks)
+        return self.embedded
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = _Catalog()
+    monkeypatch.setattr(rag_service, "collection_catalog", catalog)
+    monkeypatch.setattr(rag_service, "RagPipeline", _Pipeline)
+    monkeypatch.setattr(rag_service, "_collection_stats", lambda *args: {})
+    return catalog
+
+
+def test_collection_is_registered_after_a_successful_ingest(catalog):
+    asyncio.run(rag_service.data_injestion(text_content="hello", collection_name="notes"))
+    assert catalog.registered == [("notes", None)]
+
+
+def test_failed_ingest_leaves_no_catalog_entry(catalog, monkeypatch):
+    monkeypatch.setattr(_Pipeline, "fail", True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(rag_service.data_injestion(text_content="hello", collection_name="notes"))
+    assert catalog.registered == []
+
+
+def _result(*hits):
+    """ hybrid_query result row from (id, document, distance, score) hits """
+    return {"ids": [[hit[0] for hit in hits]], "documents": [[hit[1] for hit in hits]],
+            "metadatas": [[{} for _ in hits]], "distances": [[hit[2] for hit in hits]],
+            "scores": [[hit[3] for hit in hits]]}
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    results = {}
+
+    class _Store:
+        def get_collection(self, name, db_path=None, create=True):
+            return name
+
+    async def hybrid_query(collection, query_texts, query_embeddings, n_results, groups=None, db_path=None):
+        return results[collection]
+
+    monkeypatch.setattr(rag_service, "vector_store", _Store())
+    monkeypatch.setattr(rag_service, "hybrid_query", hybrid_query)
+    monkeypatch.setattr(rag_service, "embed_query", lambda query: [[0.0]])
+    return results
+
+
+def test_search_collections_keeps_bm25_only_hits(collections):
+    # "b1" matched only BM25 in its collection, so its distance is poor but it ranks first there
+    collections["a"] = _result(("a1", "dense match", 0.2, 0.030), ("a2", "weaker dense match", 0.3, 0.016))
+    collections["b"] = _result(("b1", "keyword match", 0.9, 0.032))
+    hits = asyncio.run(rag_service.search_collections("query", ["a", "b"], n_results=2))
+    assert [hit["id"] for hit in hits] == ["b1", "a1"]
+
+
+def test_search_collections_drops_empty_documents_before_the_cut(collections):
+    collections["a"] = _result(("a1", "   ", 0.1, 0.033), ("a2", "second", 0.2, 0.016))
+    collections["b"] = _result(("b1", "third", 0.3, 0.015))
+    hits = asyncio.run(rag_service.search_collections("query", ["a", "b"], n_results=2))
+    assert [hit["id"] for hit in hits] == ["a2", "b1"]
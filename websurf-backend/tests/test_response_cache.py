@@ -0,0 +1,45 @@
+import asyncio
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ResponseCache
+
+
+class _Catalog:
+    async def records(self, include_sessions: bool = False) -> dict:
+        return {}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(response_cache_module, "collection_catalog", _Catalog())
+    return ResponseCache(enabled=True, threshold=0.9)
+
+
+def _unit(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_personal_answers_stay_with_their_owner(cache):
+    question = _unit(0)
+
+    async def run():
+        await cache.store("talk", "what is my name?", question, "Your name is Alice.", set(), 1.0, user_id="alice")
+        return (await cache.lookup("talk", question, "alice"), await cache.lookup("talk", question, "bob"),
+                await cache.lookup("talk", question))
+
+    assert asyncio.run(run()) == ("Your name is Alice.", None, None)
+
+
+def test_shared_answers_serve_every_session(cache):
+    question = _unit(1)
+
+    async def run():
+        await cache.store("rag", "what is rrf?", question, "Rank fusion.", set(), 1.0)
+        return await cache.lookup("rag", question, "alice"), await cache.lookup("rag", question, "bob")
+
+    assert asyncio.run(run()) == ("Rank fusion.", "Rank fusion.")
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+from app.models.agent_session import AgentSession
+from app.services import session_store as session_store_module
+from app.services.session_store import InMemorySessionStore, SqlSessionStore, memory_collection_for
+
+
+class _Memory:
+    def __init__(self):
+        self.cleared = []
+
+    async def clear(self, collection_name: str, db_path: str = None):
+        self.cleared.append(collection_name)
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    memory = _Memory()
+    monkeypatch.setattr(session_store_module, "session_memory", memory)
+    return memory
+
+
+@pytest.fixture
+def sql_store(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    AgentSession.__table__.create(engine)
+    monkeypatch.setattr(session_store_module, "SessionLocal", sessionmaker(bind=engine))
+    return SqlSessionStore(idle_seconds=60, reaper_interval=0.01)
+
+
+def _reap_once(store):
+    async def run():
+        await store.start()
+        await asyncio.sleep(0.1)
+        await store.shutdown()
+    asyncio.run(run())
+
+
+def test_sql_eviction_clears_session_memory(sql_store, memory, monkeypatch):
+    asyncio.run(sql_store.get("alice"))
+    later = session_store_module._now() + timedelta(seconds=120)
+    monkeypatch.setattr(session_store_module, "_now", lambda: later)
+    asyncio.run(sql_store.get("bob"))
+    _reap_once(sql_store)
+    assert memory.cleared == [memory_collection_for("alice")]
+
+
+def test_in_memory_eviction_clears_session_memory(memory, monkeypatch):
+    store = InMemorySessionStore(idle_seconds=60, reaper_interval=0.01)
+    asyncio.run(store.get("alice"))
+    later = session_store_module._now() + timedelta(seconds=120)
+    monkeypatch.setattr(session_store_module, "_now", lambda: later)
+    _reap_once(store)
+    assert memory.cleared == [memory_collection_for("alice")]
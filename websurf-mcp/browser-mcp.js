@@ -29,9 +29,11 @@ const server = new Server(
 let browser = null;
 let defaultContext = null;
 let defaultPage = null;
+// Origins the browser has loaded, so resetSession can clear their stored data
+const visitedOrigins = new Set();
 
-// Define persistent profile path
-const PROFILE_PATH = "C:\\websurf-browser";
+// Define persistent profile path (pooled workers each get their own)
+const PROFILE_PATH = process.env.WEBSURF_PROFILE_PATH || "C:\\websurf-browser";
 
 
 // Default starting URL
@@ -88,6 +90,11 @@ async function ensureBrowser() {
     });
     
     console.error(`✓ Browser launched with persistent profile at: ${PROFILE_PATH}`);
+
+    browser.on("request", (request) => {
+      const url = request.url();
+      if (url.startsWith("http")) visitedOrigins.add(new URL(url).origin);
+    });
     
     // Get or create the first page
     const pages = browser.pages();
@@ -286,6 +293,14 @@ server.setRequestHandler(ListToolsRequestSchema, async () => {
           required: ["pageId"],
         },
       },
+      {
+        name: "resetSession",
+        description: "Close every page and clear cookies, cache, permissions and site storage (used by the backend between users)",
+        inputSchema: {
+          type: "object",
+          properties: {},
+        },
+      },
       {
         name: "listPages",
         description: "List all open pages",
@@ -540,6 +555,31 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
         };
       }
 
+      case "resetSession": {
+        // a browser that never launched has nothing to clear
+        if (browser && (await isBrowserValid())) {
+          // a fresh page first, so the context never runs out of pages
+          const fresh = await browser.newPage();
+          for (const page of browser.pages()) {
+            if (page !== fresh) await page.close().catch(() => {});
+          }
+          contexts.clear();
+          defaultPage = fresh;
+          await browser.clearCookies();
+          await browser.clearPermissions();
+          const cdp = await browser.newCDPSession(fresh);
+          await cdp.send("Network.clearBrowserCache");
+          for (const origin of visitedOrigins) {
+            await cdp.send("Storage.clearDataForOrigin", { origin, storageTypes: "all" });
+          }
+          await cdp.detach().catch(() => {});
+        }
+        visitedOrigins.clear();
+        return {
+          content: [{ type: "text", text: JSON.stringify({ message: "Session reset" }) }],
+        };
+      }
+
       case "listPages": {
         const pages = ["default", ...Array.from(contexts.keys())];
         return {